@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Linear GraphQL API, for benchmarks and offline runs.
+
+Why:
+- The only way to time apply_patch.py or create_sub_issues.py was against production
+  Linear, where latency, rate limits and other users' traffic make runs incomparable.
+
+What this module does:
+- Holds one team ("BEN") with workflow states, labels, a project and a parent issue
+  (BEN-1) with `--issues` sub-issues, all in memory. `--parents N` adds N-1 more
+  top-level parents with PORTFOLIO_CHILDREN sub-issues each (for the portfolio export).
+- Answers the queries and mutations the scripts send, by operation name or (for aliased
+  batch documents) by field: parent metadata, exports (full and --delta), the stale check,
+  issueUpdate / issueBatchUpdate / issueCreate / issueRelationCreate, the project
+  directory, the architecture document lookups and the portfolio parent listing.
+- Simulates the network: `--latency-ms` +/- `--jitter-ms` per request, a fraction
+  `--error-rate` of requests answered with `--error-status` (default 503), and a
+  fixed-window rate limit (`--rate-limit` requests per `--rate-window` seconds) that
+  returns HTTP 429 with Retry-After and sends X-RateLimit-Requests-* headers throughout.
+- `GET /stats` returns request counts per operation; `POST /reset` with
+  {"issues": N, "parents": M} reseeds the state.
+
+Usage:
+  python3 ./bench/mock_linear.py --port 8787 --issues 500 --latency-ms 40 --jitter-ms 20
+  export LINEAR_API_KEY=bench LINEAR_GRAPHQL_ENDPOINT=http://127.0.0.1:8787/graphql
+
+bench/run_bench.py starts this server in-process; see bench/README.md.
+"""
+
+import argparse
+import datetime as dt
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+TEAM = {"id": "team-bench", "key": "BEN", "name": "Bench"}
+PROJECT = {"id": "project-bench", "name": "Bench Project"}
+STATES = [
+    {"id": "state-backlog", "name": "Backlog", "type": "backlog", "position": 0},
+    {"id": "state-todo", "name": "Todo", "type": "unstarted", "position": 1},
+    {"id": "state-progress", "name": "In Progress", "type": "started", "position": 2},
+    {"id": "state-done", "name": "Done", "type": "completed", "position": 3},
+]
+MEMBERS = [
+    {"id": f"user-{n}", "name": f"Member {n}", "displayName": f"member{n}", "email": f"member{n}@bench.test", "active": True}
+    for n in range(8)
+]
+WORKSPACE_LABELS = [{"id": "label-ws-bug", "name": "Bug"}, {"id": "label-ws-feature", "name": "Feature"}]
+# Other projects in the workspace, enough to need more than one page of `projects`.
+PROJECT_COUNT = 300
+_PROJECT_WORDS = (["Payments", "Search", "Mobile", "Billing", "Platform", "Growth"], ["API", "Web", "Infra", "Revamp", "Migration"])
+LABEL_COUNT = 40
+LABELS_PER_ISSUE = 3
+PORTFOLIO_CHILDREN = 5
+
+_OPERATION_RE = re.compile(r"^\s*(?:query|mutation)\s+(\w+)")
+_MUTATION_FIELD_RE = re.compile(
+    r"(?:(\w+)\s*:\s*)?(issueUpdate|issueBatchUpdate|issueCreate|issueRelationCreate|documentCreate)\s*\(([^)]*)\)"
+)
+_ALIASED_ISSUE_RE = re.compile(r"(\w+)\s*:\s*issue\(id:\s*\$(\w+)\)")
+_ALIASED_PROJECT_RE = re.compile(r"(\w+)\s*:\s*project\(id:\s*\$(\w+)\)")
+_ARG_RE = re.compile(r"(\w+)\s*:\s*\$(\w+)")
+
+
+def _now() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _page(items: List[Any], first: int, after: Optional[str]) -> Dict[str, Any]:
+    offset = int(after or 0)
+    nodes = items[offset:offset + first]
+    end = offset + len(nodes)
+    return {"nodes": nodes, "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)}}
+
+
+class MockLinear:
+    """In-memory workspace and GraphQL resolver (no networking)."""
+
+    def __init__(self, issues: int = 100, parents: int = 1) -> None:
+        self._lock = threading.Lock()
+        self.seed(issues, parents)
+
+    def seed(self, issues: int, parents: int = 1) -> None:
+        with self._lock:
+            self.labels = [{"id": f"label-{n}", "name": f"label-{n}"} for n in range(LABEL_COUNT)]
+            self.issues: Dict[str, Dict[str, Any]] = {}
+            self.children: Dict[str, List[str]] = {}
+            self.relations: List[Dict[str, Any]] = []
+            self.projects = [dict(PROJECT, updatedAt="2026-01-01T00:00:00.000Z")] + [
+                {
+                    "id": f"project-{n}",
+                    "name": f"{_PROJECT_WORDS[0][n % 6]} {_PROJECT_WORDS[1][n // 6 % 5]} {n // 30 + 1}",
+                    "updatedAt": "2026-01-01T00:00:00.000Z",
+                }
+                for n in range(PROJECT_COUNT)
+            ]
+            # Every third generated project already has its architecture document.
+            self.documents: List[Dict[str, Any]] = [
+                {"id": f"doc-{p['id']}", "title": "architecture.md", "projectId": p["id"]} for p in self.projects[1::3]
+            ]
+            self.next_number = 1
+            self.stats: Dict[str, Any] = {"requests": 0, "operations": {}, "rateLimited": 0, "injectedErrors": 0}
+            parent = self._new_issue("Bench parent", None, "state-todo")
+            for n in range(issues):
+                labels = [self.labels[(n + k) % LABEL_COUNT]["id"] for k in range(LABELS_PER_ISSUE)]
+                self._new_issue(f"Bench issue {n + 1}", parent["id"], "state-backlog", labels)
+            self.parent_id = parent["id"]
+            for p in range(1, parents):
+                extra = self._new_issue(f"Bench parent {p + 1}", None, "state-todo")
+                for n in range(PORTFOLIO_CHILDREN):
+                    self._new_issue(f"Bench parent {p + 1} issue {n + 1}", extra["id"], "state-backlog")
+            if parents > 1:
+                # A top-level issue without children, which the portfolio listing must skip.
+                self._new_issue("Bench standalone issue", None, "state-todo")
+
+    def _new_issue(self, title: str, parent_id: Optional[str], state_id: str, label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        number = self.next_number
+        self.next_number += 1
+        issue = {
+            "id": str(uuid.UUID(int=number)),
+            "identifier": f"{TEAM['key']}-{number}",
+            "number": number,
+            "title": title,
+            "description": f"Synthetic description for {title}.\n\n" + "Lorem ipsum dolor sit amet. " * 8,
+            "priority": number % 5,
+            "estimate": (number % 3) + 1,
+            "stateId": state_id,
+            "assigneeId": None,
+            "labelIds": list(label_ids or []),
+            "parentId": parent_id,
+            "updatedAt": "2026-01-01T00:00:00.000Z",
+        }
+        self.issues[issue["id"]] = issue
+        self.children.setdefault(issue["id"], [])
+        if parent_id:
+            self.children.setdefault(parent_id, []).append(issue["id"])
+        return issue
+
+    # --- shapes -------------------------------------------------------------------
+
+    def _state(self, state_id: str) -> Dict[str, Any]:
+        return next(s for s in STATES if s["id"] == state_id)
+
+    def _issue_out(self, issue: Dict[str, Any]) -> Dict[str, Any]:
+        labels = [l for l in self.labels + WORKSPACE_LABELS if l["id"] in issue["labelIds"]]
+        assignee = next((m for m in MEMBERS if m["id"] == issue["assigneeId"]), None)
+        state = self._state(issue["stateId"])
+        return {
+            "id": issue["id"],
+            "identifier": issue["identifier"],
+            "title": issue["title"],
+            "description": issue["description"],
+            "priority": issue["priority"],
+            "estimate": issue["estimate"],
+            "updatedAt": issue["updatedAt"],
+            "state": {"id": state["id"], "name": state["name"]},
+            "assignee": assignee,
+            "labels": _page(labels, 50, None),
+            "parent": {"id": issue["parentId"]} if issue["parentId"] else None,
+            "team": dict(TEAM),
+            "project": dict(PROJECT),
+        }
+
+    def _unknown_reference(self, update: Dict[str, Any]) -> Optional[str]:
+        """First state/label/user id in `update` that does not exist, as Linear would reject it."""
+        label_ids = {l["id"] for l in self.labels + WORKSPACE_LABELS}
+        if "stateId" in update and update["stateId"] not in {s["id"] for s in STATES}:
+            return update["stateId"]
+        if update.get("assigneeId") is not None and update["assigneeId"] not in {m["id"] for m in MEMBERS}:
+            return update["assigneeId"]
+        for key in ("labelIds", "addedLabelIds", "removedLabelIds"):
+            for label_id in update.get(key) or []:
+                if label_id not in label_ids:
+                    return label_id
+        return None
+
+    def _apply_input(self, issue: Dict[str, Any], update: Dict[str, Any]) -> None:
+        for key, value in update.items():
+            if key in ("title", "description", "priority", "estimate", "stateId", "assigneeId", "parentId"):
+                issue[key] = value
+            elif key == "labelIds":
+                issue["labelIds"] = list(value)
+            elif key == "addedLabelIds":
+                issue["labelIds"] += [v for v in value if v not in issue["labelIds"]]
+            elif key == "removedLabelIds":
+                issue["labelIds"] = [v for v in issue["labelIds"] if v not in value]
+        issue["updatedAt"] = _now()
+
+    # --- resolver -----------------------------------------------------------------
+
+    def handle(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        m = _OPERATION_RE.match(query)
+        op = m.group(1) if m else "anonymous"
+        with self._lock:
+            self.stats["operations"][op] = self.stats["operations"].get(op, 0) + 1
+            if query.lstrip().startswith("mutation"):
+                return self._mutation(query, variables)
+            return self._query(op, query, variables)
+
+    def _mutation(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        errors: List[Dict[str, Any]] = []
+        for alias, field, arg_text in _MUTATION_FIELD_RE.findall(query):
+            args = {name: variables.get(var) for name, var in _ARG_RE.findall(arg_text)}
+            key = alias or field
+            if field == "issueUpdate":
+                issue = self.issues.get(args.get("id"))
+                bad = self._unknown_reference(args.get("input") or {})
+                if issue is None or bad:
+                    data[key] = None
+                    errors.append({"message": f"Entity not found{': ' + bad if bad else ''}", "path": [key], "extensions": {"code": "INVALID_INPUT"}})
+                    continue
+                self._apply_input(issue, args.get("input") or {})
+                data[key] = {"success": True, "issue": self._issue_out(issue)}
+            elif field == "issueBatchUpdate":
+                missing = [i for i in args.get("ids") or [] if i not in self.issues]
+                bad = self._unknown_reference(args.get("input") or {})
+                if bad:
+                    missing = [bad]
+                if missing:
+                    data[key] = None
+                    errors.append({"message": f"Entity not found: {missing[0]}", "path": [key], "extensions": {"code": "INVALID_INPUT"}})
+                    continue
+                out = []
+                for issue_id in args.get("ids") or []:
+                    self._apply_input(self.issues[issue_id], args.get("input") or {})
+                    out.append(self._issue_out(self.issues[issue_id]))
+                data[key] = {"success": True, "issues": out}
+            elif field == "issueCreate":
+                inp = args.get("input") or {}
+                issue = self._new_issue(inp.get("title") or "", inp.get("parentId"), inp.get("stateId") or "state-backlog", inp.get("labelIds"))
+                self._apply_input(issue, {k: v for k, v in inp.items() if k not in ("title", "teamId", "parentId")})
+                out = self._issue_out(issue)
+                out["url"] = f"https://linear.app/bench/issue/{issue['identifier']}"
+                data[key] = {"success": True, "issue": out}
+            elif field == "issueRelationCreate":
+                relation = dict(args.get("input") or {}, id=str(uuid.uuid4()))
+                self.relations.append(relation)
+                data[key] = {"success": True, "issueRelation": relation}
+            elif field == "documentCreate":
+                doc = {"id": str(uuid.uuid4()), "title": (args.get("input") or {}).get("title"), "projectId": (args.get("input") or {}).get("projectId")}
+                self.documents.append(doc)
+                data[key] = {"success": True, "document": {"id": doc["id"], "title": doc["title"]}}
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def _query(self, op: str, query: str, v: Dict[str, Any]) -> Dict[str, Any]:
+        if op in ("ParentIssueMetadata", "TeamLabels"):
+            issue = self.issues.get(v.get("id")) if op == "ParentIssueMetadata" else None
+            if op == "ParentIssueMetadata" and issue is None:
+                return {"data": {"issue": None}}
+            first = v.get("first") or 50
+            team = dict(TEAM, states={"nodes": STATES}, labels=_page(self.labels, first, v.get("after")),
+                        members={"nodes": MEMBERS})
+            if op == "TeamLabels":
+                return {"data": {"team": team}}
+            return {"data": {"issue": {"id": issue["id"], "identifier": issue["identifier"], "project": dict(PROJECT), "team": team},
+                             "workspaceLabels": _page(WORKSPACE_LABELS, first, None)}}
+        if op == "ParentIssueByTeamAndNumber":
+            found = [i for i in self.issues.values() if i["number"] == int(v.get("issueNumber") or 0) and v.get("teamKey") == TEAM["key"]]
+            return {"data": {"issues": {"nodes": [self._issue_out(i) for i in found]}}}
+        if op == "IssueChildren":
+            kids = [self._issue_out(self.issues[i]) for i in self.children.get(v["id"], [])]
+            return {"data": {"issue": {"children": _page(kids, v["first"], v.get("after"))}}}
+        if op == "IssueLabels":
+            issue = self.issues[v["id"]]
+            labels = [l for l in self.labels if l["id"] in issue["labelIds"]]
+            return {"data": {"issue": {"labels": _page(labels, 50, v.get("after"))}}}
+        if op == "IssueChildIds":
+            return {"data": {"issue": self._listing(v["id"], v["first"], v.get("after"))}}
+        if op == "IssueChildIdsBatch":
+            return {"data": {alias: self._listing(v[var], 250, None) for alias, var in _ALIASED_ISSUE_RE.findall(query)}}
+        if op == "IssuesUpdatedAt":
+            nodes = [{"id": i, "updatedAt": self.issues[i]["updatedAt"]} for i in v.get("ids") or [] if i in self.issues]
+            return {"data": {"issues": {"nodes": nodes[: v.get("first") or 50]}}}
+        if op in ("IssuesById", "IssuesReadBack"):
+            nodes = [self._issue_out(self.issues[i]) for i in v.get("ids") or [] if i in self.issues]
+            return {"data": {"issues": _page(nodes, v.get("first") or 50, v.get("after"))}}
+        if op == "PortfolioParents":
+            flt = v.get("filter") or {}
+            project_id = ((flt.get("project") or {}).get("id") or {}).get("eq")
+            team_key = ((flt.get("team") or {}).get("key") or {}).get("eq")
+            in_scope = project_id == PROJECT["id"] if "project" in flt else team_key == TEAM["key"]
+            tops = [i for i in self.issues.values() if in_scope and i["parentId"] is None]
+            nodes = [dict(self._issue_out(i), children={"nodes": [{"id": c} for c in self.children[i["id"]][:1]]}) for i in tops]
+            return {"data": {"issues": _page(nodes, v.get("first") or 50, v.get("after"))}}
+        if op == "ProjectsPage":
+            since = ((v.get("filter") or {}).get("updatedAt") or {}).get("gt")
+            found = sorted((p for p in self.projects if not since or p["updatedAt"] > since), key=lambda p: p["updatedAt"])
+            return {"data": {"projects": _page(found, v.get("first") or 50, v.get("after"))}}
+        if op == "ArchitectureAnchorForParent":
+            issue = self.issues.get(v.get("parentId"))
+            if issue is None:
+                return {"data": {"issue": None}}
+            return {"data": {"issue": {"id": issue["id"], "identifier": issue["identifier"], "team": dict(TEAM),
+                                       "project": self._anchor(PROJECT["id"], v)}}}
+        if op == "ArchitectureAnchorForProject":
+            issue = self.issues.get(v.get("parentId"))
+            out = {"id": issue["id"], "identifier": issue["identifier"], "team": dict(TEAM)} if issue else None
+            return {"data": {"issue": out, "project": self._anchor(v.get("projectId"), v)}}
+        if op == "ArchitectureSweep":
+            return {"data": {alias: self._anchor(v[var], v) for alias, var in _ALIASED_PROJECT_RE.findall(query)}}
+        return {"data": None, "errors": [{"message": f"Mock does not implement operation {op}", "extensions": {"code": "GRAPHQL_VALIDATION_FAILED"}}]}
+
+    def _anchor(self, project_id: Optional[str], v: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        project = next((p for p in self.projects if p["id"] == project_id), None)
+        if project is None:
+            return None
+        docs = [{"id": d["id"], "title": d["title"]} for d in self.documents if d["projectId"] == project_id and d["title"] == v.get("title")]
+        needle = (v.get("needle") or "").lower()
+        issues = [] if project_id != PROJECT["id"] else [
+            {"id": i["id"], "identifier": i["identifier"], "title": i["title"]} for i in self.issues.values() if needle in i["title"].lower()
+        ]
+        return {"id": project["id"], "name": project["name"], "documents": {"nodes": docs}, "issues": {"nodes": issues[:20]}}
+
+    def _listing(self, issue_id: str, first: int, after: Optional[str]) -> Dict[str, Any]:
+        kids = [
+            {"id": i, "updatedAt": self.issues[i]["updatedAt"], "state": {"name": self._state(self.issues[i]["stateId"])["name"]}}
+            for i in self.children.get(issue_id, [])
+        ]
+        return {"updatedAt": self.issues[issue_id]["updatedAt"], "children": _page(kids, first, after)}
+
+    def export(self, state_name: Optional[str] = "Backlog") -> Dict[str, Any]:
+        """A parent_issue_export.json for the seeded parent, as export_parent_issue.py writes it."""
+        with self._lock:
+            def record(issue: Dict[str, Any], parent_id: Optional[str]) -> Dict[str, Any]:
+                out = self._issue_out(issue)
+                rec = {k: out[k] for k in ("id", "identifier", "title", "description", "priority", "estimate", "state")}
+                rec["labels"] = out["labels"]["nodes"]
+                rec["assignee"] = out["assignee"]
+                rec["updatedAt"] = out["updatedAt"]
+                if parent_id is not None:
+                    rec["parentId"] = parent_id
+                return rec
+
+            parent = self.issues[self.parent_id]
+            subs = [
+                record(self.issues[i], parent["id"]) for i in self.children[parent["id"]]
+                if not state_name or self._state(self.issues[i]["stateId"])["name"] == state_name
+            ]
+            return {
+                "meta": {
+                    "exportedAt": dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+                    "workspace": None,
+                    "source": "linear-graphql",
+                    "parentIssueIdentifier": parent["identifier"],
+                    "parentIssueId": parent["id"],
+                    "subIssueFilter": {"stateNameEq": state_name} if state_name else None,
+                    "depth": 1,
+                },
+                "parentIssue": record(parent, None),
+                "subIssues": subs,
+            }
+
+
+class NetworkProfile:
+    """Latency, jitter, injected errors and a fixed-window rate limit."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        rate_limit: int = 0,
+        rate_window: float = 60.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_count = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "latencyMs": self.latency_ms,
+            "jitterMs": self.jitter_ms,
+            "errorRate": self.error_rate,
+            "errorStatus": self.error_status,
+            "rateLimit": self.rate_limit,
+            "rateWindowSeconds": self.rate_window,
+        }
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def inject_error(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def admit(self) -> Tuple[bool, Dict[str, str]]:
+        """Count one request against the window; (allowed, rate-limit headers)."""
+        if self.rate_limit <= 0:
+            return True, {}
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_count = 0
+            reset = self._window_start + self.rate_window
+            allowed = self._window_count < self.rate_limit
+            if allowed:
+                self._window_count += 1
+            headers = {
+                "X-RateLimit-Requests-Limit": str(self.rate_limit),
+                "X-RateLimit-Requests-Remaining": str(self.rate_limit - self._window_count),
+                "X-RateLimit-Requests-Reset": str(int(reset * 1000)),
+            }
+            if not allowed:
+                headers["Retry-After"] = str(max(1, int(reset - now + 0.999)))
+            return allowed, headers
+
+
+def make_handler(mock: MockLinear, profile: NetworkProfile) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            out = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                out = gzip.compress(out, compresslevel=5)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def do_GET(self) -> None:
+            with mock._lock:
+                stats = json.loads(json.dumps(mock.stats))
+            self._send(200, stats)
+
+        def do_POST(self) -> None:
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.rstrip("/") == "/reset":
+                opts = json.loads(raw or b"{}") or {}
+                mock.seed(int(opts.get("issues", 100)), int(opts.get("parents", 1)))
+                self._send(200, {"ok": True})
+                return
+            with mock._lock:
+                mock.stats["requests"] += 1
+            time.sleep(profile.delay())
+            allowed, headers = profile.admit()
+            if not allowed:
+                with mock._lock:
+                    mock.stats["rateLimited"] += 1
+                self._send(429, {"errors": [{"message": "Rate limit exceeded", "extensions": {"code": "RATELIMITED"}}]}, headers)
+                return
+            if profile.inject_error():
+                with mock._lock:
+                    mock.stats["injectedErrors"] += 1
+                self._send(profile.error_status, {"errors": [{"message": "Injected failure", "extensions": {"code": "SERVICE_UNAVAILABLE"}}]}, headers)
+                return
+            body = json.loads(raw)
+            self._send(200, mock.handle(body.get("query") or "", body.get("variables") or {}), headers)
+
+    return Handler
+
+
+def serve(mock: MockLinear, profile: NetworkProfile, port: int = 0) -> ThreadingHTTPServer:
+    """Start the server on a daemon thread; the bound port is `server.server_address[1]`."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(mock, profile))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-linear", daemon=True).start()
+    return server
+
+
+def add_profile_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request (default: 0)")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around --latency-ms (default: 0)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status (default: 0)")
+    ap.add_argument("--error-status", type=int, default=503, help="HTTP status for injected errors (default: 503)")
+    ap.add_argument("--rate-limit", type=int, default=0, help="Requests allowed per --rate-window (default: 0 = unlimited)")
+    ap.add_argument("--rate-window", type=float, default=60.0, help="Rate-limit window in seconds (default: 60)")
+    ap.add_argument("--seed", type=int, default=None, help="Random seed for jitter and injected errors")
+
+
+def profile_from_args(args: argparse.Namespace) -> NetworkProfile:
+    return NetworkProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.rate_limit, args.rate_window, args.seed)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Mock Linear GraphQL server for benchmarks.")
+    ap.add_argument("--port", type=int, default=8787, help="Port to listen on (default: 8787)")
+    ap.add_argument("--issues", type=int, default=100, help="Sub-issues under the parent BEN-1 (default: 100)")
+    ap.add_argument("--parents", type=int, default=1, help=f"Top-level parents, each after BEN-1 with {PORTFOLIO_CHILDREN} sub-issues (default: 1)")
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+
+    server = serve(MockLinear(args.issues, args.parents), profile_from_args(args), args.port)
+    print(f"Mock Linear on http://127.0.0.1:{server.server_address[1]}/graphql (parent BEN-1, {args.issues} sub-issues)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
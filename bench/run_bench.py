@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Benchmark apply_patch.py, create_sub_issues.py and the exporter against a mock Linear.
+
+Why:
+- Throughput could only be measured against production Linear, so there was no way to
+  tell whether a change made apply or create faster or slower.
+
+What this script does:
+1) Starts bench/mock_linear.py in-process with the requested network profile
+   (latency, jitter, injected errors, rate limit).
+2) For each size (sub-issues under the parent) and each variant (script + arguments):
+   reseeds the mock, writes a synthetic export and patch, and runs the script end to end
+   as a subprocess with LINEAR_GRAPHQL_ENDPOINT pointed at the mock.
+3) Records wall time, successful changes, changes/sec, peak RSS of the script process,
+   requests seen by the server, and the script report's `metrics` section.
+4) Writes everything to bench/results/<UTC time>-<commit>.json. `--compare OLD.json`
+   prints the change in changes/sec per variant and size, and exits 1 when any drops by
+   more than `--threshold`.
+
+Usage:
+  python3 ./bench/run_bench.py
+  python3 ./bench/run_bench.py --sizes 10,100,1000,5000 --latency-ms 40 --jitter-ms 20
+  python3 ./bench/run_bench.py --variant "apply:--batch --workers 4" --variant create:--batch
+  python3 ./bench/run_bench.py --compare bench/results/<earlier>.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+import mock_linear
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+DEFAULT_SIZES = "10,100,1000"
+DEFAULT_VARIANTS = [
+    "export",
+    "apply",
+    "apply:--batch",
+    "apply:--workers 8",
+    "create",
+    "create:--batch",
+]
+
+SCRIPTS = {
+    "export": "export_parent_issue.py",
+    "apply": "apply_patch.py",
+    "create": "create_sub_issues.py",
+}
+
+
+def parse_variant(text: str) -> Tuple[str, List[str]]:
+    script, _, extra = text.partition(":")
+    script = script.strip()
+    if script not in SCRIPTS:
+        raise argparse.ArgumentTypeError(f"unknown script {script!r} (expected one of {', '.join(SCRIPTS)})")
+    return script, shlex.split(extra)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR, capture_output=True, text=True)
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def apply_patch_for(export: Dict[str, Any]) -> Dict[str, Any]:
+    """One change per sub-issue: every 4th only moves state (identical, so --batch can bulk it),
+    the rest retitle and reprioritize; every 5th also relabels."""
+    changes = []
+    for n, issue in enumerate(export["subIssues"]):
+        if n % 4 == 0:
+            update: Dict[str, Any] = {"stateId": "state-todo"}
+        else:
+            update = {"title": issue["title"] + " (groomed)", "priority": (issue["priority"] + 1) % 5}
+            if n % 5 == 0:
+                update["labelIds"] = [l["id"] for l in issue["labels"]][:1] + ["label-0"]
+        changes.append({"id": issue["id"], "identifier": issue["identifier"], "update": update})
+    return {"meta": dict(export["meta"], mode="apply"), "changes": changes}
+
+
+def create_patch_for(export: Dict[str, Any], count: int) -> Dict[str, Any]:
+    items = [
+        {"title": f"Split work item {n + 1}", "description": "Created by bench/run_bench.py.", "estimate": (n % 3) + 1}
+        for n in range(count)
+    ]
+    return {"meta": dict(export["meta"], mode="apply"), "changes": [], "createSubIssues": items}
+
+
+def write_json(path: str, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def server_stats(url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(url.rsplit("/", 1)[0] + "/stats", timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def run_script(argv: List[str], cwd: str, env: Dict[str, str], log_path: str) -> Tuple[int, float, float]:
+    """Run one script; return (exit code, wall seconds, peak RSS in MiB) of that process alone."""
+    with open(log_path, "w", encoding="utf-8") as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 reports rusage for this child only (RUSAGE_CHILDREN would accumulate across runs).
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    rss = usage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else usage.ru_maxrss / 1024
+    return proc.returncode, wall, rss
+
+
+def succeeded(script: str, report: Dict[str, Any], expected: int) -> int:
+    if script == "apply":
+        return sum(1 for r in report.get("results") or [] if r.get("success") is True)
+    if script == "create":
+        return sum(1 for r in report.get("creates") or [] if r.get("success") is True)
+    return expected
+
+
+def bench_one(
+    mock: mock_linear.MockLinear,
+    url: str,
+    script: str,
+    extra: List[str],
+    size: int,
+    workdir: str,
+    python: str,
+) -> Dict[str, Any]:
+    mock.seed(size)
+    export = mock.export()
+    export_path = os.path.join(workdir, "parent_issue_export.json")
+    patch_path = os.path.join(workdir, "groom_patch.json")
+    report_path = os.path.join(workdir, "report.json")
+    cache_dir = os.path.join(workdir, "local-cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    write_json(export_path, export)
+
+    if script == "export":
+        argv = [export["meta"]["parentIssueIdentifier"], "--out", export_path, "--cache-out", "", "--cache-dir", cache_dir]
+        changes = len(export["subIssues"])
+    elif script == "apply":
+        patch = apply_patch_for(export)
+        write_json(patch_path, patch)
+        argv = ["--patch", patch_path, "--export", export_path, "--out", report_path, "--cache-dir", cache_dir]
+        changes = len(patch["changes"])
+    else:
+        patch = create_patch_for(export, size)
+        write_json(patch_path, patch)
+        argv = ["--patch", patch_path, "--export", export_path, "--out", report_path, "--cache-dir", cache_dir]
+        changes = len(patch["createSubIssues"])
+
+    env = dict(os.environ, LINEAR_API_KEY="bench", LINEAR_GRAPHQL_ENDPOINT=url)
+    before = server_stats(url)["requests"]
+    code, wall, rss = run_script(
+        [python, os.path.join(SCRIPTS_DIR, SCRIPTS[script])] + argv + extra,
+        workdir, env, os.path.join(workdir, "output.log"),
+    )
+    stats = server_stats(url)
+
+    report: Dict[str, Any] = {}
+    if script != "export" and os.path.exists(report_path):
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    done = succeeded(script, report, changes) if code in (0, 1) else 0
+    return {
+        "script": script,
+        "args": extra,
+        "size": size,
+        "exitCode": code,
+        "changes": changes,
+        "succeeded": done,
+        "wallSeconds": round(wall, 4),
+        "changesPerSec": round(done / wall, 2) if wall > 0 else None,
+        "peakRssMb": round(rss, 1),
+        "requests": stats["requests"] - before,
+        "rateLimited": stats["rateLimited"],
+        "injectedErrors": stats["injectedErrors"],
+        "metrics": report.get("metrics"),
+    }
+
+
+def variant_name(result: Dict[str, Any]) -> str:
+    return " ".join([result["script"]] + list(result["args"]))
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[Tuple[str, int], Dict[str, float]]:
+    """Median changes/sec, wall time and peak RSS per (variant, size) across repeats."""
+    groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for r in results:
+        groups.setdefault((variant_name(r), r["size"]), []).append(r)
+    return {
+        key: {
+            "changesPerSec": statistics.median(r["changesPerSec"] or 0 for r in runs),
+            "wallSeconds": statistics.median(r["wallSeconds"] for r in runs),
+            "peakRssMb": max(r["peakRssMb"] for r in runs),
+        }
+        for key, runs in groups.items()
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'variant':<28} {'size':>6} {'wall s':>9} {'changes/s':>10} {'RSS MiB':>8}")
+    for (name, size), s in sorted(summarize(results).items(), key=lambda kv: (kv[0][0], kv[0][1])):
+        print(f"{name:<28} {size:>6} {s['wallSeconds']:>9.3f} {s['changesPerSec']:>10.1f} {s['peakRssMb']:>8.1f}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Print changes/sec against a baseline results file; False if anything regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = summarize(baseline.get("results") or [])
+    new = summarize(results)
+    ok = True
+    print(f"\nAgainst {baseline_path} ({(baseline.get('meta') or {}).get('commit')}):")
+    for key in sorted(new):
+        if key not in old or not old[key]["changesPerSec"]:
+            continue
+        before, after = old[key]["changesPerSec"], new[key]["changesPerSec"]
+        change = (after - before) / before
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{key[0]:<28} {key[1]:>6} {before:>10.1f} -> {after:>10.1f} changes/s ({change:+.0%}){flag}")
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the groombot scripts against a local mock Linear.")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated sub-issue counts, 10 to 5000 (default: {DEFAULT_SIZES})")
+    ap.add_argument("--variant", action="append", type=parse_variant, default=None,
+                    help="SCRIPT[:ARGS] to run, e.g. 'apply:--batch --workers 4' (repeatable; default: " + ", ".join(DEFAULT_VARIANTS) + ")")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per variant and size; the summary uses the median (default: 1)")
+    ap.add_argument("--out", default=None, help="Results file (default: bench/results/<UTC time>-<commit>.json)")
+    ap.add_argument("--compare", default=None, metavar="OLD.json", help="Compare changes/sec against an earlier results file")
+    ap.add_argument("--threshold", type=float, default=0.2, help="Allowed changes/sec drop in --compare before failing (default: 0.2 = 20%%)")
+    ap.add_argument("--keep", action="store_true", help="Keep each run's working directory (export, patch, report, output.log)")
+    mock_linear.add_profile_arguments(ap)
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    if any(s < 1 or s > 5000 for s in sizes):
+        print("ERROR: --sizes must be between 1 and 5000.")
+        return 2
+    variants = args.variant or [parse_variant(v) for v in DEFAULT_VARIANTS]
+
+    profile = mock_linear.profile_from_args(args)
+    mock = mock_linear.MockLinear(0)
+    server = mock_linear.serve(mock, profile)
+    url = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+
+    commit = git_commit()
+    started = dt.datetime.now(dt.timezone.utc)
+    results: List[Dict[str, Any]] = []
+    root = tempfile.mkdtemp(prefix="groombot-bench-")
+    try:
+        for size in sizes:
+            for script, extra in variants:
+                for rep in range(max(1, args.repeat)):
+                    workdir = os.path.join(root, f"{script}-{size}-{len(results)}")
+                    os.makedirs(workdir)
+                    result = bench_one(mock, url, script, extra, size, workdir, sys.executable)
+                    result["repeat"] = rep
+                    results.append(result)
+                    status = "ok" if result["exitCode"] == 0 else f"exit {result['exitCode']}"
+                    print(
+                        f"{variant_name(result):<28} size={size:<5} {result['wallSeconds']:.3f}s "
+                        f"{result['changesPerSec'] or 0:.1f} changes/s  {result['peakRssMb']:.1f} MiB  "
+                        f"{result['requests']} req  ({status})"
+                    )
+                    if result["exitCode"] != 0:
+                        print(f"  see {os.path.join(workdir, 'output.log')}" if args.keep else "  (re-run with --keep to inspect output.log)")
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{started.strftime('%Y%m%dT%H%M%SZ')}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    write_json(out, {
+        "meta": {
+            "startedAt": started.replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "network": profile.as_dict(),
+            "repeat": max(1, args.repeat),
+        },
+        "results": results,
+    })
+    print()
+    print_table(results)
+    print(f"\nWrote {out}")
+    if args.keep:
+        print(f"Run directories kept under {root}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
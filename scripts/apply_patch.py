@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 import argparse
 import datetime as dt
-import hashlib
 import json
 import os
 import sys
-import time
-from typing import Any, Dict, List, Optional
-import urllib.request
-
-LINEAR_ENDPOINT = "https://api.linear.app/graphql"
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from artifact_store import sha256_file, store_run
+from cache_store import CacheStore
+from context_pool import ThreadPoolExecutor
+from export_stream import ExportReader, open_export
+from journal import Journal, change_key
+from linear_batch import alias_errors, build_aliased_document, canonical_json, chunked
+from linear_client import LinearClient, get_client
+from metrics import CallWindow, write_textfile
+from patch_compiler import compile_for_parent, print_errors
+from rate_limit import TokenBucket
+from readback import annotate, print_summary, verify
+from retry_policy import request
+import tracing
+from tracing import traced
 
 MUTATION = """
 mutation IssueUpdate($id: String!, $input: IssueUpdateInput!) {
@@ -20,60 +30,75 @@ mutation IssueUpdate($id: String!, $input: IssueUpdateInput!) {
 }
 """
 
+UPDATE_SELECTION = "success issue { id identifier title updatedAt }"
+BATCH_UPDATE_SELECTION = "success issues { id identifier updatedAt }"
+
+QUERY_UPDATED_AT = """
+query IssuesUpdatedAt($ids: [ID!], $first: Int!) {
+  issues(filter: { id: { in: $ids } }, first: $first) {
+    nodes { id updatedAt }
+  }
+}
+"""
+
+# Linear caps issueBatchUpdate at 50 ids per call.
+BULK_UPDATE_MAX_IDS = 50
+DEFAULT_BATCH_SIZE = 20
+# Ids per stale-check query (Linear's max page size).
+STALE_CHECK_PAGE_SIZE = 250
+
+# Called with (change, result) pairs as soon as they finish, e.g. to checkpoint them.
+OnDone = Callable[[List[Tuple[Dict[str, Any], Dict[str, Any]]]], None]
+
+# Sentinel for update fields the export snapshot cannot answer (always sent).
+_UNKNOWN = object()
+
+# IssueUpdateInput fields that add/remove labels without replacing the whole set.
+LABEL_DELTA_FIELDS = ("addedLabelIds", "removedLabelIds")
+
 def utc_now() -> str:
     return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
+@traced("load_json")
 def load_json(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+@traced("save_json")
 def save_json(path: str, obj: Any) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2)
 
-def sha256_file(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
-def graphql_request(api_key: str, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
-    payload = json.dumps({"query": query, "variables": variables}).encode("utf-8")
-    req = urllib.request.Request(
-        LINEAR_ENDPOINT,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": api_key,
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        data = resp.read().decode("utf-8")
-        return json.loads(data)
-
-def backoff_sleep(attempt: int) -> None:
-    # simple exponential backoff with cap
-    delay = min(2 ** attempt, 16)
-    time.sleep(delay)
-
-def update_cache(cache_dir: str, export_data: Dict[str, Any], patch_data: Dict[str, Any], apply_report_path: str) -> None:
-    parent_issues_path = os.path.join(cache_dir, "groomed_parent_issues.json")
-    issues_path = os.path.join(cache_dir, "groomed_issues.json")
-
-    # load existing
-    parent_issues = load_json(parent_issues_path)
-    issues = load_json(issues_path)
-
-    parent_issue = export_data["parentIssue"]
+@traced("update_cache")
+def update_cache(cache_dir: str, export: ExportReader, patch_data: Dict[str, Any], apply_report_path: str, patch_sha256: str, json_mirror: bool = True, changes: Optional[List[Dict[str, Any]]] = None, verified: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    parent_issue = export.parent_issue
     parent_issue_identifier = parent_issue["identifier"]
     parent_issue_id = parent_issue["id"]
 
-    patch_hash = sha256_file(apply_report_path)  # tie cache to actual apply report
+    patch_hash = sha256_file(apply_report_path, cache_dir)  # tie cache to actual apply report
+
+    # record issue-level changes only for issues in patch
+    changed_by_id = {c["id"]: c for c in (patch_data.get("changes", []) if changes is None else changes)}
+
+    # One streaming pass over the export: sub-issue identifiers plus the "before" view of
+    # changed issues. Only the changed issues are kept (as compact IssueRecords).
+    export_by_id: Dict[str, Any] = {}
+    if parent_issue_id in changed_by_id:
+        export_by_id[parent_issue_id] = parent_issue
+    sub_issue_identifiers = []
+    for rec in export.iter_sub_issues():
+        sub_issue_identifiers.append(rec.identifier)
+        if rec.id in changed_by_id:
+            export_by_id[rec.id] = rec
+    # Sub-issues this patch created (create_sub_issues / execute_patch journal them under the
+    # same patch) were groomed in this run too, but are not in the pre-create export.
+    for entry in Journal(cache_dir, patch_sha256, "create").completed().values():
+        created = (entry["result"].get("created") or {}).get("identifier")
+        if created and created not in sub_issue_identifiers:
+            sub_issue_identifiers.append(created)
 
     # record parent_issue-level
-    parent_issues["parentIssues"].append({
+    parent_record = {
         "parentIssueId": parent_issue_id,
         "parentIssueIdentifier": parent_issue_identifier,
         "title": parent_issue["title"],
@@ -83,48 +108,461 @@ def update_cache(cache_dir: str, export_data: Dict[str, Any], patch_data: Dict[s
         "applyReportPath": os.path.relpath(apply_report_path, os.path.dirname(cache_dir)),
         "patchMeta": patch_data.get("meta", {}),
         "patchApplyReportSha256": patch_hash,
-        "issues": [ch.get("identifier") for ch in export_data.get("subIssues", [])],
+        "patchFileSha256": patch_sha256,
+        "issues": sub_issue_identifiers,
         "openQuestions": (patch_data.get("session") or {}).get("openQuestions", []),
         "decisions": (patch_data.get("session") or {}).get("decisions", []),
         "notes": (patch_data.get("meta") or {}).get("notes"),
-    })
-
-    # record issue-level changes only for issues in patch
-    changed_by_id = {c["id"]: c for c in patch_data.get("changes", [])}
-
-    # helper index of export issues
-    export_issues = [export_data["parentIssue"]] + export_data.get("subIssues", [])
-    export_by_id = {it["id"]: it for it in export_issues}
+    }
 
+    issue_records = []
     for issue_id, change in changed_by_id.items():
-        before = export_by_id.get(issue_id, {})
+        before = export_by_id.get(issue_id) or {}
         update = change.get("update", {})
         changed_fields = list(update.keys())
 
-        issues["issues"].append({
+        before_view = {k: before.get(k) for k in changed_fields}
+        # A label delta's "before" is the label set it was applied to.
+        for k in set(changed_fields) & set(LABEL_DELTA_FIELDS):
+            labels = snapshot_value(before, "labelIds") if before else []
+            before_view[k] = None if labels is _UNKNOWN else labels
+
+        # With a read-back, "after" is what Linear stored rather than what was sent. Label
+        # deltas stay as sent: the read-back returns the whole label set, which is not a delta
+        # (the check already confirmed the added labels are present and the removed absent).
+        after = update
+        if verified is not None and issue_id in verified:
+            after = {k: v if k in LABEL_DELTA_FIELDS else verified[issue_id].get(k, v) for k, v in update.items()}
+
+        issue_records.append({
             "id": issue_id,
             "identifier": change.get("identifier") or before.get("identifier"),
             "parentIssueIdentifier": parent_issue_identifier,
             "groomedAt": utc_now(),
             "appliedPatch": True,
             "changedFields": changed_fields,
-            "before": {k: before.get(k) for k in changed_fields},
-            "after": update,
+            "before": before_view,
+            "after": after,
+            "verified": None if verified is None else issue_id in verified,
             "notes": None,
+            "patchFileSha256": patch_sha256,
         })
 
-    save_json(parent_issues_path, parent_issues)
-    save_json(issues_path, issues)
-    print(f"Updated cache: {parent_issues_path}, {issues_path}")
+    # Re-applying the same patch replaces its records instead of appending duplicates.
+    with CacheStore(cache_dir) as store:
+        store.record_run(parent_record, issue_records, patch_sha256)
+        if json_mirror:
+            store.export_json()
+        print(f"Updated cache: {store.path}" + (" (+ JSON files)" if json_mirror else ""))
+
+def parse_ts(value: Optional[str]) -> Optional[dt.datetime]:
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def snapshot_value(issue: Any, field: str) -> Any:
+    """Value of an IssueUpdateInput field as recorded in the export, or _UNKNOWN."""
+    if field in ("title", "description", "priority", "estimate", "parentId"):
+        return issue.get(field)
+    if field == "stateId":
+        state = issue.get("state")
+        return state.get("id") if isinstance(state, dict) else _UNKNOWN
+    if field == "assigneeId":
+        assignee = issue.get("assignee")
+        return assignee.get("id") if isinstance(assignee, dict) else (None if assignee is None else _UNKNOWN)
+    if field == "labelIds":
+        labels = issue.get("labels") or []
+        if not all(isinstance(l, dict) and l.get("id") for l in labels):
+            return _UNKNOWN
+        return sorted(l["id"] for l in labels)
+    return _UNKNOWN
+
+def same_value(field: str, current: Any, wanted: Any) -> bool:
+    if current is _UNKNOWN:
+        return False
+    if field == "labelIds":
+        return isinstance(wanted, list) and current == sorted(wanted)
+    return current == wanted
+
+def label_delta(issue: Any, update: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Rewrite the label fields of `update` as added/removed ids against the export's labels.
+
+    A full `labelIds` set becomes `addedLabelIds`/`removedLabelIds`, so labels added in
+    Linear since the export are kept and identical deltas can share one issueBatchUpdate.
+    Delta fields are trimmed to what would change. Returns (update, label fields that turned
+    out to change nothing). Without exported label ids the update is returned unchanged.
+    """
+    if "labelIds" not in update and not any(k in update for k in LABEL_DELTA_FIELDS):
+        return update, []
+    current = snapshot_value(issue, "labelIds")
+    if current is _UNKNOWN:
+        return update, []
+    have = set(current)
+    if "labelIds" in update:
+        wanted = set(update["labelIds"] or [])
+        added, removed = wanted - have, have - wanted
+    else:
+        added = set(update.get("addedLabelIds") or []) - have
+        removed = set(update.get("removedLabelIds") or []) & have
+    out = {k: v for k, v in update.items() if k != "labelIds" and k not in LABEL_DELTA_FIELDS}
+    if added:
+        out["addedLabelIds"] = sorted(added)
+    if removed:
+        out["removedLabelIds"] = sorted(removed)
+    unchanged = [k for k in ("labelIds",) + LABEL_DELTA_FIELDS if k in update] if not (added or removed) else []
+    return out, unchanged
+
+def fetch_updated_at(client: LinearClient, ids: List[str]) -> Tuple[Dict[str, str], int]:
+    """Current updatedAt for `ids` (one query per STALE_CHECK_PAGE_SIZE ids); returns (map, requests)."""
+    current: Dict[str, str] = {}
+    requests = 0
+    for part in chunked(ids, STALE_CHECK_PAGE_SIZE):
+        resp = request(client, QUERY_UPDATED_AT, {"ids": part, "first": len(part)})
+        requests += 1
+        if resp.get("errors"):
+            raise RuntimeError("Stale check failed: " + json.dumps(resp["errors"]))
+        for node in ((resp.get("data") or {}).get("issues") or {}).get("nodes") or []:
+            current[node["id"]] = node.get("updatedAt")
+    return current, requests
+
+def own_updated_at(entries: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """Latest updatedAt our own successful updates left on each issue, from "apply" journal entries.
+
+    Entries journaled before mutations recorded updatedAt fall back to the time they were written.
+    """
+    written: Dict[str, str] = {}
+    for entry in entries:
+        result = entry.get("result") or {}
+        if result.get("success") is not True or result.get("skipped") or not result.get("id"):
+            continue
+        stamp = parse_ts(result.get("updatedAt") or entry.get("at"))
+        seen = parse_ts(written.get(result["id"]))
+        if stamp and (seen is None or stamp > seen):
+            written[result["id"]] = result.get("updatedAt") or entry["at"]
+    return written
+
+@traced("plan_changes")
+def plan_changes(
+    client: LinearClient,
+    changes: List[Dict[str, Any]],
+    export: ExportReader,
+    on_stale: str = "skip",
+    written: Optional[Dict[str, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, Any]], Dict[str, Any]]:
+    """Pre-apply planning: drop no-op fields/changes, then check the rest for staleness.
+
+    1. Fields whose value already matches the export snapshot are removed from each update,
+       and label sets become added/removed label ids (`label_delta`); changes left with no
+       fields are not sent.
+    2. The current updatedAt of every remaining issue is fetched in bulk. An issue is stale
+       if Linear's updatedAt is newer than the one in the export (or than meta.exportedAt
+       when the snapshot has none), i.e. someone edited it after the export. For issues in
+       `written` (updatedAt left by an earlier run of this patch, see `own_updated_at`) that
+       later timestamp is the baseline, so a resumed run does not flag its own writes.
+    3. Stale changes are skipped (`on_stale="skip"`) or sent anyway and only flagged
+       (`on_stale="apply"`).
+
+    Returns (changes to send, pre-filled results by original index, plan summary).
+    Sent changes carry "_index", their position in `changes`.
+    """
+    snapshot = export.find(c["id"] for c in changes)
+    exported_at = parse_ts(export.meta.get("exportedAt"))
+
+    send: List[Dict[str, Any]] = []
+    done: Dict[int, Dict[str, Any]] = {}
+    noop_fields: Dict[str, List[str]] = {}
+    for i, c in enumerate(changes):
+        update = c.get("update", {})
+        issue = snapshot.get(c["id"])
+        if issue is not None:
+            same = [k for k, v in update.items() if same_value(k, snapshot_value(issue, k), v)]
+            update, unchanged_labels = label_delta(issue, {k: v for k, v in update.items() if k not in same})
+            same += unchanged_labels
+            if same:
+                noop_fields[c.get("identifier") or c["id"]] = same
+        if not update:
+            done[i] = {"identifier": c.get("identifier"), "id": c["id"], "success": True, "error": None, "skipped": "noop"}
+            continue
+        send.append(dict(c, update=update, _index=i))
+
+    stale: List[Dict[str, Any]] = []
+    not_found: List[str] = []
+    check_requests = 0
+    ids = list(dict.fromkeys(c["id"] for c in send))
+    if ids:
+        current, check_requests = fetch_updated_at(client, ids)
+        stale_ids = set()
+        for issue_id in ids:
+            remote = current.get(issue_id)
+            if remote is None:
+                not_found.append(issue_id)
+                continue
+            issue = snapshot.get(issue_id)
+            baseline = parse_ts(issue.get("updatedAt")) if issue is not None else None
+            baseline = baseline or exported_at
+            own = parse_ts((written or {}).get(issue_id))
+            if own and (baseline is None or own > baseline):
+                baseline = own
+            remote_ts = parse_ts(remote)
+            if baseline and remote_ts and remote_ts > baseline:
+                stale_ids.add(issue_id)
+                stale.append({
+                    "id": issue_id,
+                    "identifier": issue.get("identifier") if issue is not None else None,
+                    "exportedUpdatedAt": issue.get("updatedAt") if issue is not None else None,
+                    "currentUpdatedAt": remote,
+                })
+        if stale_ids and on_stale == "skip":
+            kept = []
+            for c in send:
+                if c["id"] in stale_ids:
+                    done[c["_index"]] = {
+                        "identifier": c.get("identifier"),
+                        "id": c["id"],
+                        "success": False,
+                        "error": "Skipped: issue changed in Linear after the export. Re-export and re-groom it.",
+                        "skipped": "stale",
+                    }
+                else:
+                    kept.append(c)
+            send = kept
+
+    plan = {
+        "changes": len(changes),
+        "noopChanges": sum(1 for r in done.values() if r.get("skipped") == "noop"),
+        "noopFields": noop_fields,
+        "staleCheck": {
+            "exportedAt": export.meta.get("exportedAt"),
+            "checked": len(ids),
+            "requests": check_requests,
+            "onStale": on_stale,
+            "stale": stale,
+            "notFound": not_found,
+        },
+        "toSend": len(send),
+    }
+    return send, done, plan
+
+def request_count(changes: List[Dict[str, Any]], batch: bool, batch_size: int) -> int:
+    """Mutation round trips needed for `changes` in the chosen apply mode."""
+    if batch:
+        return len(list(chunked(plan_update_units(changes), batch_size)))
+    return len(changes)
+
+def apply_one(client: LinearClient, c: Dict[str, Any]) -> Dict[str, Any]:
+    issue_id = c["id"]
+    identifier = c.get("identifier")
+    update = c.get("update", {})
+
+    success = False
+    err: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    try:
+        resp = request(client, MUTATION, {"id": issue_id, "input": update})
+        if "errors" in resp:
+            err = json.dumps(resp["errors"])
+            success = False
+        else:
+            out = resp.get("data", {}).get("issueUpdate", {})
+            success = bool(out.get("success"))
+            if not success:
+                err = f"Mutation returned success=false for {identifier or issue_id}"
+            updated_at = (out.get("issue") or {}).get("updatedAt")
+    except Exception as e:
+        err = str(e)
+
+    result = {"identifier": identifier, "id": issue_id, "success": success, "error": err}
+    if success and updated_at:
+        result["updatedAt"] = updated_at
+    return result
+
+def dry_run_results(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    results = []
+    for c in changes:
+        print(f"[DRY RUN] Would update {c.get('identifier') or c['id']}: {list(c.get('update', {}).keys())}")
+        results.append({"identifier": c.get("identifier"), "id": c["id"], "success": None, "error": None, "dryRun": True})
+    return results
 
-def main() -> int:
+def apply_sequential(client: LinearClient, changes: List[Dict[str, Any]], dry_run: bool, on_done: Optional[OnDone] = None) -> List[Dict[str, Any]]:
+    if dry_run:
+        return dry_run_results(changes)
+    results = []
+    for c in changes:
+        results.append(apply_one(client, c))
+        if on_done:
+            on_done([(c, results[-1])])
+    return results
+
+def apply_concurrent(client: LinearClient, changes: List[Dict[str, Any]], workers: int, dry_run: bool, on_done: Optional[OnDone] = None) -> List[Dict[str, Any]]:
+    """Apply changes on a bounded thread pool.
+
+    Changes for the same issue id run in order on one worker; independent issues run in
+    parallel. Results are returned in the original order of `changes`.
+    """
+    if dry_run:
+        return dry_run_results(changes)
+
+    lanes: Dict[str, List[int]] = {}
+    for i, c in enumerate(changes):
+        lanes.setdefault(c["id"], []).append(i)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(changes)
+
+    def run_lane(indexes: List[int]) -> None:
+        for i in indexes:
+            results[i] = apply_one(client, changes[i])
+            if on_done:
+                on_done([(changes[i], results[i])])  # type: ignore[list-item]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for f in [pool.submit(run_lane, idx) for idx in lanes.values()]:
+            f.result()
+    return results  # type: ignore[return-value]
+
+def plan_update_units(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group changes with identical `update` payloads into bulk units.
+
+    Returns units in order of first appearance. Each unit is
+    {"kind": "single"|"bulk", "indexes": [positions in changes]}.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, c in enumerate(changes):
+        groups.setdefault(canonical_json(c.get("update", {})), []).append(i)
+
+    units: List[Dict[str, Any]] = []
+    for indexes in groups.values():
+        for part in chunked(indexes, BULK_UPDATE_MAX_IDS):
+            units.append({"kind": "bulk" if len(part) > 1 else "single", "indexes": part})
+    return units
+
+@traced("send_update_batch")
+def send_update_batch(client: LinearClient, changes: List[Dict[str, Any]], units: List[Dict[str, Any]], request_no: int) -> Dict[int, Dict[str, Any]]:
+    """Send one aliased document for `units`; return results keyed by change index."""
+    fields = []
+    for n, unit in enumerate(units):
+        alias = f"u{n}"
+        unit["alias"] = alias
+        update = changes[unit["indexes"][0]].get("update", {})
+        if unit["kind"] == "bulk":
+            fields.append({
+                "alias": alias,
+                "field": "issueBatchUpdate",
+                "selection": BATCH_UPDATE_SELECTION,
+                "args": {
+                    "ids": ("[UUID!]!", [changes[i]["id"] for i in unit["indexes"]]),
+                    "input": ("IssueUpdateInput!", update),
+                },
+            })
+        else:
+            fields.append({
+                "alias": alias,
+                "field": "issueUpdate",
+                "selection": UPDATE_SELECTION,
+                "args": {
+                    "id": ("String!", changes[unit["indexes"][0]]["id"]),
+                    "input": ("IssueUpdateInput!", update),
+                },
+            })
+    query, variables = build_aliased_document("mutation", "ApplyPatchBatch", fields)
+    aliases = [u["alias"] for u in units]
+
+    resp: Optional[Dict[str, Any]] = None
+    transport_err: Optional[str] = None
+    try:
+        resp = request(client, query, variables)
+    except Exception as e:
+        transport_err = str(e)
+
+    errors = alias_errors(resp, aliases) if resp is not None else {a: transport_err for a in aliases}
+    data = (resp or {}).get("data") or {}
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for unit in units:
+        alias = unit["alias"]
+        payload = data.get(alias) or {}
+        err = errors[alias]
+        success = err is None and bool(payload.get("success"))
+        if unit["kind"] == "bulk":
+            updated = {n.get("id"): n.get("updatedAt") for n in payload.get("issues") or []}
+        else:
+            updated = {(payload.get("issue") or {}).get("id"): (payload.get("issue") or {}).get("updatedAt")}
+        for i in unit["indexes"]:
+            c = changes[i]
+            change_err = err
+            if not success and change_err is None:
+                change_err = f"Mutation returned success=false for {c.get('identifier') or c['id']}"
+            out[i] = {
+                "identifier": c.get("identifier"),
+                "id": c["id"],
+                "success": success,
+                "error": change_err,
+                "batch": {"request": request_no, "alias": alias, "bulk": unit["kind"] == "bulk"},
+            }
+            if success and updated.get(c["id"]):
+                out[i]["updatedAt"] = updated[c["id"]]
+    return out
+
+def apply_batched(client: LinearClient, changes: List[Dict[str, Any]], batch_size: int, dry_run: bool, workers: int = 1, on_done: Optional[OnDone] = None) -> List[Dict[str, Any]]:
+    """Apply changes with aliased mutations, `batch_size` fields per request.
+
+    Identical `update` payloads are sent once through issueBatchUpdate.
+    Requests run on `workers` threads unless an issue id appears in more than one change
+    (then they run in order). Results are returned in the original order of `changes`.
+    """
+    units = plan_update_units(changes)
+    requests = list(chunked(units, batch_size))
+
+    if dry_run:
+        results = dry_run_results(changes)
+        bulk = sum(1 for u in units if u["kind"] == "bulk")
+        print(f"[DRY RUN] {len(changes)} change(s) -> {len(units)} mutation(s) ({bulk} bulk) in {len(requests)} request(s)")
+        return results
+
+    if len({c["id"] for c in changes}) < len(changes):
+        workers = 1
+
+    def send(request_units: List[Dict[str, Any]], request_no: int) -> Dict[int, Dict[str, Any]]:
+        out = send_update_batch(client, changes, request_units, request_no)
+        if on_done:
+            on_done([(changes[i], r) for i, r in out.items()])
+        return out
+
+    by_index: Dict[int, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(send, request_units, request_no)
+            for request_no, request_units in enumerate(requests, start=1)
+        ]
+        for f in futures:
+            by_index.update(f.result())
+    return [by_index[i] for i in range(len(changes))]
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--patch", required=True, help="Path to groom_patch.json")
     parser.add_argument("--export", required=True, help="Path to parent_issue_export.json (snapshot used for diff/cache)")
     parser.add_argument("--out", default=None, help="Path to apply_report.json output (default: alongside --export)")
     parser.add_argument("--cache-dir", default="local-cache", help="Cache directory (default: local-cache)")
     parser.add_argument("--dry-run", action="store_true", help="Do not apply changes; only print what would change")
-    args = parser.parse_args()
+    parser.add_argument("--batch", action="store_true", help="Send updates as aliased mutations; identical updates (e.g. the same label delta) become one issueBatchUpdate")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Mutations per request in --batch mode (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--no-json-cache", action="store_true", help="Only update the SQLite cache; skip rewriting the JSON cache files")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent requests (default: 1 = sequential)")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Cap on requests/second (default: 0 = only pace on Linear rate-limit headers)")
+    parser.add_argument("--on-stale", choices=("skip", "apply"), default="skip", help="Issues edited in Linear after the export: skip them (default) or apply anyway and only flag them")
+    parser.add_argument("--no-plan", action="store_true", help="Send the patch as-is: no no-op elimination, label deltas or stale check")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore this patch's checkpoint journal and send every change again")
+    parser.add_argument("--verify", action="store_true", help="Read the updated issues back afterwards (one query per 100 issues), report mismatches and cache what Linear stored")
+    parser.add_argument("--no-compile", action="store_true", help="Skip resolving names and validating the patch against the team metadata and the export")
+    parser.add_argument("--metrics-textfile-dir", default=None, metavar="DIR", help="Write run metrics to DIR/groombot_apply_patch.prom for node-exporter (default: $GROOMBOT_METRICS_TEXTFILE_DIR)")
+    tracing.add_arguments(parser)
+    args = parser.parse_args(argv)
+    tracing.start_from_args(args, "apply_patch")
 
     # Default apply_report.json to the same directory as the export file
     if args.out is None:
@@ -139,70 +577,134 @@ def main() -> int:
         print("ERROR: LINEAR_API_KEY not set. Run: source ~/.zshrc", file=sys.stderr)
         return 2
 
+    client = get_client(api_key)
+    window = CallWindow(client)
     patch_data = load_json(args.patch)
-    export_data = load_json(args.export)
+    export = open_export(args.export)
 
     changes: List[Dict[str, Any]] = patch_data.get("changes", [])
     if not changes:
         print("No changes found in patch. Nothing to do.")
         return 0
 
-    results = []
-    for c in changes:
-        issue_id = c["id"]
-        identifier = c.get("identifier")
-        update = c.get("update", {})
-
-        if args.dry_run:
-            print(f"[DRY RUN] Would update {identifier or issue_id}: {list(update.keys())}")
-            results.append({"identifier": identifier, "id": issue_id, "success": None, "error": None, "dryRun": True})
-            continue
-
-        success = False
-        err: Optional[str] = None
-
-        # retry loop
-        for attempt in range(0, 5):
-            try:
-                resp = graphql_request(api_key, MUTATION, {"id": issue_id, "input": update})
-                if "errors" in resp:
-                    err = json.dumps(resp["errors"])
-                    success = False
-                else:
-                    out = resp.get("data", {}).get("issueUpdate", {})
-                    success = bool(out.get("success"))
-                    if not success:
-                        err = f"Mutation returned success=false for {identifier or issue_id}"
-                break
-            except Exception as e:
-                err = str(e)
-                backoff_sleep(attempt)
-                continue
-
-        results.append({"identifier": identifier, "id": issue_id, "success": success, "error": err})
+    # Resolve stateName/labelNames/assigneeName and reject unknown ids or fields before sending anything.
+    if not args.no_compile:
+        compiled, errors, _ = compile_for_parent(client, {"meta": patch_data.get("meta") or {}, "changes": changes}, export, args.cache_dir)
+        if errors:
+            print_errors(errors)
+            return 1
+        changes = compiled["changes"]
+
+    if client.rate_limiter is None:
+        client.rate_limiter = TokenBucket(rate=args.max_rps, capacity=max(1, args.workers))
+
+    # Hashes are memoized in the cache dir (not touched by --dry-run).
+    hash_cache = None if args.dry_run else args.cache_dir
+    patch_sha256 = sha256_file(args.patch, hash_cache)
+    keys = [change_key(i, c) for i, c in enumerate(changes)]
+
+    # Checkpoint journal: a rerun of the same patch file skips changes that already succeeded.
+    journal = Journal(None if args.dry_run else args.cache_dir, patch_sha256, "apply")
+    if args.no_resume:
+        journal.reset()
+    resumed = {k for k in journal.completed() if k in set(keys)}
+    todo_index = [i for i, k in enumerate(keys) if k not in resumed]
+    todo = [changes[i] for i in todo_index]
+    if resumed:
+        print(f"Resuming: {len(resumed)} change(s) already applied by an earlier run of this patch; {len(todo)} left.")
+
+    def record(pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        journal.record({
+            "key": keys[todo_index[c["_index"]]],
+            "result": r,
+            "sent": c.get("update", {}) if r.get("skipped") != "noop" else {},
+        } for c, r in pairs)
+
+    plan: Optional[Dict[str, Any]] = None
+    if args.no_plan:
+        send = [dict(c, _index=i) for i, c in enumerate(todo)]
+    else:
+        send, planned, plan = plan_changes(client, todo, export, args.on_stale,
+                                           own_updated_at(journal.entries.values()))
+        record([(dict(todo[i], _index=i), r) for i, r in planned.items()])
+        without_plan = request_count(todo, args.batch, args.batch_size)
+        with_plan = request_count(send, args.batch, args.batch_size) + plan["staleCheck"]["requests"]
+        plan.update({"requestsWithoutPlan": without_plan, "requestsPlanned": with_plan, "roundTripsAvoided": without_plan - with_plan})
+        stale = plan["staleCheck"]["stale"]
+        print(
+            f"Plan: {len(todo)} change(s), {plan['noopChanges']} already applied, {len(stale)} stale "
+            f"({'skipped' if args.on_stale == 'skip' else 'flagged'}), {len(send)} to send; "
+            f"{without_plan} -> {with_plan} request(s)"
+        )
+        for item in stale:
+            print(f"WARNING: {item['identifier'] or item['id']} changed in Linear at {item['currentUpdatedAt']} (export had {item['exportedUpdatedAt'] or 'no updatedAt'})")
+
+    if args.batch:
+        sent = apply_batched(client, send, args.batch_size, args.dry_run, args.workers, record)
+    elif args.workers > 1:
+        sent = apply_concurrent(client, send, args.workers, args.dry_run, record)
+    else:
+        sent = apply_sequential(client, send, args.dry_run, record)
+    if args.dry_run:
+        record(list(zip(send, sent)))
+
+    # Report and cache are built from the journal, so resumed changes keep their earlier result.
+    results: List[Dict[str, Any]] = []
+    for k in keys:
+        r = dict(journal.entries[k]["result"])
+        if k in resumed:
+            r["resumed"] = True
+        results.append(r)
+
+    verification: Optional[Dict[str, Any]] = None
+    if args.verify and not args.dry_run:
+        expected: Dict[str, Dict[str, Any]] = {}
+        for k, c in zip(keys, changes):
+            if journal.entries[k]["result"].get("success") is True:
+                expected.setdefault(c["id"], {"id": c["id"], "identifier": c.get("identifier"), "expected": {}})["expected"].update(journal.entries[k].get("sent") or {})
+        verification = verify(client, list(expected.values()))
+        print_summary(verification)
+        annotate(results, verification, lambda r: r.get("id"))
 
     report = {
         "meta": {
             "appliedAt": utc_now(),
-            "parentIssueIdentifier": (patch_data.get("meta") or {}).get("parentIssueIdentifier") or export_data.get("meta", {}).get("parentIssueIdentifier"),
-            "parentIssueId": (patch_data.get("meta") or {}).get("parentIssueId") or export_data.get("meta", {}).get("parentIssueId"),
-            "patchFileSha256": sha256_file(args.patch),
-            "exportFileSha256": sha256_file(args.export),
+            "parentIssueIdentifier": (patch_data.get("meta") or {}).get("parentIssueIdentifier") or export.meta.get("parentIssueIdentifier"),
+            "parentIssueId": (patch_data.get("meta") or {}).get("parentIssueId") or export.meta.get("parentIssueId"),
+            "patchFileSha256": patch_sha256,
+            "exportFileSha256": sha256_file(args.export, hash_cache),
             "dryRun": bool(args.dry_run),
+            "batchSize": args.batch_size if args.batch else None,
+            "workers": args.workers,
+            "resumed": len(resumed),
+            "journal": os.path.relpath(journal.path) if journal.path else None,
         },
+        "plan": plan,
+        "verification": {k: v for k, v in verification.items() if k != "stored"} if verification else None,
+        "metrics": window.summary(),
         "results": results,
     }
     save_json(args.out, report)
     print(f"Wrote {args.out}")
+    write_textfile(args.metrics_textfile_dir, "apply_patch", report["metrics"], all(r["success"] is True for r in results))
 
     if not args.dry_run:
+        print(client.usage_summary())
+        store_run(args.cache_dir, "apply", report["meta"]["parentIssueIdentifier"], report["meta"]["parentIssueId"],
+                  {"patch": args.patch, "export": args.export, "report": args.out})
         # only update cache if all applied successfully
         failed = [r for r in results if r["success"] is not True]
         if failed:
             print("WARNING: Some updates failed; cache will NOT be updated automatically.")
-            print("Fix failures, re-run apply, then update cache.")
+            print("Fix failures, then re-run apply: changes that already succeeded are skipped.")
+            return 1
+        # Record what was actually sent: no-op fields are dropped from the before/after view.
+        applied = [dict(c, update=journal.entries[k].get("sent", {})) for k, c in zip(keys, changes)]
+        update_cache(args.cache_dir, export, patch_data, args.out, patch_sha256, not args.no_json_cache, applied,
+                     verification["stored"] if verification else None)
+        if verification and (verification["mismatches"] or verification["missing"]):
+            print("WARNING: Linear stored something other than the patch for some issues; see verification in the report.")
             return 1
-        update_cache(args.cache_dir, export_data, patch_data, args.out)
 
     return 0
 
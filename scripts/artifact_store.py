@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Content-addressed store for exports, patches and reports (local-cache/artifacts/).
+
+Why:
+- `input-output-data/apply_report.json` and `create_report.json` were overwritten on every
+  run, so the history of a parent was lost unless someone copied the files by hand.
+- The patch, export and report were re-hashed with SHA-256 in several places per run.
+
+What this module does:
+- Stores each artifact once under `objects/<first 2 hex>/<sha256>`; the same export or
+  patch used by several runs (or sessions) is kept a single time.
+- Keeps an index (`index.sqlite3`) of parent identifier -> run -> artifact hashes, where a
+  run is one invocation of export, apply, create or the architecture check.
+- `sha256_file()` memoizes hashes keyed by (device, inode, size, mtime), in memory and in
+  the index, so an unchanged file is hashed once. A file modified within two seconds of
+  being hashed is re-hashed next time, since its mtime cannot tell two writes apart.
+
+CLI:
+  python3 ./scripts/artifact_store.py runs ENG-123
+  python3 ./scripts/artifact_store.py show 42
+  python3 ./scripts/artifact_store.py cat <sha256> > apply_report.json
+  python3 ./scripts/artifact_store.py hash input-output-data/groom_patch.json
+"""
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import tracing
+from tracing import traced
+
+ARTIFACTS_DIR = "artifacts"
+INDEX_NAME = "index.sqlite3"
+DEFAULT_CACHE_DIR = "local-cache"
+# mtime resolution margin: entries hashed this soon after the file's mtime are not trusted.
+RACY_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+  path TEXT PRIMARY KEY,
+  device INTEGER NOT NULL,
+  inode INTEGER NOT NULL,
+  size INTEGER NOT NULL,
+  mtime_ns INTEGER NOT NULL,
+  sha256 TEXT NOT NULL,
+  hashed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+  sha256 TEXT PRIMARY KEY,
+  size INTEGER NOT NULL,
+  stored_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  parent_issue_identifier TEXT,
+  parent_issue_id TEXT,
+  kind TEXT NOT NULL,
+  created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_artifacts (
+  run_id INTEGER NOT NULL REFERENCES runs (id),
+  role TEXT NOT NULL,
+  sha256 TEXT NOT NULL REFERENCES objects (sha256),
+  name TEXT,
+  PRIMARY KEY (run_id, role)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_parent ON runs (parent_issue_identifier, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_parent_id ON runs (parent_issue_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_run_artifacts_sha ON run_artifacts (sha256);
+"""
+
+# Real path -> ((device, inode, size, mtime_ns), hashed_at, sha256) for this process.
+_memo: Dict[str, Tuple[Tuple[int, int, int, int], float, str]] = {}
+_memo_lock = threading.Lock()
+
+
+def _utc_now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def _hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _connect(cache_dir: str) -> sqlite3.Connection:
+    root = os.path.join(cache_dir, ARTIFACTS_DIR)
+    os.makedirs(root, exist_ok=True)
+    db = sqlite3.connect(os.path.join(root, INDEX_NAME), timeout=30)
+    db.executescript(SCHEMA)
+    return db
+
+
+@traced("sha256_file")
+def sha256_file(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> str:
+    """SHA-256 of a file, reusing an earlier hash while (device, inode, size, mtime) match.
+
+    `cache_dir=None` keeps the memo in memory only.
+    """
+    key = os.path.realpath(path)
+    st = os.stat(key)
+    sig = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def trusted(hashed_at: float) -> bool:
+        return hashed_at - st.st_mtime_ns / 1e9 >= RACY_SECONDS
+
+    with _memo_lock:
+        hit = _memo.get(key)
+    if hit and hit[0] == sig and trusted(hit[1]):
+        return hit[2]
+
+    db = _connect(cache_dir) if cache_dir else None
+    try:
+        if db is not None:
+            row = db.execute(
+                "SELECT device, inode, size, mtime_ns, sha256, hashed_at FROM file_hashes WHERE path = ?", (key,)
+            ).fetchone()
+            if row and tuple(row[:4]) == sig and trusted(row[5]):
+                with _memo_lock:
+                    _memo[key] = (sig, row[5], row[4])
+                return row[4]
+
+        hashed_at = time.time()
+        digest = _hash(key)
+        with _memo_lock:
+            _memo[key] = (sig, hashed_at, digest)
+        if db is not None:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO file_hashes (path, device, inode, size, mtime_ns, sha256, hashed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key,) + sig + (digest, hashed_at),
+                )
+        return digest
+    finally:
+        if db is not None:
+            db.close()
+
+
+class ArtifactStore:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self.root = os.path.join(cache_dir, ARTIFACTS_DIR)
+        self.db = _connect(cache_dir)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "ArtifactStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def put(self, path: str) -> str:
+        """Store a file's content (once) and return its SHA-256."""
+        digest = sha256_file(path, self.cache_dir)
+        dest = self.object_path(digest)
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO objects (sha256, size, stored_at) VALUES (?, ?, ?)",
+                (digest, os.path.getsize(dest), _utc_now()),
+            )
+        return digest
+
+    def record_run(
+        self,
+        kind: str,
+        parent_issue_identifier: Optional[str],
+        parent_issue_id: Optional[str],
+        artifacts: Dict[str, Optional[str]],
+    ) -> Tuple[int, Dict[str, str]]:
+        """Store `artifacts` ({role: path}; missing paths are skipped) as one run.
+
+        Returns (run id, {role: sha256}).
+        """
+        hashes = {role: self.put(path) for role, path in artifacts.items() if path and os.path.exists(path)}
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO runs (parent_issue_identifier, parent_issue_id, kind, created_at) VALUES (?, ?, ?, ?)",
+                (parent_issue_identifier, parent_issue_id, kind, _utc_now()),
+            )
+            run_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO run_artifacts (run_id, role, sha256, name) VALUES (?, ?, ?, ?)",
+                [(run_id, role, digest, os.path.basename(artifacts[role] or "")) for role, digest in hashes.items()],
+            )
+        return run_id, hashes
+
+    def runs(self, parent_key: str) -> List[Dict[str, Any]]:
+        """Runs for a parent (identifier or UUID), newest first, with their artifact hashes."""
+        rows = self.db.execute(
+            "SELECT id, parent_issue_identifier, parent_issue_id, kind, created_at FROM runs "
+            "WHERE parent_issue_identifier = ? OR parent_issue_id = ? ORDER BY created_at DESC, id DESC",
+            (parent_key, parent_key),
+        ).fetchall()
+        return [self._run(row) for row in rows]
+
+    def run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        row = self.db.execute(
+            "SELECT id, parent_issue_identifier, parent_issue_id, kind, created_at FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        return self._run(row) if row else None
+
+    def _run(self, row: Tuple[Any, ...]) -> Dict[str, Any]:
+        artifacts = {
+            role: {"sha256": sha, "name": name}
+            for role, sha, name in self.db.execute(
+                "SELECT role, sha256, name FROM run_artifacts WHERE run_id = ? ORDER BY role", (row[0],)
+            )
+        }
+        return {
+            "run": row[0],
+            "parentIssueIdentifier": row[1],
+            "parentIssueId": row[2],
+            "kind": row[3],
+            "createdAt": row[4],
+            "artifacts": artifacts,
+        }
+
+
+@traced("store_run")
+def store_run(
+    cache_dir: str,
+    kind: str,
+    parent_issue_identifier: Optional[str],
+    parent_issue_id: Optional[str],
+    artifacts: Dict[str, Optional[str]],
+) -> Optional[int]:
+    """Record a run for the scripts; a storage failure is reported but never fails the run."""
+    try:
+        with ArtifactStore(cache_dir) as store:
+            run_id, _ = store.record_run(kind, parent_issue_identifier, parent_issue_id, artifacts)
+    except (OSError, sqlite3.Error) as e:
+        print(f"WARNING: could not store run artifacts in {cache_dir}: {e}", file=sys.stderr)
+        return None
+    print(f"Stored {kind} run {run_id} artifacts in {os.path.join(cache_dir, ARTIFACTS_DIR)}")
+    return run_id
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Query the content-addressed artifact store.")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Cache directory (default: local-cache)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_runs = sub.add_parser("runs", help="List runs for a parent issue identifier or id, newest first")
+    p_runs.add_argument("parent")
+    p_show = sub.add_parser("show", help="Show one run and its artifact hashes")
+    p_show.add_argument("run", type=int)
+    p_cat = sub.add_parser("cat", help="Write a stored artifact to stdout")
+    p_cat.add_argument("sha256")
+    p_hash = sub.add_parser("hash", help="Print a file's SHA-256 (memoized)")
+    p_hash.add_argument("path")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "artifact_store")
+
+    if args.cmd == "hash":
+        print(sha256_file(args.path, args.cache_dir))
+        return 0
+
+    with ArtifactStore(args.cache_dir) as store:
+        if args.cmd == "runs":
+            runs = store.runs(args.parent)
+            if not runs:
+                print(f"No runs recorded for {args.parent}.")
+                return 1
+            for r in runs:
+                files = ", ".join(f"{role}={a['sha256'][:12]}" for role, a in r["artifacts"].items())
+                print(f"{r['run']:>5}  {r['createdAt']}  {r['kind']:<12}  {files}")
+        elif args.cmd == "show":
+            r = store.run(args.run)
+            if r is None:
+                print(f"No run {args.run}.")
+                return 1
+            print(json.dumps(r, indent=2))
+        elif args.cmd == "cat":
+            path = store.object_path(args.sha256)
+            if not os.path.exists(path):
+                print(f"No artifact {args.sha256}.", file=sys.stderr)
+                return 1
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Indexed grooming cache backed by SQLite (local-cache/groombot.sqlite3).
+
+Why:
+- `update_cache()` used to load both JSON cache files, append, and rewrite them with
+  indent=2 on every apply. Cost grew with history and re-runs piled up duplicates.
+
+What this module does:
+- Stores parent-issue and issue grooming records in SQLite with indexes on issue id,
+  identifier and parentIssueIdentifier, so "when was ENG-124 last groomed and what
+  changed" is a single index lookup.
+- Deduplicates: re-applying the same patch replaces its records instead of appending.
+- Imports the existing JSON cache files once, the first time the store is opened.
+- Exports the JSON files (same shape as before) for agents and older tooling.
+
+CLI:
+  python3 ./scripts/cache_store.py last ENG-124
+  python3 ./scripts/cache_store.py parent ENG-123
+  python3 ./scripts/cache_store.py export-json
+  python3 ./scripts/cache_store.py migrate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional
+
+import tracing
+from tracing import traced
+
+DB_NAME = "groombot.sqlite3"
+PARENT_ISSUES_JSON = "groomed_parent_issues.json"
+ISSUES_JSON = "groomed_issues.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+CREATE TABLE IF NOT EXISTS parent_issues (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_key TEXT NOT NULL,
+  parent_issue_id TEXT,
+  parent_issue_identifier TEXT,
+  groomed_at TEXT,
+  record TEXT NOT NULL,
+  UNIQUE (parent_issue_id, run_key)
+);
+CREATE TABLE IF NOT EXISTS issues (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_key TEXT NOT NULL,
+  id TEXT NOT NULL,
+  identifier TEXT,
+  parent_issue_identifier TEXT,
+  groomed_at TEXT,
+  record TEXT NOT NULL,
+  UNIQUE (id, run_key)
+);
+CREATE INDEX IF NOT EXISTS idx_parent_issues_identifier ON parent_issues (parent_issue_identifier, groomed_at);
+CREATE INDEX IF NOT EXISTS idx_parent_issues_id ON parent_issues (parent_issue_id, groomed_at);
+CREATE INDEX IF NOT EXISTS idx_issues_id ON issues (id, groomed_at);
+CREATE INDEX IF NOT EXISTS idx_issues_identifier ON issues (identifier, groomed_at);
+CREATE INDEX IF NOT EXISTS idx_issues_parent ON issues (parent_issue_identifier, groomed_at);
+"""
+
+
+def run_key_for(record: Dict[str, Any]) -> str:
+    """Dedup key for a record: the patch it came from, else a content hash.
+
+    Records written since the store exists carry `patchFileSha256`; older JSON records fall
+    back to a hash of their content without the timestamp.
+    """
+    if record.get("patchFileSha256"):
+        return record["patchFileSha256"]
+    body = {k: v for k, v in record.items() if k != "groomedAt"}
+    return "legacy:" + hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CacheStore:
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, DB_NAME)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+        if self._meta("migratedFromJson") is None:
+            self.migrate_from_json()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "CacheStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # -- writes ---------------------------------------------------------------
+
+    def add_parent_issue(self, record: Dict[str, Any], run_key: str) -> None:
+        self.db.execute(
+            "INSERT INTO parent_issues (run_key, parent_issue_id, parent_issue_identifier, groomed_at, record) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (parent_issue_id, run_key) DO UPDATE SET "
+            "parent_issue_identifier = excluded.parent_issue_identifier, "
+            "groomed_at = excluded.groomed_at, record = excluded.record",
+            (run_key, record.get("parentIssueId"), record.get("parentIssueIdentifier"), record.get("groomedAt"), json.dumps(record)),
+        )
+
+    def add_issue(self, record: Dict[str, Any], run_key: str) -> None:
+        self.db.execute(
+            "INSERT INTO issues (run_key, id, identifier, parent_issue_identifier, groomed_at, record) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id, run_key) DO UPDATE SET "
+            "identifier = excluded.identifier, parent_issue_identifier = excluded.parent_issue_identifier, "
+            "groomed_at = excluded.groomed_at, record = excluded.record",
+            (run_key, record["id"], record.get("identifier"), record.get("parentIssueIdentifier"), record.get("groomedAt"), json.dumps(record)),
+        )
+
+    @traced("CacheStore.record_run")
+    def record_run(self, parent_record: Dict[str, Any], issue_records: List[Dict[str, Any]], run_key: str) -> None:
+        """Store one apply run atomically."""
+        with self.db:
+            self.add_parent_issue(parent_record, run_key)
+            for rec in issue_records:
+                self.add_issue(rec, run_key)
+
+    def migrate_from_json(self) -> int:
+        """Import the legacy JSON cache files once. Returns the number of records read."""
+        count = 0
+        with self.db:
+            for name, key, add in (
+                (PARENT_ISSUES_JSON, "parentIssues", self.add_parent_issue),
+                (ISSUES_JSON, "issues", self.add_issue),
+            ):
+                path = os.path.join(self.cache_dir, name)
+                if not os.path.exists(path):
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    records = (json.load(f) or {}).get(key) or []
+                for rec in records:
+                    if key == "issues" and not rec.get("id"):
+                        continue
+                    add(rec, run_key_for(rec))
+                    count += 1
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migratedFromJson', ?)", (str(count),))
+        return count
+
+    # -- reads ----------------------------------------------------------------
+
+    def last_groomed_issue(self, key: str) -> Optional[Dict[str, Any]]:
+        """Latest record for an issue, by UUID or identifier (e.g. ENG-124)."""
+        row = self.db.execute(
+            "SELECT record FROM issues WHERE id = ? ORDER BY groomed_at DESC, seq DESC LIMIT 1", (key,)
+        ).fetchone() or self.db.execute(
+            "SELECT record FROM issues WHERE identifier = ? ORDER BY groomed_at DESC, seq DESC LIMIT 1", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def last_groomed_parent(self, key: str) -> Optional[Dict[str, Any]]:
+        """Latest parent-issue record, by UUID or identifier."""
+        row = self.db.execute(
+            "SELECT record FROM parent_issues WHERE parent_issue_id = ? ORDER BY groomed_at DESC, seq DESC LIMIT 1", (key,)
+        ).fetchone() or self.db.execute(
+            "SELECT record FROM parent_issues WHERE parent_issue_identifier = ? ORDER BY groomed_at DESC, seq DESC LIMIT 1", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def issues_for_parent(self, parent_issue_identifier: str) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            "SELECT record FROM issues WHERE parent_issue_identifier = ? ORDER BY groomed_at, seq", (parent_issue_identifier,)
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_parent_issues(self) -> Iterator[Dict[str, Any]]:
+        for (rec,) in self.db.execute("SELECT record FROM parent_issues ORDER BY seq"):
+            yield json.loads(rec)
+
+    def iter_issues(self) -> Iterator[Dict[str, Any]]:
+        for (rec,) in self.db.execute("SELECT record FROM issues ORDER BY seq"):
+            yield json.loads(rec)
+
+    # -- JSON mirror ----------------------------------------------------------
+
+    @traced("CacheStore.export_json")
+    def export_json(self) -> None:
+        """Write groomed_parent_issues.json / groomed_issues.json in the legacy shape."""
+        for name, key, rows in (
+            (PARENT_ISSUES_JSON, "parentIssues", self.iter_parent_issues()),
+            (ISSUES_JSON, "issues", self.iter_issues()),
+        ):
+            path = os.path.join(self.cache_dir, name)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({key: list(rows)}, f, indent=2)
+            os.replace(tmp, path)
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Query or maintain the grooming cache.")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory (default: local-cache)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_last = sub.add_parser("last", help="Show the latest grooming record for an issue id or identifier")
+    p_last.add_argument("key")
+    p_parent = sub.add_parser("parent", help="Show the latest record for a parent issue and its groomed issues")
+    p_parent.add_argument("key")
+    sub.add_parser("export-json", help="Rewrite the JSON cache files from the store")
+    sub.add_parser("migrate", help="Re-import the JSON cache files into the store")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "cache_store")
+
+    with CacheStore(args.cache_dir) as store:
+        if args.cmd == "last":
+            rec = store.last_groomed_issue(args.key)
+            if rec is None:
+                print(f"{args.key} has not been groomed.")
+                return 1
+            print(json.dumps(rec, indent=2))
+        elif args.cmd == "parent":
+            rec = store.last_groomed_parent(args.key)
+            if rec is None:
+                print(f"{args.key} has not been groomed.")
+                return 1
+            rec = dict(rec, groomedIssues=store.issues_for_parent(rec["parentIssueIdentifier"]))
+            print(json.dumps(rec, indent=2))
+        elif args.cmd == "export-json":
+            store.export_json()
+            print(f"Wrote {PARENT_ISSUES_JSON} and {ISSUES_JSON} in {args.cache_dir}")
+        elif args.cmd == "migrate":
+            count = store.migrate_from_json()
+            print(f"Imported {count} record(s) into {store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
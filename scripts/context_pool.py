@@ -0,0 +1,20 @@
+"""ThreadPoolExecutor whose tasks see the submitting thread's contextvars.
+
+Why:
+- `concurrent.futures.ThreadPoolExecutor` runs tasks in the pool thread's own context, so
+  per-job state set with contextvars (the spool worker's job log) was lost as soon as a
+  script fanned work out to a pool.
+
+What this module does:
+- `ThreadPoolExecutor.submit()` (and so `map()`) runs each task in a copy of the
+  submitter's context. A job's pool threads, and any pools they start, inherit it.
+"""
+
+import concurrent.futures
+import contextvars
+from typing import Any, Callable
+
+
+class ThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> "concurrent.futures.Future[Any]":
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
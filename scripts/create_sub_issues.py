@@ -7,29 +7,23 @@ This script is intentionally separate from apply_patch.py:
 """
 
 import argparse
-import hashlib
 import json
 import os
 import sys
 import time
-from typing import Any, Dict, List, Optional
-import urllib.request
-
-LINEAR_ENDPOINT = "https://api.linear.app/graphql"
-
-QUERY_PARENT_TEAM = """
-query ParentIssueTeam($id: String!) {
-  issue(id: $id) {
-    id
-    identifier
-    team {
-      id
-      key
-      name
-    }
-  }
-}
-"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from artifact_store import sha256_file, store_run
+from export_stream import open_export
+from journal import Journal
+from linear_batch import alias_errors, build_aliased_document, chunked
+from linear_client import LinearClient, get_client
+from metrics import CallWindow, write_textfile
+from readback import annotate, print_summary, verify
+from retry_policy import request
+from team_metadata import MetadataError, load_parent_metadata
+import tracing
+from tracing import traced
 
 MUTATION_ISSUE_CREATE = """
 mutation IssueCreate($input: IssueCreateInput!) {
@@ -45,47 +39,134 @@ mutation IssueCreate($input: IssueCreateInput!) {
 }
 """
 
-def sha256_file(path: str) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+CREATE_SELECTION = "success issue { id identifier title url }"
+DEFAULT_BATCH_SIZE = 10
 
+# (success, error, created issue)
+CreateOutcome = Tuple[bool, Optional[str], Optional[Dict[str, Any]]]
+
+@traced("load_json")
 def load_json(path: str) -> Dict[str, Any]:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+@traced("save_json")
 def save_json(path: str, data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
-def graphql_request(api_key: str, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
-    payload = json.dumps({"query": query, "variables": variables}).encode("utf-8")
-    req = urllib.request.Request(
-        LINEAR_ENDPOINT,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": api_key,
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-def backoff_sleep(attempt: int) -> None:
-    # 0, 1, 2, 4, 8 seconds (cap)
-    time.sleep(min(8, 2 ** max(0, attempt - 1)))
+def build_create_input(item: Dict[str, Any], title: str, team_id: str, parent_issue_id: str) -> Dict[str, Any]:
+    input_obj: Dict[str, Any] = {
+        "title": title,
+        "teamId": team_id,
+        "parentId": parent_issue_id,
+    }
 
-def main() -> int:
+    if item.get("description") is not None:
+        input_obj["description"] = item.get("description")
+    if item.get("estimate") is not None:
+        input_obj["estimate"] = item.get("estimate")
+    return input_obj
+
+def verify_targets(create_items: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]], parent_issue_id: str) -> List[Dict[str, Any]]:
+    """readback.verify() targets for the sub-issues that were created from `create_items`."""
+    targets = []
+    for item, r in zip(create_items, results):
+        created = (r or {}).get("created") or {}
+        if r and r.get("success") is True and created.get("id"):
+            expected = build_create_input(item, (item.get("title") or "").strip(), "", parent_issue_id)
+            expected.pop("teamId")
+            targets.append({"id": created["id"], "identifier": created.get("identifier"), "expected": expected})
+    return targets
+
+def create_one(client: LinearClient, input_obj: Dict[str, Any]) -> CreateOutcome:
+    success = False
+    err: Optional[str] = None
+    created: Optional[Dict[str, Any]] = None
+
+    # Not idempotent: only re-sent when Linear cannot have created the issue.
+    try:
+        out = request(client, MUTATION_ISSUE_CREATE, {"input": input_obj}, idempotent=False)
+        if out.get("errors"):
+            err = json.dumps(out["errors"])
+            success = False
+        else:
+            data = (out.get("data") or {}).get("issueCreate") or {}
+            success = bool(data.get("success"))
+            created = data.get("issue")
+            if not success:
+                err = "Mutation returned success=false"
+    except Exception as e:
+        err = str(e)
+
+    return success, err, created
+
+def create_batched(
+    client: LinearClient,
+    pending: List[Tuple[int, Dict[str, Any]]],
+    batch_size: int,
+    on_done: Optional[Callable[[Dict[int, CreateOutcome]], None]] = None,
+) -> Dict[int, CreateOutcome]:
+    """Create issues with aliased issueCreate fields, `batch_size` per request.
+
+    Aliased creates (rather than issueBatchCreate) keep per-item success/error, so one bad
+    item does not fail the whole chunk.
+    """
+    outcomes: Dict[int, CreateOutcome] = {}
+    for chunk in chunked(pending, batch_size):
+        fields = [
+            {
+                "alias": f"c{idx}",
+                "field": "issueCreate",
+                "selection": CREATE_SELECTION,
+                "args": {"input": ("IssueCreateInput!", input_obj)},
+            }
+            for idx, input_obj in chunk
+        ]
+        query, variables = build_aliased_document("mutation", "CreateSubIssuesBatch", fields)
+        aliases = [f["alias"] for f in fields]
+
+        resp: Optional[Dict[str, Any]] = None
+        transport_err: Optional[str] = None
+        try:
+            resp = request(client, query, variables, idempotent=False)
+        except Exception as e:
+            transport_err = str(e)
+
+        errors = alias_errors(resp, aliases) if resp is not None else {a: transport_err for a in aliases}
+        data = (resp or {}).get("data") or {}
+        chunk_outcomes: Dict[int, CreateOutcome] = {}
+        for idx, _ in chunk:
+            alias = f"c{idx}"
+            payload = data.get(alias) or {}
+            err = errors[alias]
+            success = err is None and bool(payload.get("success"))
+            if not success and err is None:
+                err = "Mutation returned success=false"
+            chunk_outcomes[idx] = (success, err, payload.get("issue"))
+        outcomes.update(chunk_outcomes)
+        if on_done:
+            on_done(chunk_outcomes)
+    return outcomes
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
     p = argparse.ArgumentParser()
     p.add_argument("--patch", required=True, help="Path to groom_patch.json")
     p.add_argument("--export", required=True, help="Path to parent_issue_export.json")
     p.add_argument("--out", default=None, help="Path to create_report.json output (default: alongside --patch)")
     p.add_argument("--dry-run", action="store_true", help="Do not create; only print what would be created")
-    args = p.parse_args()
+    p.add_argument("--batch", action="store_true", help="Create sub-issues with aliased issueCreate mutations in chunks")
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Creates per request in --batch mode (default: {DEFAULT_BATCH_SIZE})")
+    p.add_argument("--cache-dir", default="local-cache", help="Cache directory for team metadata, journals and run artifacts (default: local-cache)")
+    p.add_argument("--refresh", action="store_true", help="Refetch parent team metadata even if cached")
+    p.add_argument("--verify", action="store_true", help="Read the created sub-issues back afterwards and report fields Linear stored differently")
+    p.add_argument("--no-resume", action="store_true", help="Ignore this patch's checkpoint journal and create every item again")
+    p.add_argument("--metrics-textfile-dir", default=None, metavar="DIR", help="Write run metrics to DIR/groombot_create_sub_issues.prom for node-exporter (default: $GROOMBOT_METRICS_TEXTFILE_DIR)")
+    tracing.add_arguments(p)
+    args = p.parse_args(argv)
+    tracing.start_from_args(args, "create_sub_issues")
 
     if args.out is None:
         patch_dir = os.path.dirname(os.path.abspath(args.patch)) or "."
@@ -96,8 +177,10 @@ def main() -> int:
         print("ERROR: LINEAR_API_KEY is not set.")
         return 2
 
+    client = get_client(api_key)
+    window = CallWindow(client)
     patch_data = load_json(args.patch)
-    export_data = load_json(args.export)
+    export_meta = open_export(args.export).meta
 
     create_items: List[Dict[str, Any]] = patch_data.get("createSubIssues") or []
     if not create_items:
@@ -106,127 +189,135 @@ def main() -> int:
 
     parent_issue_id = (
         (patch_data.get("meta") or {}).get("parentIssueId")
-        or (export_data.get("meta") or {}).get("parentIssueId")
+        or export_meta.get("parentIssueId")
     )
     parent_issue_identifier = (
         (patch_data.get("meta") or {}).get("parentIssueIdentifier")
-        or (export_data.get("meta") or {}).get("parentIssueIdentifier")
+        or export_meta.get("parentIssueIdentifier")
     )
 
     if not parent_issue_id:
         print("ERROR: parentIssueId is missing. It must be present in patch.meta or export.meta.")
         return 1
 
-    # Fetch team info for the parent issue so we can create in the correct team.
-    team_id: Optional[str] = None
-    team_key: Optional[str] = None
-    team_name: Optional[str] = None
-
-    resp = graphql_request(api_key, QUERY_PARENT_TEAM, {"id": parent_issue_id})
-    if resp.get("errors"):
-        print("ERROR: Linear API returned errors while fetching parent issue team:")
-        print(json.dumps(resp["errors"], indent=2))
-        return 1
-
-    issue = (resp.get("data") or {}).get("issue")
-    if not issue:
-        print("ERROR: Could not load parent issue by id. Check parentIssueId and API key/workspace.")
+    # Team info for the parent issue so we can create in the correct team (cached per session).
+    try:
+        metadata = load_parent_metadata(client, parent_issue_id, args.cache_dir, refresh=args.refresh)
+    except MetadataError as e:
+        print(f"ERROR: {e}")
+        if e.errors:
+            print(json.dumps(e.errors, indent=2))
         return 1
 
-    team = (issue.get("team") or {})
-    team_id = team.get("id")
-    team_key = team.get("key")
-    team_name = team.get("name")
-
-    if not team_id:
-        print("ERROR: Could not resolve teamId for the parent issue.")
-        return 1
-
-    # Create loop
-    results: List[Dict[str, Any]] = []
+    team = metadata["team"]
+    team_id: Optional[str] = team.get("id")
+    team_key: Optional[str] = team.get("key")
+    team_name: Optional[str] = team.get("name")
+
+    # Checkpoint journal: a rerun of the same patch file never creates an item twice.
+    hash_cache = None if args.dry_run else args.cache_dir
+    patch_sha256 = sha256_file(args.patch, hash_cache)
+    journal = Journal(None if args.dry_run else args.cache_dir, patch_sha256, "create")
+    if args.no_resume:
+        journal.reset()
+    completed = journal.completed()
+    if completed:
+        print(f"Resuming: {len(completed)} sub-issue(s) already created by an earlier run of this patch.")
+
+    # Validate + build inputs once; team/parent are shared by every create.
+    results: List[Optional[Dict[str, Any]]] = [None] * len(create_items)
+    pending: List[Tuple[int, Dict[str, Any]]] = []
 
     for idx, item in enumerate(create_items, start=1):
+        if str(idx) in completed:
+            results[idx - 1] = dict(completed[str(idx)]["result"], resumed=True)
+            continue
+
         title = (item.get("title") or "").strip()
         if not title:
-            results.append({"index": idx, "success": False, "error": "Missing required field: title"})
+            results[idx - 1] = {"index": idx, "success": False, "error": "Missing required field: title"}
             continue
 
-        input_obj: Dict[str, Any] = {
-            "title": title,
-            "teamId": team_id,
-            "parentId": parent_issue_id,
-        }
-
-        if item.get("description") is not None:
-            input_obj["description"] = item.get("description")
-        if item.get("estimate") is not None:
-            input_obj["estimate"] = item.get("estimate")
-
         split_from = item.get("splitFromIdentifier")
 
         if args.dry_run:
             print(f"[DRY RUN] Would create sub-issue under {parent_issue_identifier or parent_issue_id}: {title}")
-            results.append({
+            results[idx - 1] = {
                 "index": idx,
                 "success": None,
                 "dryRun": True,
                 "title": title,
                 "splitFromIdentifier": split_from,
                 "created": None
-            })
+            }
             continue
 
-        success = False
-        err: Optional[str] = None
-        created: Optional[Dict[str, Any]] = None
-
-        for attempt in range(0, 5):
-            try:
-                out = graphql_request(api_key, MUTATION_ISSUE_CREATE, {"input": input_obj})
-                if out.get("errors"):
-                    err = json.dumps(out["errors"])
-                    success = False
-                else:
-                    data = (out.get("data") or {}).get("issueCreate") or {}
-                    success = bool(data.get("success"))
-                    created = data.get("issue")
-                    if not success:
-                        err = "Mutation returned success=false"
-                break
-            except Exception as e:
-                err = str(e)
-                backoff_sleep(attempt)
-                continue
-
-        results.append({
-            "index": idx,
-            "success": success,
-            "error": err,
-            "title": title,
-            "splitFromIdentifier": split_from,
-            "created": created,
-        })
+        pending.append((idx, build_create_input(item, title, team_id, parent_issue_id)))
+
+    inputs = dict(pending)
+
+    def record(outcomes: Dict[int, CreateOutcome]) -> None:
+        journal.record({
+            "key": str(idx),
+            "result": {
+                "index": idx,
+                "success": success,
+                "error": err,
+                "title": inputs[idx]["title"],
+                "splitFromIdentifier": create_items[idx - 1].get("splitFromIdentifier"),
+                "created": created,
+            },
+        } for idx, (success, err, created) in outcomes.items())
+
+    if args.batch:
+        create_batched(client, pending, args.batch_size, record)
+    else:
+        for idx, input_obj in pending:
+            record({idx: create_one(client, input_obj)})
+
+    # Report is built from the journal.
+    for idx, _ in pending:
+        results[idx - 1] = journal.entries[str(idx)]["result"]
+
+    verification: Optional[Dict[str, Any]] = None
+    if args.verify and not args.dry_run:
+        verification = verify(client, verify_targets(create_items, results, parent_issue_id))
+        print_summary(verification)
+        annotate(results, verification, lambda r: (r.get("created") or {}).get("id"))
 
     report = {
         "meta": {
             "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "parentIssueIdentifier": parent_issue_identifier or issue.get("identifier"),
+            "parentIssueIdentifier": parent_issue_identifier or metadata["issue"].get("identifier"),
             "parentIssueId": parent_issue_id,
             "team": {"id": team_id, "key": team_key, "name": team_name},
-            "patchFileSha256": sha256_file(args.patch),
-            "exportFileSha256": sha256_file(args.export),
+            "patchFileSha256": patch_sha256,
+            "exportFileSha256": sha256_file(args.export, hash_cache),
             "dryRun": bool(args.dry_run),
+            "batchSize": args.batch_size if args.batch else None,
+            "resumed": len(completed),
+            "journal": os.path.relpath(journal.path) if journal.path else None,
         },
+        "verification": {k: v for k, v in verification.items() if k != "stored"} if verification else None,
+        "metrics": window.summary(),
         "creates": results,
     }
 
     save_json(args.out, report)
     print(f"Wrote {args.out}")
+    write_textfile(args.metrics_textfile_dir, "create_sub_issues", report["metrics"], not any(r.get("success") is False for r in results))
+    print(client.usage_summary())
+    if not args.dry_run:
+        store_run(args.cache_dir, "create", report["meta"]["parentIssueIdentifier"], parent_issue_id,
+                  {"patch": args.patch, "export": args.export, "report": args.out})
 
     failed = [r for r in results if r.get("success") is False]
     if failed:
         print("WARNING: Some creations failed. See create_report.json for details.")
         return 1
+    if verification and (verification["mismatches"] or verification["missing"]):
+        print("WARNING: Some created sub-issues differ from the patch; see verification in create_report.json.")
+        return 1
 
     return 0
 
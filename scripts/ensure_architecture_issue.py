@@ -11,62 +11,67 @@ What this script does:
 3) If missing, searches the project's **Issues** for an "Architecture Definition" issue (fallback).
 4) If both are missing, it can create a **Project Document** from a local file (optional).
 
+Steps 1-3 are one GraphQL request: the parent issue, the project's matching documents and
+its matching issues come back in the same document.
+
+`--all-projects` checks every project in the workspace instead (read-only): projects come
+from the project directory cache, are checked `--batch-size` per request on `--workers`
+threads, and the results go to one consolidated report.
+
 Notes:
 - Storing `architecture.md` in Linear Project Resources (Documents) is the preferred method.
 """
 
 import argparse
+import datetime as dt
 import json
 import os
 import sys
-import time
-from typing import Any, Dict, Optional
-import urllib.request
-import urllib.error
-
-
-QUERY_PARENT_CONTEXT = """
-query ParentIssueContext($id: String!) {
-  issue(id: $id) {
+from typing import Any, Dict, List, Optional, Tuple
+
+from artifact_store import store_run
+from context_pool import ThreadPoolExecutor
+from export_stream import open_export
+from linear_batch import alias_errors, build_aliased_document, chunked
+from linear_client import LinearClient, get_client
+from metrics import CallWindow, write_textfile
+from project_directory import ProjectDirectory, ProjectDirectoryError
+from retry_policy import request
+import tracing
+from tracing import traced
+
+
+# Both anchor lookups for one project; $title and $needle are declared by the enclosing query.
+ANCHOR_SELECTION = (
+    "id name "
+    "documents(filter: { title: { eq: $title } }) { nodes { id title } } "
+    "issues(filter: { title: { containsIgnoreCase: $needle } }, first: 20) { nodes { id identifier title } }"
+)
+
+QUERY_ARCH_ANCHOR_FOR_PARENT = """
+query ArchitectureAnchorForParent($parentId: String!, $title: String!, $needle: String!) {
+  issue(id: $parentId) {
     id
     identifier
     team { id key name }
-    project { id name }
+    project { %s }
   }
 }
-"""
+""" % ANCHOR_SELECTION
 
-QUERY_PROJECTS = """
-query Projects($first: Int!) {
-  projects(first: $first) {
-    nodes { id name }
+QUERY_ARCH_ANCHOR_FOR_PROJECT = """
+query ArchitectureAnchorForProject($parentId: String!, $projectId: String!, $title: String!, $needle: String!) {
+  issue(id: $parentId) {
+    id
+    identifier
+    team { id key name }
   }
+  project(id: $projectId) { %s }
 }
-"""
+""" % ANCHOR_SELECTION
 
-QUERY_FIND_ARCH_DOC = """
-query FindArchitectureDoc($projectId: String!, $title: String!) {
-  project(id: $projectId) {
-    documents(filter: { title: { eq: $title } }) {
-      nodes { id title }
-    }
-  }
-}
-"""
-
-QUERY_FIND_ARCH_ISSUE = """
-query FindArchitectureIssue($projectId: ID!, $needle: String!) {
-  issues(
-    filter: {
-      project: { id: { eq: $projectId } }
-      title: { containsIgnoreCase: $needle }
-    }
-    first: 20
-  ) {
-    nodes { id identifier title }
-  }
-}
-"""
+DEFAULT_OUT = "./input-output-data/architecture_report.json"
+DEFAULT_SWEEP_OUT = "./input-output-data/architecture_sweep_report.json"
 
 MUTATION_DOCUMENT_CREATE = """
 mutation DocumentCreate($input: DocumentCreateInput!) {
@@ -77,119 +82,213 @@ mutation DocumentCreate($input: DocumentCreateInput!) {
 }
 """
 
-def load_json(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
+@traced("save_json")
 def save_json(path: str, data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
 
-def graphql_request(api_key: str, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
-    body = json.dumps({"query": query, "variables": variables}).encode("utf-8")
-    req = urllib.request.Request(
-        "https://api.linear.app/graphql",
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": api_key,
-        },
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        print(f"HTTP Error {e.code}: {e.reason}", file=sys.stderr)
-        print(e.read().decode("utf-8"), file=sys.stderr)
-        raise
-
-
-def resolve_project_id(api_key: str, project_id: Optional[str], project_name: Optional[str]) -> Optional[Dict[str, str]]:
+def resolve_project_id(
+    client: LinearClient,
+    project_id: Optional[str],
+    project_name: Optional[str],
+    cache_dir: str = "local-cache",
+    refresh: bool = False,
+) -> Optional[Dict[str, str]]:
     if project_id:
         return {"id": project_id, "name": project_name or ""}
 
     if not project_name:
         return None
 
-    resp = graphql_request(api_key, QUERY_PROJECTS, {"first": 250})
-    if resp.get("errors"):
-        raise RuntimeError("Could not list projects: " + json.dumps(resp["errors"]))
+    # Served from local-cache/projects.json; an exact name wins, then a unique substring match.
+    try:
+        found = ProjectDirectory(client, cache_dir).resolve(project_name, refresh=refresh)
+    except ProjectDirectoryError as e:
+        raise RuntimeError(str(e))
+    project = found["project"]
+    if project:
+        return {"id": project["id"], "name": project["name"]}
+
+    if found["candidates"]:
+        print(f"Project name '{project_name}' is ambiguous or inexact. Closest projects:")
+        for p in found["candidates"]:
+            print(f"  {p['name']}  ({p['match']}, score {p['score']})  --project-id {p['id']}")
+    return None
 
-    nodes = ((resp.get("data") or {}).get("projects") or {}).get("nodes") or []
-    # case-insensitive exact match first, then contains match
-    lname = project_name.strip().lower()
-    for p in nodes:
-        if (p.get("name") or "").strip().lower() == lname:
-            return {"id": p.get("id"), "name": p.get("name")}
 
-    for p in nodes:
-        if lname in ((p.get("name") or "").lower()):
-            return {"id": p.get("id"), "name": p.get("name")}
+def find_anchor(project: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """("document" | "issue" | None, node) for a project selected with ANCHOR_SELECTION.
+
+    A document wins over a legacy issue.
+    """
+    docs = (project.get("documents") or {}).get("nodes") or []
+    if docs:
+        return "document", docs[0]
+    issues = (project.get("issues") or {}).get("nodes") or []
+    if issues:
+        return "issue", issues[0]
+    return None, None
+
+
+def check_projects(client: LinearClient, projects: List[Dict[str, Any]], title: str, needle: str) -> List[Dict[str, Any]]:
+    """Check the architecture anchor of several projects in one aliased query."""
+    fields = [
+        {"alias": f"p{i}", "field": "project", "selection": ANCHOR_SELECTION, "args": {"id": ("String!", p["id"])}}
+        for i, p in enumerate(projects)
+    ]
+    aliases = [f["alias"] for f in fields]
+    query, variables = build_aliased_document(
+        "query", "ArchitectureSweep", fields, shared={"title": ("String!", title), "needle": ("String!", needle)}
+    )
+    try:
+        resp = request(client, query, variables)
+    except Exception as e:
+        resp = {"errors": [{"message": str(e)}]}
+    errors = alias_errors(resp, aliases)
+    data = resp.get("data") or {}
+
+    results = []
+    for alias, p in zip(aliases, projects):
+        row: Dict[str, Any] = {"id": p["id"], "name": p.get("name") or "", "foundType": None, "found": None, "error": None}
+        node = data.get(alias)
+        if node:
+            row["name"] = node.get("name") or row["name"]
+            row["foundType"], row["found"] = find_anchor(node)
+            row["action"] = {"document": "found", "issue": "found_legacy"}.get(row["foundType"] or "", "missing")
+        else:
+            row["action"] = "error"
+            row["error"] = errors[alias] or "Project not found (archived or deleted since the project directory was refreshed)."
+        results.append(row)
+    return results
+
+
+def sweep(args: argparse.Namespace, client: LinearClient, window: CallWindow) -> int:
+    """--all-projects: check every project's anchor and write one consolidated report."""
+    try:
+        directory = ProjectDirectory(client, args.cache_dir)
+        directory.ensure_fresh(args.refresh)
+    except ProjectDirectoryError as e:
+        print(f"ERROR: {e}")
+        return 1
+    projects = sorted(directory.projects.values(), key=lambda p: (p["name"].lower(), p["id"]))
+    batches = list(chunked(projects, args.batch_size))
 
-    return None
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = [row for rows in pool.map(lambda b: check_projects(client, b, args.doc_title, args.issue_needle), batches) for row in rows]
 
+    summary: Dict[str, int] = {"projects": len(results), "found": 0, "found_legacy": 0, "missing": 0, "error": 0}
+    for row in results:
+        summary[row["action"]] += 1
 
-def main() -> int:
+    out = args.out or DEFAULT_SWEEP_OUT
+    report: Dict[str, Any] = {
+        "meta": {
+            "generatedAt": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+            "docTitle": args.doc_title,
+            "issueNeedle": args.issue_needle,
+            "batchSize": args.batch_size,
+            "workers": args.workers,
+            "requests": len(batches),
+        },
+        "summary": summary,
+        "projects": results,
+        "metrics": window.summary(),
+    }
+    save_json(out, report)
+    write_textfile(args.metrics_textfile_dir, "ensure_architecture_issue", report["metrics"], summary["error"] == 0)
+    store_run(args.cache_dir, "architecture_sweep", None, None, {"report": out})
+
+    for row in results:
+        if row["action"] == "missing":
+            print(f"MISSING  {row['name']}  ({row['id']})")
+        elif row["action"] == "error":
+            print(f"ERROR    {row['name']}  ({row['id']}): {row['error']}")
+    print(
+        f"Checked {summary['projects']} projects in {len(batches)} requests: {summary['found']} document, "
+        f"{summary['found_legacy']} legacy issue, {summary['missing']} missing, {summary['error']} errors. Report: {out}"
+    )
+    if summary["error"]:
+        return 1
+    return 2 if summary["missing"] else 0
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--export", default="./input-output-data/parent_issue_export.json", help="Path to parent_issue_export.json")
     ap.add_argument("--project-id", default=None, help="Linear project UUID (optional if parent issue has a project)")
     ap.add_argument("--project-name", default=None, help="Project name to resolve to an id (optional)")
+    ap.add_argument("--all-projects", action="store_true", help="Check every project in the workspace (read-only) and write one consolidated report")
+    ap.add_argument("--batch-size", type=int, default=10, help="--all-projects: projects checked per request (default: 10)")
+    ap.add_argument("--workers", type=int, default=4, help="--all-projects: concurrent requests (default: 4)")
     ap.add_argument("--doc-title", default="architecture.md", help="Exact document title to search for or create")
     ap.add_argument("--issue-needle", default="Architecture", help="Search needle for finding an existing fallback architecture issue")
     ap.add_argument("--architecture-file", default=None, help="Path to architecture.md to insert into Linear if missing")
     ap.add_argument("--dry-run", action="store_true", help="Do not create; only report")
-    ap.add_argument("--out", default="./input-output-data/architecture_report.json", help="Where to write the report JSON")
-    args = ap.parse_args()
+    ap.add_argument("--out", default=None, help=f"Where to write the report JSON (default: {DEFAULT_OUT}, or {DEFAULT_SWEEP_OUT} with --all-projects)")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory for the project directory and run artifacts (default: local-cache)")
+    ap.add_argument("--refresh", action="store_true", help="Refetch the project directory even if cached")
+    ap.add_argument("--metrics-textfile-dir", default=None, metavar="DIR", help="Write run metrics to DIR/groombot_ensure_architecture_issue.prom for node-exporter (default: $GROOMBOT_METRICS_TEXTFILE_DIR)")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "ensure_architecture_issue")
+    if args.all_projects and (args.project_id or args.project_name or args.architecture_file):
+        ap.error("--all-projects cannot be combined with --project-id, --project-name or --architecture-file")
 
     api_key = os.environ.get("LINEAR_API_KEY", "").strip()
     if not api_key:
         print("ERROR: LINEAR_API_KEY is not set.")
         return 2
 
-    export_data = load_json(args.export)
-    parent_issue_id = (export_data.get("meta") or {}).get("parentIssueId")
+    client = get_client(api_key)
+    window = CallWindow(client)
+    if args.all_projects:
+        return sweep(args, client, window)
+
+    args.out = args.out or DEFAULT_OUT
+    export_meta = open_export(args.export).meta
+    parent_issue_id = export_meta.get("parentIssueId")
     if not parent_issue_id:
         print("ERROR: export.meta.parentIssueId is missing. Run export_parent_issue.sh first.")
         return 2
 
-    # Load parent issue context (team + project)
-    ctx_resp = graphql_request(api_key, QUERY_PARENT_CONTEXT, {"id": parent_issue_id})
-    if ctx_resp.get("errors"):
-        print("ERROR: Linear API returned errors while fetching parent issue context:")
-        print(json.dumps(ctx_resp["errors"], indent=2))
-        return 1
-
-    issue = (ctx_resp.get("data") or {}).get("issue") or {}
-    team = issue.get("team") or {}
-    project = issue.get("project") or {}
-
-    team_id = team.get("id")
-    if not team_id:
-        print("ERROR: Could not determine teamId from parent issue.")
-        return 1
-
-    inferred_project_id = project.get("id")
-    inferred_project_name = project.get("name")
-
     project_info = None
     if args.project_id or args.project_name:
-        project_info = resolve_project_id(api_key, args.project_id, args.project_name)
+        project_info = resolve_project_id(client, args.project_id, args.project_name, args.cache_dir, args.refresh)
         if not project_info:
             print("ERROR: Could not resolve project from provided --project-id/--project-name.")
             return 1
-    elif inferred_project_id:
-        project_info = {"id": inferred_project_id, "name": inferred_project_name or ""}
+
+    # Parent context (team + project) and both anchor lookups in one request.
+    variables: Dict[str, Any] = {"parentId": parent_issue_id, "title": args.doc_title, "needle": args.issue_needle}
+    if project_info:
+        lookup = request(client, QUERY_ARCH_ANCHOR_FOR_PROJECT, dict(variables, projectId=project_info["id"]))
     else:
+        lookup = request(client, QUERY_ARCH_ANCHOR_FOR_PARENT, variables)
+    if lookup.get("errors"):
+        print("ERROR: Linear API returned errors while looking up the architecture anchor:")
+        print(json.dumps(lookup["errors"], indent=2))
+        return 1
+
+    data = lookup.get("data") or {}
+    issue = data.get("issue")
+    if not issue:
+        print("ERROR: Could not load parent issue by id. Check parentIssueId and API key/workspace.")
+        return 1
+    team = issue.get("team") or {}
+    project = data.get("project") if project_info else issue.get("project")
+    if not project:
+        if project_info:
+            print(f"ERROR: Project {project_info['id']} not found.")
+            return 1
         print("ERROR: Parent issue has no project, and no --project-id/--project-name was provided.")
         print("Hint: provide --project-name 'My Project' or --project-id <uuid>.")
         return 2
 
-    project_id = project_info["id"]
-    project_name = project_info.get("name") or ""
+    project_id = project["id"]
+    project_name = project.get("name") or (project_info or {}).get("name") or ""
 
     report: Dict[str, Any] = {
         "meta": {
@@ -207,39 +306,30 @@ def main() -> int:
         "notes": [],
     }
 
-    # 1. Search for Document (Priority)
-    find_doc = graphql_request(api_key, QUERY_FIND_ARCH_DOC, {"projectId": project_id, "title": args.doc_title})
-    if find_doc.get("errors"):
-        print("ERROR: Linear API returned errors while searching for architecture document:")
-        print(json.dumps(find_doc["errors"], indent=2))
-        return 1
-    
-    doc_nodes = ((find_doc.get("data") or {}).get("project") or {}).get("documents", {}).get("nodes") or []
-    if doc_nodes:
-        existing = doc_nodes[0]
+    def write_report() -> None:
+        report["metrics"] = window.summary()
+        save_json(args.out, report)
+        write_textfile(args.metrics_textfile_dir, "ensure_architecture_issue", report["metrics"], report["action"] != "create_failed")
+        if not args.dry_run:
+            store_run(args.cache_dir, "architecture", issue.get("identifier"), parent_issue_id,
+                      {"export": args.export, "report": args.out, "architecture": args.architecture_file})
+
+    found_type, existing = find_anchor(project)
+    if found_type == "document":
         report["found"] = existing
         report["foundType"] = "document"
         report["action"] = "found"
         report["notes"].append(f"Architecture defined in Project Document: '{existing.get('title')}'")
-        save_json(args.out, report)
+        write_report()
         print(f"Found architecture document: {existing.get('title','')} (ID: {existing.get('id','')})")
         return 0
 
-    # 2. Search for Issue (Fallback)
-    find_issue = graphql_request(api_key, QUERY_FIND_ARCH_ISSUE, {"projectId": project_id, "needle": args.issue_needle})
-    if find_issue.get("errors"):
-        print("ERROR: Linear API returned errors while searching for architecture issue:")
-        print(json.dumps(find_issue["errors"], indent=2))
-        return 1
-
-    issue_nodes = ((find_issue.get("data") or {}).get("issues") or {}).get("nodes") or []
-    if issue_nodes:
-        existing = issue_nodes[0]
+    if found_type == "issue":
         report["found"] = existing
         report["foundType"] = "issue"
         report["action"] = "found_legacy"
         report["notes"].append(f"Architecture defined in Issue (legacy): {existing.get('identifier')} {existing.get('title')}")
-        save_json(args.out, report)
+        write_report()
         print(f"Found architecture issue (legacy): {existing.get('identifier','')} — {existing.get('title','')}")
         return 0
 
@@ -247,14 +337,14 @@ def main() -> int:
     if args.dry_run:
         report["action"] = "missing_dry_run"
         report["notes"].append("Architecture definition is missing (dry-run). Provide --architecture-file to create a Project Document.")
-        save_json(args.out, report)
+        write_report()
         print("Architecture definition is missing (dry-run). Provide --architecture-file to create a [Project Document].")
         return 2
 
     if not args.architecture_file:
         report["action"] = "missing_no_file"
         report["notes"].append("Architecture definition is missing. No --architecture-file provided.")
-        save_json(args.out, report)
+        write_report()
         print("Architecture definition is missing.")
         print("Provide --architecture-file ./architecture.md to create a Project Document.")
         return 2
@@ -274,35 +364,30 @@ def main() -> int:
         # "icon": "box" # optional
     }
 
-    # Retry a bit on transient failures
+    # Not idempotent: retried only when Linear cannot have created the document.
     last_err = None
-    for attempt in range(4):
-        try:
-            out = graphql_request(api_key, MUTATION_DOCUMENT_CREATE, {"input": input_obj})
-            if out.get("errors"):
-                last_err = json.dumps(out["errors"])
-                time.sleep(0.8 * (attempt + 1))
-                continue
-            payload = (out.get("data") or {}).get("documentCreate") or {}
-            if not payload.get("success"):
-                last_err = "Mutation returned success=false"
-                time.sleep(0.8 * (attempt + 1))
-                continue
+    try:
+        out = request(client, MUTATION_DOCUMENT_CREATE, {"input": input_obj}, idempotent=False)
+        payload = (out.get("data") or {}).get("documentCreate") or {}
+        if out.get("errors"):
+            last_err = json.dumps(out["errors"])
+        elif not payload.get("success"):
+            last_err = "Mutation returned success=false"
+        else:
             created = payload.get("document")
             report["created"] = created
             report["action"] = "created"
             report["foundType"] = "document"
             report["notes"].append("Architecture Project Document created from architecture file.")
-            save_json(args.out, report)
+            write_report()
             print(f"Created architecture document: {created.get('title','')} (ID: {created.get('id','')})")
             return 0
-        except Exception as e:
-            last_err = str(e)
-            time.sleep(0.8 * (attempt + 1))
+    except Exception as e:
+        last_err = str(e)
 
     report["action"] = "create_failed"
     report["notes"].append(f"Create document failed: {last_err}")
-    save_json(args.out, report)
+    write_report()
     print("ERROR: Failed to create architecture document.")
     if last_err:
         print(last_err)
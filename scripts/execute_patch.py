@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Create split sub-issues, link them to their sources and apply updates as one plan.
+
+Why:
+- create_sub_issues.py and apply_patch.py run as two serial passes, and a split recorded
+  with `splitFromIdentifier` was never linked back to the issue it was split from.
+
+What this script does:
+- Builds one dependency graph (plan_executor) from `createSubIssues` and `changes`:
+  - one `create` step per new sub-issue;
+  - one `relate` step per item with `splitFromIdentifier`, after its create, which adds an
+    issueRelationCreate (type `--relation-type`, default "related") between the new issue
+    and its source;
+  - one `update` step per change left after the pre-apply plan (no-op and stale checks, as
+    in apply_patch.py). Updates of the same issue run in patch order, and an update of a
+    split source runs after every sub-issue split from it has been created.
+- Runs steps on `--workers` threads as soon as their prerequisites succeed, so the run takes
+  about as long as its longest chain instead of the sum of all calls.
+- Uses the same checkpoint journal as the two scripts ("create" and "apply" entries, plus
+  "relate"), so a rerun of the same patch skips work that already succeeded, whichever
+  script did it.
+- Writes execute_report.json (creates, relations, update results, plan and timing) and,
+  when every update succeeded, updates the grooming cache like apply_patch.py.
+
+Usage:
+  python3 ./scripts/execute_patch.py --patch ./input-output-data/groom_patch.json \\
+    --export ./input-output-data/parent_issue_export.json --workers 8 [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from apply_patch import apply_one, own_updated_at, plan_changes, update_cache, utc_now
+from artifact_store import sha256_file, store_run
+from create_sub_issues import build_create_input, create_one, verify_targets
+from export_stream import open_export
+from journal import Journal, change_key
+from linear_client import LinearClient, get_client
+from metrics import CallWindow, write_textfile
+from patch_compiler import compile_for_parent, print_errors
+from plan_executor import PlanError, Step, describe, execute
+from rate_limit import TokenBucket
+from readback import annotate, print_summary, verify
+from retry_policy import request
+from team_metadata import MetadataError, load_parent_metadata
+import tracing
+from tracing import traced
+
+MUTATION_RELATION_CREATE = """
+mutation IssueRelationCreate($input: IssueRelationCreateInput!) {
+  issueRelationCreate(input: $input) {
+    success
+    issueRelation { id type }
+  }
+}
+"""
+
+RELATION_TYPES = ("related", "blocks", "duplicate", "similar")
+
+
+@traced("load_json")
+def load_json(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@traced("save_json")
+def save_json(path: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def relate_one(client: LinearClient, issue_id: str, related_id: str, relation_type: str) -> Dict[str, Any]:
+    """Relate a new sub-issue to the issue it was split from."""
+    err: Optional[str] = None
+    relation: Optional[Dict[str, Any]] = None
+    # Not idempotent: a resent relation would be recorded twice.
+    try:
+        out = request(client, MUTATION_RELATION_CREATE,
+                      {"input": {"issueId": issue_id, "relatedIssueId": related_id, "type": relation_type}},
+                      idempotent=False)
+        payload = (out.get("data") or {}).get("issueRelationCreate") or {}
+        if out.get("errors"):
+            err = json.dumps(out["errors"])
+        elif not payload.get("success"):
+            err = "Mutation returned success=false"
+        else:
+            relation = payload.get("issueRelation")
+    except Exception as e:
+        err = str(e)
+    return {"success": err is None, "error": err, "relation": relation}
+
+
+def identifier_ids(export: Any, wanted: List[str]) -> Dict[str, str]:
+    """{identifier: id} for the wanted identifiers found in the export (one streaming pass)."""
+    want = set(wanted)
+    found: Dict[str, str] = {}
+    parent = export.parent_issue
+    if parent.get("identifier") in want:
+        found[parent["identifier"]] = parent["id"]
+    if len(found) < len(want):
+        for rec in export.iter_sub_issues():
+            if rec.identifier in want:
+                found[rec.identifier] = rec.id
+                if len(found) == len(want):
+                    break
+    return found
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Create, relate and update from one patch as a dependency graph.")
+    ap.add_argument("--patch", required=True, help="Path to groom_patch.json")
+    ap.add_argument("--export", required=True, help="Path to parent_issue_export.json (snapshot used for diff/cache)")
+    ap.add_argument("--out", default=None, help="Path to execute_report.json output (default: alongside --patch)")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory for team metadata, journals and run artifacts (default: local-cache)")
+    ap.add_argument("--dry-run", action="store_true", help="Print the plan and its critical path; send nothing")
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent requests (default: 4)")
+    ap.add_argument("--max-rps", type=float, default=0.0, help="Cap on requests/second (default: 0 = only pace on Linear rate-limit headers)")
+    ap.add_argument("--relation-type", choices=RELATION_TYPES, default="related", help="Relation between a new sub-issue and its splitFromIdentifier source (default: related)")
+    ap.add_argument("--on-stale", choices=("skip", "apply"), default="skip", help="Issues edited in Linear after the export: skip them (default) or apply anyway and only flag them")
+    ap.add_argument("--no-plan", action="store_true", help="Send updates as-is: no no-op elimination, label deltas or stale check")
+    ap.add_argument("--no-resume", action="store_true", help="Ignore this patch's checkpoint journal and run every step again")
+    ap.add_argument("--no-json-cache", action="store_true", help="Only update the SQLite cache; skip rewriting the JSON cache files")
+    ap.add_argument("--refresh", action="store_true", help="Refetch parent team metadata even if cached")
+    ap.add_argument("--verify", action="store_true", help="Read created and updated issues back afterwards, report mismatches and cache what Linear stored")
+    ap.add_argument("--no-compile", action="store_true", help="Skip resolving names and validating the patch against the team metadata and the export")
+    ap.add_argument("--metrics-textfile-dir", default=None, metavar="DIR", help="Write run metrics to DIR/groombot_execute_patch.prom for node-exporter (default: $GROOMBOT_METRICS_TEXTFILE_DIR)")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "execute_patch")
+
+    if args.out is None:
+        args.out = os.path.join(os.path.dirname(os.path.abspath(args.patch)) or ".", "execute_report.json")
+
+    api_key = os.environ.get("LINEAR_API_KEY", "")
+    if not api_key:
+        print("ERROR: LINEAR_API_KEY not set. Run: source ~/.zshrc", file=sys.stderr)
+        return 2
+
+    client = get_client(api_key)
+    window = CallWindow(client)
+    patch_data = load_json(args.patch)
+    export = open_export(args.export)
+    patch_meta = patch_data.get("meta") or {}
+
+    changes: List[Dict[str, Any]] = patch_data.get("changes") or []
+    create_items: List[Dict[str, Any]] = patch_data.get("createSubIssues") or []
+    if not changes and not create_items:
+        print("No changes or createSubIssues entries found in patch. Nothing to do.")
+        return 0
+
+    parent_issue_id = patch_meta.get("parentIssueId") or export.meta.get("parentIssueId")
+    parent_issue_identifier = patch_meta.get("parentIssueIdentifier") or export.meta.get("parentIssueIdentifier")
+    if not parent_issue_id:
+        print("ERROR: parentIssueId is missing. It must be present in patch.meta or export.meta.")
+        return 1
+
+    # Resolve stateName/labelNames/assigneeName and reject unknown ids or fields before sending anything.
+    if not args.no_compile:
+        patch_data, errors, _ = compile_for_parent(client, patch_data, export, args.cache_dir, refresh=args.refresh)
+        if errors:
+            print_errors(errors)
+            return 1
+        changes = patch_data.get("changes") or []
+        create_items = patch_data.get("createSubIssues") or []
+
+    team: Dict[str, Any] = {}
+    if create_items:
+        try:
+            # The compile pass above already refreshed the metadata if asked to.
+            team = load_parent_metadata(client, parent_issue_id, args.cache_dir, refresh=args.refresh and args.no_compile)["team"]
+        except MetadataError as e:
+            print(f"ERROR: {e}")
+            if e.errors:
+                print(json.dumps(e.errors, indent=2))
+            return 1
+
+    if client.rate_limiter is None:
+        client.rate_limiter = TokenBucket(rate=args.max_rps, capacity=max(1, args.workers))
+
+    # One journal file per patch, shared with create_sub_issues.py and apply_patch.py.
+    hash_cache = None if args.dry_run else args.cache_dir
+    patch_sha256 = sha256_file(args.patch, hash_cache)
+    journal_dir = None if args.dry_run else args.cache_dir
+    journals = {kind: Journal(journal_dir, patch_sha256, kind) for kind in ("create", "relate", "apply")}
+    if args.no_resume:
+        for j in journals.values():
+            j.reset()
+    done_creates = journals["create"].completed()
+    done_relations = journals["relate"].completed()
+    keys = [change_key(i, c) for i, c in enumerate(changes)]
+    done_updates = {k for k in journals["apply"].completed() if k in set(keys)}
+
+    steps: List[Step] = []
+    creates: List[Optional[Dict[str, Any]]] = [None] * len(create_items)
+    relations: Dict[int, Dict[str, Any]] = {}
+    # Create step keys (or already-created issues) per split source identifier.
+    split_creates: Dict[str, List[str]] = {}
+    sources = identifier_ids(export, [i["splitFromIdentifier"] for i in create_items if i.get("splitFromIdentifier")])
+
+    for idx, item in enumerate(create_items, start=1):
+        title = (item.get("title") or "").strip()
+        split_from = item.get("splitFromIdentifier")
+        create_key = f"create:{idx}"
+        if str(idx) in done_creates:
+            creates[idx - 1] = dict(done_creates[str(idx)]["result"], resumed=True)
+            create_key = ""
+        elif not title:
+            creates[idx - 1] = {"index": idx, "success": False, "error": "Missing required field: title"}
+            continue
+        else:
+            input_obj = build_create_input(item, title, team.get("id"), parent_issue_id)
+
+            def run_create(_: Dict[str, Any], idx: int = idx, input_obj: Dict[str, Any] = input_obj,
+                           split_from: Optional[str] = split_from) -> Dict[str, Any]:
+                success, err, created = create_one(client, input_obj)
+                return {"index": idx, "success": success, "error": err, "title": input_obj["title"],
+                        "splitFromIdentifier": split_from, "created": created}
+
+            steps.append(Step(create_key, "create", run_create, label=f"create #{idx} '{title}'"))
+
+        if not split_from:
+            continue
+        if create_key:
+            split_creates.setdefault(split_from, []).append(create_key)
+        source_id = sources.get(split_from)
+        if str(idx) in done_relations:
+            relations[idx] = dict(done_relations[str(idx)]["result"], resumed=True)
+        elif source_id is None:
+            relations[idx] = {"index": idx, "success": None, "skipped": "unresolved", "splitFromIdentifier": split_from,
+                              "error": f"splitFromIdentifier {split_from} is not in the export; not linked"}
+            print(f"WARNING: create #{idx}: {relations[idx]['error']}")
+        else:
+            resumed_issue = ((creates[idx - 1] or {}).get("created") or {}).get("id")
+
+            def run_relate(inputs: Dict[str, Dict[str, Any]], idx: int = idx, create_key: str = create_key,
+                           resumed_issue: Optional[str] = resumed_issue, source_id: str = source_id,
+                           split_from: str = split_from) -> Dict[str, Any]:
+                new_id = resumed_issue or ((inputs[create_key].get("created") or {}).get("id"))
+                out = relate_one(client, new_id, source_id, args.relation_type)
+                return dict(out, index=idx, issueId=new_id, splitFromIdentifier=split_from, splitFromId=source_id)
+
+            steps.append(Step(f"relate:{idx}", "relate", run_relate, deps=[create_key] if create_key else [],
+                              label=f"relate #{idx} to {split_from}"))
+
+    # Updates: the same pre-apply plan as apply_patch.py.
+    todo_index = [i for i, k in enumerate(keys) if k not in done_updates]
+    todo = [changes[i] for i in todo_index]
+    if done_updates:
+        print(f"Resuming: {len(done_updates)} update(s) already applied by an earlier run of this patch; {len(todo)} left.")
+    plan: Optional[Dict[str, Any]] = None
+    if args.no_plan:
+        send = [dict(c, _index=i) for i, c in enumerate(todo)]
+    else:
+        send, planned, plan = plan_changes(client, todo, export, args.on_stale,
+                                           own_updated_at(journals["apply"].entries.values()))
+        journals["apply"].record({"key": keys[todo_index[i]], "result": r, "sent": {}} for i, r in planned.items())
+        for item in plan["staleCheck"]["stale"]:
+            print(f"WARNING: {item['identifier'] or item['id']} changed in Linear at {item['currentUpdatedAt']} (export had {item['exportedUpdatedAt'] or 'no updatedAt'})")
+
+    source_identifier = {v: k for k, v in sources.items()}
+    last_update: Dict[str, str] = {}
+    for c in send:
+        key = keys[todo_index[c["_index"]]]
+        deps = list(split_creates.get(source_identifier.get(c["id"], ""), []))
+        if c["id"] in last_update:
+            deps.append(last_update[c["id"]])
+        step_key = f"update:{key}"
+        last_update[c["id"]] = step_key
+        steps.append(Step(step_key, "update", lambda _, c=c: apply_one(client, c), deps=deps,
+                          label=f"update {c.get('identifier') or c['id']}"))
+
+    try:
+        shape = describe(steps)
+    except PlanError as e:
+        print(f"ERROR: {e}")
+        return 1
+    print(
+        f"Plan: {shape['byKind'].get('create', 0)} create(s), {shape['byKind'].get('relate', 0)} relation(s), "
+        f"{shape['byKind'].get('update', 0)} update(s); {shape['edges']} dependencies, longest chain "
+        f"{shape['criticalPathSteps']} step(s) on {args.workers} worker(s)"
+    )
+
+    send_by_key = {f"update:{keys[todo_index[c['_index']]]}": c for c in send}
+
+    def record(step: Step, result: Dict[str, Any]) -> None:
+        _, key = step.key.split(":", 1)
+        if step.kind == "update":
+            c = send_by_key[step.key]
+            result = dict(result, identifier=c.get("identifier"), id=c["id"])
+            journals["apply"].record([{"key": key, "result": result, "sent": c.get("update", {})}])
+        else:
+            journals[step.kind].record([{"key": key, "result": dict(result, index=int(key))}])
+
+    timing: Optional[Dict[str, Any]] = None
+    if args.dry_run:
+        for s in steps:
+            after = f" (after {', '.join(s.deps)})" if s.deps else ""
+            print(f"[DRY RUN] Would {s.label}{after}")
+            if s.kind == "update":
+                c = send_by_key[s.key]
+                journals["apply"].record([{"key": s.key.split(":", 1)[1], "sent": {},
+                                           "result": {"identifier": c.get("identifier"), "id": c["id"], "success": None, "error": None, "dryRun": True}}])
+    else:
+        timing = execute(steps, args.workers, record)["timing"]
+
+    for idx in range(1, len(create_items) + 1):
+        entry = journals["create"].entries.get(str(idx))
+        if creates[idx - 1] is None:
+            creates[idx - 1] = entry["result"] if entry else {"index": idx, "success": None, "dryRun": True,
+                                                             "title": create_items[idx - 1].get("title"),
+                                                             "splitFromIdentifier": create_items[idx - 1].get("splitFromIdentifier")}
+        if idx not in relations and create_items[idx - 1].get("splitFromIdentifier"):
+            entry = journals["relate"].entries.get(str(idx))
+            relations[idx] = entry["result"] if entry else {"index": idx, "success": None, "dryRun": True}
+    results: List[Dict[str, Any]] = []
+    for k in keys:
+        r = dict(journals["apply"].entries[k]["result"])
+        if k in done_updates:
+            r["resumed"] = True
+        results.append(r)
+
+    verification: Optional[Dict[str, Any]] = None
+    if args.verify and not args.dry_run:
+        expected: Dict[str, Dict[str, Any]] = {}
+        for k, c in zip(keys, changes):
+            if journals["apply"].entries[k]["result"].get("success") is True:
+                expected.setdefault(c["id"], {"id": c["id"], "identifier": c.get("identifier"), "expected": {}})["expected"].update(journals["apply"].entries[k].get("sent") or {})
+        verification = verify(client, verify_targets(create_items, creates, parent_issue_id) + list(expected.values()))
+        print_summary(verification)
+        annotate(creates, verification, lambda r: (r.get("created") or {}).get("id"))
+        annotate(results, verification, lambda r: r.get("id"))
+
+    report = {
+        "meta": {
+            "appliedAt": utc_now(),
+            "parentIssueIdentifier": parent_issue_identifier,
+            "parentIssueId": parent_issue_id,
+            "team": {"id": team.get("id"), "key": team.get("key"), "name": team.get("name")} if team else None,
+            "patchFileSha256": patch_sha256,
+            "exportFileSha256": sha256_file(args.export, hash_cache),
+            "dryRun": bool(args.dry_run),
+            "workers": args.workers,
+            "relationType": args.relation_type,
+            "journal": os.path.relpath(journals["apply"].path) if journals["apply"].path else None,
+        },
+        "plan": plan,
+        "dag": dict(shape, **(timing or {})),
+        "verification": {k: v for k, v in verification.items() if k != "stored"} if verification else None,
+        "metrics": window.summary(),
+        "creates": creates,
+        "relations": [relations[i] for i in sorted(relations)],
+        "results": results,
+    }
+    save_json(args.out, report)
+    print(f"Wrote {args.out}")
+    failed = [r for r in creates + report["relations"] + results if r and r.get("success") is False]
+    write_textfile(args.metrics_textfile_dir, "execute_patch", report["metrics"], not failed)
+    if timing:
+        print(
+            f"Wall {timing['wallMs'] / 1000:.2f}s for {timing['serialMs'] / 1000:.2f}s of calls "
+            f"(critical path {timing['criticalPathMs'] / 1000:.2f}s over {timing['criticalPathSteps']} step(s))."
+        )
+
+    if args.dry_run:
+        return 0
+    print(client.usage_summary())
+    store_run(args.cache_dir, "execute", parent_issue_identifier, parent_issue_id,
+              {"patch": args.patch, "export": args.export, "report": args.out})
+    if any(r["success"] is not True for r in results):
+        print("WARNING: Some updates failed; cache will NOT be updated automatically.")
+    elif changes:
+        applied = [dict(c, update=journals["apply"].entries[k].get("sent", {})) for k, c in zip(keys, changes)]
+        update_cache(args.cache_dir, export, patch_data, args.out, patch_sha256, not args.no_json_cache, applied,
+                     verification["stored"] if verification else None)
+    if failed:
+        print("Fix failures, then re-run: steps that already succeeded are skipped.")
+        return 1
+    if verification and (verification["mismatches"] or verification["missing"]):
+        print("WARNING: Linear stored something other than the patch for some issues; see verification in the report.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
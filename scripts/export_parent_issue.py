@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""Export one Linear parent issue and its sub-issues to parent_issue_export.json.
+
+Why:
+- The original curl export read `children(first: 250)` and `labels { nodes }` once, so
+  large parents (or issues with many labels) were silently cut off.
+
+What this script does:
+1) Resolves the parent issue from its identifier (TEAM-123).
+2) Follows `children` and `labels` cursors until every page is read.
+3) Optionally walks grandchildren breadth-first (`--depth`), fetching pages for all
+   issues of a level concurrently.
+4) Streams sub-issues to disk page by page as they arrive (see export_stream.py); at
+   most PREFETCH_PAGES pages per issue being fetched (2 * --workers issues at a time) are
+   held in memory.
+
+Output matches `03_SCHEMAS_EXPORT_AND_PATCH.md` and is written to both
+`input-output-data/parent_issue_export.json` (upload copy) and
+`local-cache/parent_issue_export.json` (cache copy).
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from artifact_store import store_run
+from context_pool import ThreadPoolExecutor
+from export_stream import ExportWriter
+from linear_batch import build_aliased_document, chunked
+from linear_client import LinearClient, get_client
+from rate_limit import TokenBucket
+from retry_policy import request
+import tracing
+from tracing import traced
+
+ISSUE_FIELDS = """
+fragment IssueFields on Issue {
+  id
+  identifier
+  title
+  description
+  priority
+  estimate
+  updatedAt
+  state { id name }
+  assignee { id name }
+  labels(first: 50) {
+    pageInfo { hasNextPage endCursor }
+    nodes { id name }
+  }
+}
+"""
+
+# IssueFilter does NOT support filtering by identifier. We filter by team.key + number instead.
+QUERY_PARENT = """
+query ParentIssueByTeamAndNumber($teamKey: String!, $issueNumber: Float!) {
+  issues(filter: { team: { key: { eq: $teamKey } }, number: { eq: $issueNumber } }, first: 1) {
+    nodes { ...IssueFields }
+  }
+}
+""" + ISSUE_FIELDS
+
+QUERY_CHILDREN = """
+query IssueChildren($id: String!, $first: Int!, $after: String) {
+  issue(id: $id) {
+    children(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...IssueFields }
+    }
+  }
+}
+""" + ISSUE_FIELDS
+
+QUERY_LABELS = """
+query IssueLabels($id: String!, $after: String) {
+  issue(id: $id) {
+    labels(first: 50, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { id name }
+    }
+  }
+}
+"""
+
+LISTING_PAGE_SIZE = 250
+# Issues listed per aliased request in --delta mode.
+LISTING_BATCH_SIZE = 50
+
+# Cheap listing used by --delta: ids, updatedAt and state name only.
+QUERY_CHILD_IDS = """
+query IssueChildIds($id: String!, $first: Int!, $after: String) {
+  issue(id: $id) {
+    updatedAt
+    children(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { id updatedAt state { name } }
+    }
+  }
+}
+"""
+
+CHILD_IDS_SELECTION = (
+    "updatedAt children(first: %d) { pageInfo { hasNextPage endCursor } nodes { id updatedAt state { name } } }"
+    % LISTING_PAGE_SIZE
+)
+
+QUERY_ISSUES_BY_ID = """
+query IssuesById($ids: [ID!], $first: Int!, $after: String) {
+  issues(filter: { id: { in: $ids } }, first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    nodes { ...IssueFields }
+  }
+}
+""" + ISSUE_FIELDS
+
+IDENTIFIER_RE = re.compile(r"^([A-Za-z]+)-([0-9]+)$")
+DEFAULT_PAGE_SIZE = 100
+# Pages of children buffered per issue ahead of the writer; bounds export memory to
+# about 2 * workers * PREFETCH_PAGES pages, however many issues a level has.
+PREFETCH_PAGES = 2
+_END = object()
+
+def utc_now() -> str:
+    return dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+def query(client: LinearClient, document: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a read query with retries; raise RuntimeError on GraphQL errors."""
+    try:
+        resp = request(client, document, variables)
+    except Exception as e:
+        raise RuntimeError(f"Linear request failed: {e}") from e
+    if resp.get("errors"):
+        raise RuntimeError("Linear API returned errors: " + json.dumps(resp["errors"]))
+    return resp.get("data") or {}
+
+def parse_identifier(identifier: str) -> Optional[Tuple[str, int]]:
+    m = IDENTIFIER_RE.match(identifier.strip())
+    if not m:
+        return None
+    return m.group(1).upper(), int(m.group(2))
+
+def fetch_labels(client: LinearClient, node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    conn = node.get("labels") or {}
+    labels = [{"id": n["id"], "name": n["name"]} for n in conn.get("nodes") or []]
+    page = conn.get("pageInfo") or {}
+    while page.get("hasNextPage"):
+        data = query(client, QUERY_LABELS, {"id": node["id"], "after": page.get("endCursor")})
+        conn = ((data.get("issue") or {}).get("labels")) or {}
+        labels.extend({"id": n["id"], "name": n["name"]} for n in conn.get("nodes") or [])
+        page = conn.get("pageInfo") or {}
+    return labels
+
+def normalize_issue(client: LinearClient, node: Dict[str, Any], parent_id: Optional[str] = None) -> Dict[str, Any]:
+    state = node.get("state")
+    assignee = node.get("assignee")
+    issue: Dict[str, Any] = {
+        "id": node["id"],
+        "identifier": node["identifier"],
+        "title": node["title"],
+        "description": node.get("description"),
+        "priority": node.get("priority"),
+        "estimate": node.get("estimate"),
+        "state": {"id": state["id"], "name": state["name"]} if state else None,
+        "labels": fetch_labels(client, node),
+        "assignee": {"id": assignee["id"], "name": assignee["name"]} if assignee else None,
+        "updatedAt": node["updatedAt"],
+    }
+    if parent_id is not None:
+        issue["parentId"] = parent_id
+    return issue
+
+def fetch_children(client: LinearClient, parent_id: str, page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the children of `parent_id` one page at a time, following cursors to the last page."""
+    after: Optional[str] = None
+    while True:
+        data = query(client, QUERY_CHILDREN, {"id": parent_id, "first": page_size, "after": after})
+        conn = ((data.get("issue") or {}).get("children")) or {}
+        yield [normalize_issue(client, n, parent_id) for n in conn.get("nodes") or []]
+        page = conn.get("pageInfo") or {}
+        if not page.get("hasNextPage"):
+            return
+        after = page.get("endCursor")
+
+def fetch_parent(client: LinearClient, identifier: str) -> Optional[Dict[str, Any]]:
+    parsed = parse_identifier(identifier)
+    if not parsed:
+        return None
+    team_key, number = parsed
+    data = query(client, QUERY_PARENT, {"teamKey": team_key, "issueNumber": number})
+    nodes = ((data.get("issues") or {}).get("nodes")) or []
+    return normalize_issue(client, nodes[0]) if nodes else None
+
+def build_meta(parent: Dict[str, Any], state_name: Optional[str], depth: int) -> Dict[str, Any]:
+    return {
+        "exportedAt": utc_now(),
+        "workspace": None,
+        "source": "linear-graphql",
+        "parentIssueIdentifier": parent["identifier"],
+        "parentIssueId": parent["id"],
+        "subIssueFilter": {"stateNameEq": state_name} if state_name else None,
+        "depth": depth,
+    }
+
+def _offer(buf: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    """Put `item` into `buf`, waiting for room; False if the export stopped meanwhile."""
+    while not stop.is_set():
+        try:
+            buf.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+@traced("walk_hierarchy")
+def walk_hierarchy(
+    fetch_level: Callable[[List[str]], Iterable[List[Dict[str, Any]]]],
+    root_id: str,
+    state_name: Optional[str],
+    depth: int,
+) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Yield (child, included) breadth-first, `depth` levels below `root_id`.
+
+    `fetch_level(ids)` yields lists of children (whole or one page at a time), in id order.
+    Only included children (those matching `state_name`) are walked further.
+    """
+    level = [root_id]
+    for _ in range(depth):
+        if not level:
+            break
+        next_level: List[str] = []
+        for children in fetch_level(level):
+            for child in children:
+                included = not state_name or (child.get("state") or {}).get("name") == state_name
+                if included:
+                    next_level.append(child["id"])
+                yield child, included
+        level = next_level
+
+@traced("export_parent")
+def export_parent(
+    client: LinearClient,
+    parent: Dict[str, Any],
+    out_path: str,
+    state_name: Optional[str],
+    depth: int,
+    workers: int,
+    page_size: int,
+) -> Tuple[int, int]:
+    """Stream the export for `parent` to `out_path`; return (included, seen) sub-issue counts."""
+    header = {"meta": build_meta(parent, state_name, depth), "parentIssue": parent}
+    seen = 0
+    stop = threading.Event()
+    # (buffer, future) of the issues being fetched, oldest first.
+    in_flight: Deque[Tuple["queue.Queue[Any]", Future]] = deque()
+
+    def produce(issue_id: str, buf: "queue.Queue[Any]") -> None:
+        # Page through one issue's children into its bounded buffer.
+        try:
+            for page in fetch_children(client, issue_id, page_size):
+                if not _offer(buf, page, stop):
+                    return
+            _offer(buf, _END, stop)
+        except Exception as e:
+            _offer(buf, e, stop)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool, ExportWriter(out_path, header) as writer:
+        def fetch_level(ids: List[str]) -> Iterator[List[Dict[str, Any]]]:
+            # Up to 2 * workers issues of a level are fetched concurrently, each at most
+            # PREFETCH_PAGES pages ahead of the writer; pages are yielded in id order.
+            todo = iter(ids)
+            window = 2 * max(1, workers)
+            while True:
+                for issue_id in todo:
+                    buf: "queue.Queue[Any]" = queue.Queue(maxsize=PREFETCH_PAGES)
+                    in_flight.append((buf, pool.submit(produce, issue_id, buf)))
+                    if len(in_flight) >= window:
+                        break
+                if not in_flight:
+                    return
+                buf = in_flight[0][0]
+                while True:
+                    item = buf.get()
+                    if item is _END:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                in_flight.popleft()
+
+        try:
+            for child, included in walk_hierarchy(fetch_level, parent["id"], state_name, depth):
+                seen += 1
+                if included:
+                    writer.write(child)
+        finally:
+            # On failure, release producers blocked on a full buffer and drop queued ones.
+            stop.set()
+            for _, f in in_flight:
+                f.cancel()
+        included_count = writer.count
+    return included_count, seen
+
+def list_children(client: LinearClient, parent_id: str, updated: Dict[str, str], after: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Id-only listing of one issue's children; records the issue's own updatedAt in `updated`."""
+    children: List[Dict[str, Any]] = []
+    while True:
+        data = query(client, QUERY_CHILD_IDS, {"id": parent_id, "first": LISTING_PAGE_SIZE, "after": after})
+        issue = data.get("issue") or {}
+        updated[parent_id] = issue.get("updatedAt")
+        conn = issue.get("children") or {}
+        for n in conn.get("nodes") or []:
+            children.append({"id": n["id"], "updatedAt": n["updatedAt"], "state": n.get("state"), "parentId": parent_id})
+        page = conn.get("pageInfo") or {}
+        if not page.get("hasNextPage"):
+            return children
+        after = page.get("endCursor")
+
+def list_children_batch(client: LinearClient, ids: List[str], updated: Dict[str, str]) -> List[List[Dict[str, Any]]]:
+    """Id-only listing for many issues at once: one aliased `issue(id:)` field per id.
+
+    Issues with more than one page of children continue with `list_children`.
+    """
+    fields = [
+        {"alias": f"i{n}", "field": "issue", "selection": CHILD_IDS_SELECTION, "args": {"id": ("String!", issue_id)}}
+        for n, issue_id in enumerate(ids)
+    ]
+    document, variables = build_aliased_document("query", "IssueChildIdsBatch", fields)
+    data = query(client, document, variables)
+
+    out: List[List[Dict[str, Any]]] = []
+    for n, issue_id in enumerate(ids):
+        issue = data.get(f"i{n}") or {}
+        updated[issue_id] = issue.get("updatedAt")
+        conn = issue.get("children") or {}
+        children = [
+            {"id": c["id"], "updatedAt": c["updatedAt"], "state": c.get("state"), "parentId": issue_id}
+            for c in conn.get("nodes") or []
+        ]
+        page = conn.get("pageInfo") or {}
+        if page.get("hasNextPage"):
+            children.extend(list_children(client, issue_id, updated, page.get("endCursor")))
+        out.append(children)
+    return out
+
+@traced("fetch_by_ids")
+def fetch_by_ids(client: LinearClient, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(ids), LISTING_PAGE_SIZE):
+        chunk = ids[i:i + LISTING_PAGE_SIZE]
+        after: Optional[str] = None
+        while True:
+            data = query(client, QUERY_ISSUES_BY_ID, {"ids": chunk, "first": DEFAULT_PAGE_SIZE, "after": after})
+            conn = data.get("issues") or {}
+            for n in conn.get("nodes") or []:
+                nodes[n["id"]] = n
+            page = conn.get("pageInfo") or {}
+            if not page.get("hasNextPage"):
+                break
+            after = page.get("endCursor")
+    return nodes
+
+def delta_compatible(previous: Dict[str, Any], identifier: str, state_name: Optional[str], depth: int) -> bool:
+    """A previous export can seed a delta only if it was produced with the same settings."""
+    meta = previous.get("meta") or {}
+    parsed = parse_identifier(identifier)
+    prev_parsed = parse_identifier(meta.get("parentIssueIdentifier") or "")
+    return (
+        parsed is not None
+        and parsed == prev_parsed
+        and bool(meta.get("parentIssueId"))
+        and meta.get("depth") == depth
+        and meta.get("subIssueFilter") == ({"stateNameEq": state_name} if state_name else None)
+    )
+
+@traced("export_delta")
+def export_delta(
+    client: LinearClient,
+    previous: Dict[str, Any],
+    out_path: str,
+    state_name: Optional[str],
+    depth: int,
+    workers: int,
+) -> Tuple[int, int, int]:
+    """Refresh `previous` into a new snapshot at `out_path`.
+
+    Walks the hierarchy with the id-only listing, then fetches full fields only for issues
+    that are new or whose `updatedAt` differs from the previous snapshot. Issues missing
+    from the listing are dropped. Order and formatting match a full export.
+    Returns (included, seen, refetched).
+    """
+    prev_parent = previous["parentIssue"]
+    prev_by_id = {it["id"]: it for it in previous.get("subIssues") or []}
+    parent_id = prev_parent["id"]
+    updated: Dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        def list_level(ids: List[str]) -> Iterator[List[Dict[str, Any]]]:
+            futures = [pool.submit(list_children_batch, client, chunk, updated) for chunk in chunked(ids, LISTING_BATCH_SIZE)]
+            for f in futures:
+                yield from f.result()
+
+        listing = list(walk_hierarchy(list_level, parent_id, state_name, depth))
+
+    entries = [c for c, included in listing if included]
+    stale = [
+        c["id"] for c in entries
+        if c["id"] not in prev_by_id or prev_by_id[c["id"]].get("updatedAt") != c["updatedAt"]
+    ]
+    if updated.get(parent_id) != prev_parent.get("updatedAt"):
+        stale.append(parent_id)
+
+    fresh = fetch_by_ids(client, stale) if stale else {}
+    parent_of = {c["id"]: c["parentId"] for c in entries}
+
+    def record(issue_id: str) -> Dict[str, Any]:
+        if issue_id in fresh:
+            return normalize_issue(client, fresh[issue_id], parent_of.get(issue_id))
+        return prev_by_id[issue_id]
+
+    parent = normalize_issue(client, fresh[parent_id]) if parent_id in fresh else prev_parent
+    header = {"meta": build_meta(parent, state_name, depth), "parentIssue": parent}
+    with ExportWriter(out_path, header) as writer:
+        for c in entries:
+            writer.write(record(c["id"]))
+        included_count = writer.count
+    return included_count, len(listing), len(fresh)
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("identifier", help="Parent issue identifier, e.g. TEAM-123")
+    ap.add_argument("--out", default=os.path.join(root_dir, "input-output-data", "parent_issue_export.json"), help="Where to write the export (upload copy)")
+    ap.add_argument("--cache-out", default=os.path.join(root_dir, "local-cache", "parent_issue_export.json"), help="Where to write the cache copy ('' to skip)")
+    ap.add_argument("--state-name", default="Backlog", help="Only include sub-issues in this state ('' for all states; default: Backlog)")
+    ap.add_argument("--depth", type=int, default=1, help="Levels of sub-issues to include (1 = direct children; 2 adds grandchildren, ...)")
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent page fetches (default: 4)")
+    ap.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help=f"Children per page (default: {DEFAULT_PAGE_SIZE})")
+    ap.add_argument("--delta", action="store_true", help="Refresh the previous export, refetching only issues that changed")
+    ap.add_argument("--cache-dir", default=os.path.join(root_dir, "local-cache"), help="Cache directory for the artifact store (default: local-cache)")
+    ap.add_argument("--previous", default=None, help="Previous export to refresh in --delta mode (default: --cache-out, else --out)")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "export_parent_issue")
+
+    api_key = os.environ.get("LINEAR_API_KEY", "")
+    if not api_key:
+        print("ERROR: LINEAR_API_KEY is not set.")
+        return 2
+
+    if not parse_identifier(args.identifier):
+        print(f"ERROR: Parent issue identifier must look like TEAM-123 (e.g., TEAM-123). Got: {args.identifier}")
+        return 1
+
+    client = get_client(api_key)
+    if client.rate_limiter is None:
+        client.rate_limiter = TokenBucket(capacity=max(1, args.workers))
+
+    state_name = args.state_name or None
+    depth = max(1, args.depth)
+
+    previous: Optional[Dict[str, Any]] = None
+    if args.delta:
+        previous_path = args.previous or args.cache_out or args.out
+        if os.path.exists(previous_path):
+            with open(previous_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        if previous is None or not delta_compatible(previous, args.identifier, state_name, depth):
+            print(f"No compatible previous export at {previous_path}; running a full export.")
+            previous = None
+
+    try:
+        if previous is not None:
+            included, seen, refetched = export_delta(client, previous, args.out, state_name, depth, args.workers)
+            parent = previous["parentIssue"]
+            print(f"Delta export: refetched {refetched} new/changed issue(s); everything else came from the previous snapshot.")
+        else:
+            parent = fetch_parent(client, args.identifier)
+            if not parent:
+                print("ERROR: No issue found for identifier:", args.identifier)
+                return 1
+            included, seen = export_parent(client, parent, args.out, state_name, depth, args.workers, args.page_size)
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    if args.cache_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.cache_out)), exist_ok=True)
+        shutil.copyfile(args.out, args.cache_out)
+        print(f"Wrote {args.cache_out} (cache) and {args.out} (upload copy) for parent_issue {parent['identifier']}.")
+    else:
+        print(f"Wrote {args.out} for parent_issue {parent['identifier']}.")
+
+    store_run(args.cache_dir, "export", parent["identifier"], parent["id"], {"export": args.out})
+
+    filter_desc = f"{args.state_name} " if args.state_name else ""
+    print(f"Included {included} {filter_desc}sub-issues out of {seen} total sub-issues.")
+    print(client.usage_summary())
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Export every parent issue of a project (or team) and report which need grooming.
+
+Why:
+- export_parent_issue.py exports one parent per invocation. Planning a quarter meant
+  running it once per parent by hand, and there was no way to see which parents had
+  never been groomed or had changed since their last grooming.
+
+What this script does:
+1) Lists the top-level issues of a project (`--project`, name or id) or team (`--team`)
+   and keeps those with at least one child. One paged query; no per-parent lookup.
+2) Exports each parent to `<out-dir>/<IDENTIFIER>/parent_issue_export.json` with
+   `--workers` exports in flight. The exports share one client, so they share one
+   rate-limit budget (`--max-rps` plus Linear's rate-limit headers) instead of each
+   pacing itself.
+3) Joins the results against the grooming cache (local-cache/groombot.sqlite3, mirrored
+   in groomed_parent_issues.json) and writes a manifest with one status per parent:
+   - never:   no grooming record for the parent.
+   - stale:   groomed, but a sub-issue (or the parent) was updated after `groomedAt`,
+              or the export has sub-issues the grooming record did not cover.
+   - groomed: groomed and unchanged since.
+   A failed export is listed with its error and makes the script exit 1.
+
+Usage:
+  python3 ./scripts/export_portfolio.py --project "Payments API"
+  python3 ./scripts/export_portfolio.py --team ENG --workers 8 --max-rps 20
+
+Each export is a normal parent_issue_export.json, so any of them can be passed to the
+later stages with `--export <out-dir>/ENG-123/parent_issue_export.json`.
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+
+from artifact_store import ArtifactStore
+from cache_store import CacheStore
+from context_pool import ThreadPoolExecutor
+from export_parent_issue import DEFAULT_PAGE_SIZE, ISSUE_FIELDS, export_parent, normalize_issue, query
+from export_stream import ExportReader
+from journal import Journal
+from linear_client import LinearClient, get_client
+from metrics import CallWindow, write_textfile
+from project_directory import ProjectDirectory, ProjectDirectoryError
+from rate_limit import TokenBucket
+import tracing
+from tracing import traced
+
+EXPORT_NAME = "parent_issue_export.json"
+MANIFEST_NAME = "portfolio_manifest.json"
+# groomedAt is stored to the second; updates from the grooming run itself can land in
+# the same second, so only changes after this margin count as "stale".
+GROOMED_AT_MARGIN = dt.timedelta(seconds=1)
+
+QUERY_PORTFOLIO_PARENTS = """
+query PortfolioParents($filter: IssueFilter!, $first: Int!, $after: String) {
+  issues(filter: $filter, first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ...IssueFields
+      children(first: 1) { nodes { id } }
+    }
+  }
+}
+""" + ISSUE_FIELDS
+
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+
+
+def utc_now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def parse_stamp(stamp: Optional[str]) -> Optional[dt.datetime]:
+    if not stamp:
+        return None
+    try:
+        return dt.datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def scope_filter(project_id: Optional[str], team_key: Optional[str]) -> Dict[str, Any]:
+    """IssueFilter for the top-level issues of a project or team."""
+    if project_id:
+        return {"project": {"id": {"eq": project_id}}, "parent": {"null": True}}
+    return {"team": {"key": {"eq": team_key}}, "parent": {"null": True}}
+
+
+@traced("list_parents")
+def list_parents(client: LinearClient, issue_filter: Dict[str, Any], page_size: int) -> List[Dict[str, Any]]:
+    """Top-level issues matching `issue_filter` that have at least one child, normalized."""
+    parents: List[Dict[str, Any]] = []
+    after: Optional[str] = None
+    while True:
+        data = query(client, QUERY_PORTFOLIO_PARENTS, {"filter": issue_filter, "first": page_size, "after": after})
+        conn = data.get("issues") or {}
+        for node in conn.get("nodes") or []:
+            if ((node.get("children") or {}).get("nodes")):
+                parents.append(normalize_issue(client, node))
+        page = conn.get("pageInfo") or {}
+        if not page.get("hasNextPage"):
+            return parents
+        after = page.get("endCursor")
+
+
+def resolve_project(client: LinearClient, value: str, cache_dir: str, refresh: bool) -> Optional[Dict[str, str]]:
+    """{"id", "name"} for a project id or name; prints the candidates when a name is ambiguous."""
+    if _UUID_RE.match(value):
+        return {"id": value, "name": ""}
+    found = ProjectDirectory(client, cache_dir).resolve(value, refresh=refresh)
+    project = found["project"]
+    if project:
+        return {"id": project["id"], "name": project["name"]}
+    if found["candidates"]:
+        print(f"Project name '{value}' is ambiguous or inexact. Closest projects:")
+        for p in found["candidates"]:
+            print(f"  {p['name']}  ({p['match']}, score {p['score']})  --project {p['id']}")
+    else:
+        print(f"ERROR: No project matches '{value}'.")
+    return None
+
+
+def groomed_identifiers(record: Dict[str, Any], cache_dir: str) -> Set[str]:
+    """Sub-issues covered by a grooming record, including those its patch created.
+
+    Records written before apply_patch listed created sub-issues lack them; the patch's
+    create journal still has them.
+    """
+    covered = set(record.get("issues") or [])
+    if record.get("patchFileSha256"):
+        for entry in Journal(cache_dir, record["patchFileSha256"], "create").completed().values():
+            created = (entry["result"].get("created") or {}).get("identifier")
+            if created:
+                covered.add(created)
+    return covered
+
+
+def grooming_status(record: Optional[Dict[str, Any]], parent: Dict[str, Any], export_path: str, cache_dir: str) -> Dict[str, Any]:
+    """{"status", "groomedAt", "reasons", ...} for one exported parent against its last grooming."""
+    if record is None:
+        return {"status": "never", "groomedAt": None, "reasons": []}
+    groomed_at = parse_stamp(record.get("groomedAt"))
+    cutoff = groomed_at + GROOMED_AT_MARGIN if groomed_at else None
+
+    updated: List[str] = []
+    current: List[str] = []
+    parent_at = parse_stamp(parent.get("updatedAt"))
+    if cutoff and parent_at and parent_at > cutoff:
+        updated.append(parent["identifier"])
+    for rec in ExportReader(export_path).iter_sub_issues():
+        current.append(rec.identifier)
+        at = parse_stamp(rec.updated_at)
+        if cutoff and at and at > cutoff:
+            updated.append(rec.identifier)
+    covered = groomed_identifiers(record, cache_dir)
+    new = [i for i in current if i not in covered]
+
+    reasons: List[str] = []
+    if cutoff is None:
+        reasons.append("grooming record has no groomedAt")
+    if updated:
+        reasons.append(f"{len(updated)} issue(s) updated since grooming")
+    if new:
+        reasons.append(f"{len(new)} sub-issue(s) not covered by the last grooming")
+    return {
+        "status": "stale" if reasons else "groomed",
+        "groomedAt": record.get("groomedAt"),
+        "reasons": reasons,
+        "updatedSinceGrooming": updated,
+        "newSubIssues": new,
+    }
+
+
+def export_one(
+    client: LinearClient,
+    parent: Dict[str, Any],
+    out_dir: str,
+    state_name: Optional[str],
+    depth: int,
+    page_size: int,
+) -> Dict[str, Any]:
+    """Export one parent; returns its manifest entry (without the grooming status)."""
+    path = os.path.join(out_dir, parent["identifier"], EXPORT_NAME)
+    entry: Dict[str, Any] = {
+        "identifier": parent["identifier"],
+        "id": parent["id"],
+        "title": parent["title"],
+        "state": (parent.get("state") or {}).get("name"),
+        "export": path,
+    }
+    with tracing.span(parent["identifier"], "portfolio"):
+        try:
+            included, seen = export_parent(client, parent, path, state_name, depth, 1, page_size)
+        except RuntimeError as e:
+            entry["error"] = str(e)
+            return entry
+    entry.update(includedSubIssues=included, seenSubIssues=seen)
+    return entry
+
+
+def record_runs(cache_dir: str, entries: List[Dict[str, Any]], manifest_path: str) -> None:
+    """Record every export and the manifest in the artifact store, on one connection."""
+    try:
+        with ArtifactStore(cache_dir) as store:
+            for e in entries:
+                if "error" not in e:
+                    store.record_run("export", e["identifier"], e["id"], {"export": e["export"]})
+            store.record_run("portfolio", None, None, {"manifest": manifest_path})
+    except (OSError, sqlite3.Error) as e:
+        print(f"WARNING: could not store run artifacts in {cache_dir}: {e}")
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    ap = argparse.ArgumentParser(description="Export every parent issue of a project or team and report grooming status.")
+    scope = ap.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--project", default=None, help="Project name or id")
+    scope.add_argument("--team", default=None, help="Team key, e.g. ENG")
+    ap.add_argument("--out-dir", default=os.path.join(root_dir, "input-output-data", "portfolio"), help="Directory for the per-parent exports (default: input-output-data/portfolio)")
+    ap.add_argument("--manifest", default=None, help=f"Manifest path (default: <out-dir>/{MANIFEST_NAME})")
+    ap.add_argument("--state-name", default="Backlog", help="Only include sub-issues in this state ('' for all states; default: Backlog)")
+    ap.add_argument("--depth", type=int, default=1, help="Levels of sub-issues to include (1 = direct children; 2 adds grandchildren, ...)")
+    ap.add_argument("--workers", type=int, default=4, help="Parents exported concurrently (default: 4)")
+    ap.add_argument("--max-rps", type=float, default=0.0, help="Cap on requests/second across all exports (default: 0 = only pace on Linear rate-limit headers)")
+    ap.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help=f"Issues per page (default: {DEFAULT_PAGE_SIZE})")
+    ap.add_argument("--cache-dir", default=os.path.join(root_dir, "local-cache"), help="Cache directory with the grooming records (default: local-cache)")
+    ap.add_argument("--refresh-projects", action="store_true", help="Refresh the cached project directory before resolving --project")
+    ap.add_argument("--metrics-textfile-dir", default=None, metavar="DIR", help="Write run metrics to DIR/groombot_export_portfolio.prom for node-exporter (default: $GROOMBOT_METRICS_TEXTFILE_DIR)")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "export_portfolio")
+
+    api_key = os.environ.get("LINEAR_API_KEY", "")
+    if not api_key:
+        print("ERROR: LINEAR_API_KEY is not set.")
+        return 2
+
+    client = get_client(api_key)
+    if client.rate_limiter is None:
+        client.rate_limiter = TokenBucket(rate=args.max_rps, capacity=max(1, args.workers))
+    window = CallWindow(client)
+    state_name = args.state_name or None
+    depth = max(1, args.depth)
+    manifest_path = args.manifest or os.path.join(args.out_dir, MANIFEST_NAME)
+
+    try:
+        project = None
+        if args.project:
+            project = resolve_project(client, args.project, args.cache_dir, args.refresh_projects)
+            if project is None:
+                return 1
+        parents = list_parents(client, scope_filter(project and project["id"], args.team), args.page_size)
+    except (RuntimeError, ProjectDirectoryError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    scope_desc = f"project {project['name'] or project['id']}" if project else f"team {args.team}"
+    print(f"Found {len(parents)} parent issue(s) with sub-issues in {scope_desc}.")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(export_one, client, p, args.out_dir, state_name, depth, args.page_size) for p in parents]
+        entries = [f.result() for f in futures]
+
+    with CacheStore(args.cache_dir) as store:
+        for parent, entry in zip(parents, entries):
+            if "error" in entry:
+                entry["status"] = "failed"
+                continue
+            record = store.last_groomed_parent(parent["id"]) or store.last_groomed_parent(parent["identifier"])
+            entry.update(grooming_status(record, parent, entry["export"], args.cache_dir))
+
+    counts = {s: sum(1 for e in entries if e["status"] == s) for s in ("never", "stale", "groomed", "failed")}
+    manifest = {
+        "meta": {
+            "generatedAt": utc_now(),
+            "scope": {"project": project} if project else {"team": args.team},
+            "subIssueFilter": {"stateNameEq": state_name} if state_name else None,
+            "depth": depth,
+            "groomingCache": os.path.join(args.cache_dir, "groomed_parent_issues.json"),
+        },
+        "counts": dict(counts, parents=len(entries)),
+        "parents": entries,
+        "metrics": window.summary(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+    record_runs(args.cache_dir, entries, manifest_path)
+    write_textfile(args.metrics_textfile_dir, "export_portfolio", manifest["metrics"], counts["failed"] == 0)
+
+    for e in entries:
+        detail = e.get("error") or "; ".join(e.get("reasons") or []) or (f"groomed {e['groomedAt']}" if e.get("groomedAt") else "")
+        print(f"  {e['status']:<8} {e['identifier']:<10} {e['title'][:50]:<50} {detail}")
+    print(
+        f"Exported {len(entries) - counts['failed']}/{len(entries)} parent(s) to {args.out_dir}: "
+        f"{counts['never']} never groomed, {counts['stale']} stale, {counts['groomed']} groomed, {counts['failed']} failed."
+    )
+    print(f"Wrote {manifest_path}")
+    print(client.usage_summary())
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,318 @@
+"""Streaming reader and writer for parent_issue_export.json.
+
+Writer: the exporter writes sub-issues to disk as they arrive instead of building the
+whole export in memory. Output is byte-for-byte what `json.dump(export, f, indent=2)`
+would produce for the same data, so downstream readers (and diffs) see no difference.
+
+Reader: scripts that only need `meta`, the parent issue, or a handful of sub-issues by id
+use `ExportReader` instead of `json.load()`. Sub-issues are parsed one at a time into
+compact `IssueRecord`s; state/label/assignee objects are interned, and `description`
+is read back from disk only when accessed. `open_export()` hands every stage in one
+process (groombot run, the spool worker) the same reader while the file is unchanged.
+"""
+
+import codecs
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tracing import traced
+
+
+def _indent(text: str, prefix: str) -> str:
+    return "\n".join(prefix + line for line in text.split("\n"))
+
+
+class ExportWriter:
+    """Write `{..header.., "subIssues": [...]}` one sub-issue at a time.
+
+    The file is written to a temp path and renamed into place on close, so a failed
+    export never leaves a truncated parent_issue_export.json behind.
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any]) -> None:
+        self.path = path
+        self.header = header
+        self.count = 0
+        self._f: Optional[Any] = None
+        self._tmp: Optional[str] = None
+
+    def __enter__(self) -> "ExportWriter":
+        directory = os.path.dirname(os.path.abspath(self.path)) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(prefix=".export.", suffix=".json", dir=directory)
+        self._f = os.fdopen(fd, "w", encoding="utf-8")
+        head = json.dumps(self.header, indent=2)
+        # Drop the closing "\n}" so sub-issues can be appended as the last key.
+        self._f.write(head[:-2] + ',\n  "subIssues": [')
+        return self
+
+    def write(self, issue: Dict[str, Any]) -> None:
+        assert self._f is not None
+        self._f.write(",\n" if self.count else "\n")
+        self._f.write(_indent(json.dumps(issue, indent=2), "    "))
+        self.count += 1
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        assert self._f is not None and self._tmp is not None
+        if exc_type is None:
+            self._f.write("\n  ]\n}" if self.count else "]\n}")
+            self._f.close()
+            os.replace(self._tmp, self.path)
+        else:
+            self._f.close()
+            os.unlink(self._tmp)
+
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    """Incremental JSON tokenizer over a file that tracks byte offsets."""
+
+    CHUNK = 1 << 16
+
+    def __init__(self, path: str, offset: int = 0) -> None:
+        self.f = open(path, "rb")
+        self.f.seek(offset)
+        self.dec = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.byte_pos = offset  # file offset of buf[pos]
+        self.chunk = self.CHUNK
+
+    def close(self) -> None:
+        self.f.close()
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.chunk)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + self.dec.decode(data)
+        self.pos = 0
+        return True
+
+    def peek(self, skip: str = "") -> str:
+        """Skip whitespace (and `skip` chars); return the next char or '' at EOF."""
+        while True:
+            start = self.pos
+            while self.pos < len(self.buf) and (self.buf[self.pos] in _WHITESPACE or self.buf[self.pos] in skip):
+                self.pos += 1
+            self.byte_pos += self.pos - start  # skipped chars are all ASCII
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str, skip: str = "") -> None:
+        got = self.peek(skip)
+        if got != ch:
+            raise ValueError(f"Malformed export: expected {ch!r}, got {got!r} at byte {self.byte_pos}")
+        self.pos += 1
+        self.byte_pos += 1
+
+    def value(self) -> Tuple[Any, int, int]:
+        """Decode the next JSON value; return (value, start_byte, end_byte)."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                break
+            except json.JSONDecodeError:
+                # Value runs past the buffer; read more (growing for very large values).
+                if not self._fill():
+                    raise
+                self.chunk = min(self.chunk * 2, 1 << 24)
+        self.chunk = self.CHUNK
+        start = self.byte_pos
+        self.byte_pos += len(self.buf[self.pos:end].encode("utf-8"))
+        self.pos = end
+        return obj, start, self.byte_pos
+
+
+class IssueRecord:
+    """Compact, read-only view of one exported issue.
+
+    `description` is not kept in memory; it is re-read from the export file on access.
+    `get()` accepts the export's JSON keys so records can stand in for issue dicts.
+    """
+
+    __slots__ = (
+        "id", "identifier", "title", "priority", "estimate", "state", "labels",
+        "assignee", "updated_at", "parent_id", "_path", "_start", "_end",
+    )
+
+    _KEYS = {
+        "id": "id", "identifier": "identifier", "title": "title", "priority": "priority",
+        "estimate": "estimate", "state": "state", "labels": "labels", "assignee": "assignee",
+        "updatedAt": "updated_at", "parentId": "parent_id",
+    }
+
+    def __init__(self, data: Dict[str, Any], path: str, start: int, end: int, intern: "_Interner") -> None:
+        self.id = data["id"]
+        self.identifier = data.get("identifier")
+        self.title = data.get("title")
+        self.priority = data.get("priority")
+        self.estimate = data.get("estimate")
+        self.state = intern.obj(data.get("state"))
+        self.labels = tuple(intern.obj(l) for l in data.get("labels") or [])
+        self.assignee = intern.obj(data.get("assignee"))
+        self.updated_at = data.get("updatedAt")
+        self.parent_id = data.get("parentId")
+        self._path = path
+        self._start = start
+        self._end = end
+
+    def raw(self) -> Dict[str, Any]:
+        """Re-read this issue's full JSON object from disk."""
+        with open(self._path, "rb") as f:
+            f.seek(self._start)
+            return json.loads(f.read(self._end - self._start).decode("utf-8"))
+
+    @property
+    def description(self) -> Optional[str]:
+        return self.raw().get("description")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "description":
+            return self.raw().get("description", default)
+        attr = self._KEYS.get(key)
+        if attr is None:
+            return self.raw().get(key, default)
+        value = getattr(self, attr)
+        if key == "labels":
+            return list(value)
+        return default if value is None and key not in ("state", "assignee") else value
+
+    def __repr__(self) -> str:
+        return f"IssueRecord({self.identifier or self.id})"
+
+
+class _Interner:
+    """Share one object per distinct state/label/assignee across all records."""
+
+    def __init__(self) -> None:
+        self._seen: Dict[Any, Any] = {}
+
+    def obj(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return sys.intern(value)
+        if not isinstance(value, dict):
+            return value
+        key = tuple(sorted((k, v) for k, v in value.items() if isinstance(v, (str, int, float, type(None)))))
+        if len(key) != len(value):
+            return value
+        shared = self._seen.get(key)
+        if shared is None:
+            shared = self._seen[key] = {k: sys.intern(v) if isinstance(v, str) else v for k, v in value.items()}
+        return shared
+
+
+class ExportReader:
+    """Read parent_issue_export.json without loading every sub-issue into memory.
+
+    Opening the reader parses only the top-level keys before `subIssues` (normally `meta`
+    and `parentIssue`). Sub-issues are streamed by `iter_sub_issues()`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self._sub_issues_at: Optional[int] = None
+        self._intern = _Interner()
+
+        scanner = _Scanner(path)
+        try:
+            scanner.expect("{")
+            while scanner.peek(",") not in ("}", ""):
+                key, _, _ = scanner.value()
+                scanner.expect(":")
+                if key == "subIssues":
+                    self._sub_issues_at = scanner.byte_pos
+                    if "meta" in self.header and "parentIssue" in self.header:
+                        break
+                    for _ in self._iter_array(scanner):
+                        pass
+                else:
+                    self.header[key], _, _ = scanner.value()
+        finally:
+            scanner.close()
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return self.header.get("meta") or {}
+
+    @property
+    def parent_issue(self) -> Dict[str, Any]:
+        return self.header.get("parentIssue") or {}
+
+    def _iter_array(self, scanner: _Scanner) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+        scanner.expect("[")
+        while scanner.peek(",") not in ("]", ""):
+            yield scanner.value()
+        scanner.expect("]")
+
+    def iter_sub_issues(self) -> Iterator[IssueRecord]:
+        if self._sub_issues_at is None:
+            return
+        scanner = _Scanner(self.path, self._sub_issues_at)
+        try:
+            for data, start, end in self._iter_array(scanner):
+                yield IssueRecord(data, self.path, start, end, self._intern)
+        finally:
+            scanner.close()
+
+    @traced("ExportReader.find")
+    def find(self, ids: Iterable[str]) -> Dict[str, Any]:
+        """Return {id: issue} for the requested ids in one streaming pass.
+
+        The parent issue is returned as its (already loaded) dict; sub-issues as
+        `IssueRecord`s. Ids not present in the export are omitted.
+        """
+        wanted = set(ids)
+        found: Dict[str, Any] = {}
+        parent = self.parent_issue
+        if parent.get("id") in wanted:
+            found[parent["id"]] = parent
+        if len(found) < len(wanted):
+            for rec in self.iter_sub_issues():
+                if rec.id in wanted:
+                    found[rec.id] = rec
+                    if len(found) == len(wanted):
+                        break
+        return found
+
+    def sub_issue_identifiers(self) -> List[Optional[str]]:
+        return [rec.identifier for rec in self.iter_sub_issues()]
+
+
+# Real path -> ((device, inode, size, mtime_ns), reader) for this process.
+_readers: Dict[str, Tuple[Tuple[int, int, int, int], ExportReader]] = {}
+_readers_lock = threading.Lock()
+_MAX_READERS = 16
+
+
+@traced("open_export")
+def open_export(path: str) -> ExportReader:
+    """ExportReader for `path`, reused while (device, inode, size, mtime) are unchanged.
+
+    The exporter replaces the file by rename, so a fresh export always gets a new reader.
+    """
+    key = os.path.realpath(path)
+    st = os.stat(key)
+    sig = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    with _readers_lock:
+        hit = _readers.get(key)
+    if hit and hit[0] == sig:
+        return hit[1]
+    reader = ExportReader(path)
+    with _readers_lock:
+        _readers.pop(key, None)
+        while len(_readers) >= _MAX_READERS:
+            _readers.pop(next(iter(_readers)))
+        _readers[key] = (sig, reader)
+    return reader
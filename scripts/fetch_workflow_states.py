@@ -1,60 +1,38 @@
+import argparse
 import os
-import json
-import urllib.request
 import sys
+from typing import List, Optional
 
-def graphql_request(api_key, query, variables=None):
-    if variables is None:
-        variables = {}
-    body = json.dumps({"query": query, "variables": variables}).encode("utf-8")
-    req = urllib.request.Request(
-        "https://api.linear.app/graphql",
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": api_key,
-        },
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except Exception as e:
-        print(e)
-        return {}
+from export_stream import ExportReader
+from linear_client import get_client
+from team_metadata import load_parent_metadata
+import tracing
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Print the workflow states of the exported parent issue's team.")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory for team metadata (default: local-cache)")
+    ap.add_argument("--refresh", action="store_true", help="Refetch team states even if cached")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "fetch_workflow_states")
 
-def main():
     api_key = os.environ.get("LINEAR_API_KEY")
     # Read parent issue ID from export
     try:
-        with open("./input-output-data/parent_issue_export.json") as f:
-            data = json.load(f)
-            parent_id = data["meta"]["parentIssueId"]
+        parent_id = ExportReader("./input-output-data/parent_issue_export.json").meta["parentIssueId"]
     except:
         print("No export found")
         return
 
-    query = """
-    query GetTeamStates($id: String!) {
-      issue(id: $id) {
-        team {
-          id
-          name
-          states {
-            nodes {
-              id
-              name
-              type
-            }
-          }
-        }
-      }
-    }
-    """
-    res = graphql_request(api_key, query, {"id": parent_id})
-    team = res.get("data", {}).get("issue", {}).get("team", {})
+    try:
+        metadata = load_parent_metadata(get_client(api_key), parent_id, args.cache_dir, refresh=args.refresh)
+    except Exception as e:
+        print(e)
+        metadata = {}
+    team = metadata.get("team", {})
     print(f"Team: {team.get('name')}")
-    for state in team.get("states", {}).get("nodes", []):
+    for state in metadata.get("states", []):
         print(f"State: {state['name']} ({state['type']}) -> {state['id']}")
 
 if __name__ == "__main__":
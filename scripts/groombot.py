@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Single entry point for the groombot scripts.
+
+Why:
+- A session launched a separate interpreter for the exporter, the architecture check,
+  apply_patch.py and create_sub_issues.py. Each launch re-imported everything, re-read
+  the export and opened new connections to Linear.
+
+What this script does:
+- `groombot <command> [args]` runs one script's `main()` with the remaining arguments.
+  A command's module is imported only when that command runs, so `groombot --help` or
+  `groombot artifacts runs ENG-1` does not pay for the Linear client or the exporter.
+- `groombot run` runs the session pipeline in one process: export -> architecture check
+  -> compile (names to ids, validation) -> create -> apply (by default only export and the
+  architecture check, the stages before grooming). The stages share the Linear
+  client (one connection pool, one retry budget), the parsed export header
+  (`export_stream.open_export()`), memoized file hashes and the team metadata cache. A
+  table of per-stage wall time and Linear calls is printed at the end; `--trace FILE`
+  writes a timeline of every stage. With `--dag`, create and apply run as one `execute`
+  stage (execute_patch.py), which also links each split to its source issue.
+
+Usage:
+  python3 ./scripts/groombot.py export ENG-123
+  python3 ./scripts/groombot.py portfolio --project "Payments API"
+  python3 ./scripts/groombot.py apply --patch ./input-output-data/groom_patch.json --export ./input-output-data/parent_issue_export.json --dry-run
+  python3 ./scripts/groombot.py run ENG-123
+  python3 ./scripts/groombot.py run --stages compile,create,apply --apply-args="--batch --workers 4"
+
+Notes:
+- `run` creates before it applies, the documented order (06_CREATE_SUB_ISSUES.md).
+- The patch is groomed from an export, so after grooming run only `--stages compile,create,apply`:
+  re-exporting first would hide edits made in Linear during grooming from the stale check.
+  Stages that include export and compile/create/apply are refused while --patch exists,
+  unless `--reexport` is given.
+"""
+
+import argparse
+import importlib
+import os
+import shlex
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import tracing
+
+# command -> (module, summary). Modules are imported on dispatch.
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "export": ("export_parent_issue", "Export a parent issue and its sub-issues"),
+    "portfolio": ("export_portfolio", "Export every parent issue of a project or team; report grooming status"),
+    "arch": ("ensure_architecture_issue", "Check (or create) the project's architecture anchor"),
+    "compile": ("patch_compiler", "Resolve names to ids in a patch and validate it"),
+    "create": ("create_sub_issues", "Create split sub-issues from a patch"),
+    "apply": ("apply_patch", "Apply a groomed patch"),
+    "execute": ("execute_patch", "Create, relate and apply a patch as one dependency graph"),
+    "states": ("fetch_workflow_states", "Print the parent team's workflow states"),
+    "spool": ("spool_worker", "Apply patches dropped into a spool directory"),
+    "cache": ("cache_store", "Query or maintain the grooming cache"),
+    "artifacts": ("artifact_store", "Query the artifact store"),
+}
+
+STAGES = ("export", "arch", "compile", "create", "apply")
+# Before grooming; the rest run after it, against the export the patch was groomed from.
+DEFAULT_STAGES = ("export", "arch")
+# Stages whose extra arguments can be passed with --<stage>-args.
+STAGE_ARGS = STAGES + ("execute",)
+
+
+def dispatch(command: str, argv: List[str]) -> int:
+    module = importlib.import_module(COMMANDS[command][0])
+    prog = f"groombot {command}"
+    saved = sys.argv
+    sys.argv = [prog] + argv
+    try:
+        rc = module.main(argv)
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = saved
+    return rc or 0
+
+
+def usage() -> str:
+    width = max(len(c) for c in COMMANDS) + 2
+    lines = ["usage: groombot <command> [args ...]", "", "commands:"]
+    lines.append(f"  {'run':<{width}}Run export, architecture check, compile, create and apply in one process")
+    lines.extend(f"  {name:<{width}}{summary}" for name, (_, summary) in COMMANDS.items())
+    lines.append("")
+    lines.append("`groombot <command> --help` shows a command's options.")
+    return "\n".join(lines)
+
+
+def stage_argv(stage: str, args: argparse.Namespace) -> List[str]:
+    dry = ["--dry-run"] if args.dry_run else []
+    cache = ["--cache-dir", args.cache_dir]
+    if stage == "export":
+        argv = [args.identifier, "--out", args.export, "--cache-out", os.path.join(args.cache_dir, "parent_issue_export.json")] + cache
+    elif stage == "arch":
+        argv = ["--export", args.export] + cache + (["--architecture-file", args.architecture_file] if args.architecture_file else dry)
+    elif stage == "compile":
+        # Validate only on a dry run; otherwise names are rewritten to ids in the patch file.
+        argv = ["--patch", args.patch, "--export", args.export] + cache + (["--check"] if args.dry_run else [])
+    else:
+        argv = ["--patch", args.patch, "--export", args.export] + cache + dry
+    return argv + shlex.split(getattr(args, f"{stage}_args") or "")
+
+
+def run_pipeline(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(prog="groombot run", description="Run the session pipeline in one process.")
+    ap.add_argument("identifier", nargs="?", default=None, help="Parent issue identifier, e.g. TEAM-123 (needed for the export stage)")
+    ap.add_argument("--stages", default=",".join(DEFAULT_STAGES), help=f"Comma-separated stages to run, in pipeline order: {','.join(STAGES)} (default: {','.join(DEFAULT_STAGES)})")
+    ap.add_argument("--export", default="./input-output-data/parent_issue_export.json", help="Export path written by the export stage and read by the others")
+    ap.add_argument("--patch", default="./input-output-data/groom_patch.json", help="Path to groom_patch.json for create/apply")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory shared by every stage (default: local-cache)")
+    ap.add_argument("--architecture-file", default=None, help="Create the architecture document from this file if it is missing")
+    ap.add_argument("--dry-run", action="store_true", help="Architecture check, create and apply only report what they would do")
+    ap.add_argument("--dag", action="store_true", help="Run create and apply as one dependency graph (execute_patch.py)")
+    ap.add_argument("--reexport", action="store_true", help="Allow the export stage to overwrite --export when --patch exists and later stages run")
+    for stage in STAGE_ARGS:
+        ap.add_argument(f"--{stage}-args", default="", metavar="ARGS", help=f"Extra arguments for the {stage} stage, as one string (--{stage}-args='...')")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "groombot run")
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+    stages = [s for s in STAGES if s in stages]
+    if "export" in stages and not args.identifier:
+        ap.error("the export stage needs the parent issue identifier")
+    if "export" in stages and set(stages) & {"compile", "create", "apply"} and os.path.exists(args.patch) and not args.reexport:
+        ap.error(f"{args.patch} exists and was groomed from {args.export}; re-exporting would replace that snapshot "
+                 "and hide edits made in Linear during grooming from the stale check. Leave export out of --stages, "
+                 "or pass --reexport.")
+    if args.dag and ("create" in stages or "apply" in stages):
+        stages = [s for s in stages if s not in ("create", "apply")] + ["execute"]
+
+    from linear_client import get_client
+    from metrics import CallWindow
+
+    api_key = os.environ.get("LINEAR_API_KEY", "").strip()
+    if not api_key:
+        print("ERROR: LINEAR_API_KEY is not set.")
+        return 2
+    client = get_client(api_key)
+
+    timings: List[Dict[str, Any]] = []
+    rc = 0
+    for stage in stages:
+        if stage in ("compile", "create", "apply", "execute") and not os.path.exists(args.patch):
+            print(f"No patch at {args.patch}; groom {args.export} first, then run: groombot run --stages compile,create,apply")
+            break
+        print(f"== {stage} ==")
+        window = CallWindow(client)
+        started = time.perf_counter()
+        with tracing.span(stage, "stage"):
+            rc = dispatch(stage, stage_argv(stage, args))
+        calls = window.calls()
+        timings.append({
+            "stage": stage,
+            "rc": rc,
+            "seconds": time.perf_counter() - started,
+            "calls": len(calls),
+            "linearMs": sum(c.get("elapsedMs") or 0 for c in calls),
+        })
+        if rc != 0:
+            print(f"Stage {stage} exited with {rc}; stopping.")
+            if stage == "arch" and rc == 2:
+                print("Provide --architecture-file, or leave arch out of --stages to continue without it.")
+            break
+
+    if timings:
+        print()
+        print(f"{'stage':<8} {'rc':>3} {'seconds':>9} {'calls':>6} {'linear ms':>10}")
+        for t in timings:
+            print(f"{t['stage']:<8} {t['rc']:>3} {t['seconds']:>9.2f} {t['calls']:>6} {t['linearMs']:>10.0f}")
+        total = sum(t["seconds"] for t in timings)
+        print(f"{'total':<8} {rc:>3} {total:>9.2f} {sum(t['calls'] for t in timings):>6} {sum(t['linearMs'] for t in timings):>10.0f}")
+    return rc
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0 if argv else 2
+    command, rest = argv[0], argv[1:]
+    if command == "run":
+        return run_pipeline(rest)
+    if command not in COMMANDS:
+        print(f"groombot: unknown command '{command}'\n", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        return 2
+    return dispatch(command, rest)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
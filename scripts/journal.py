@@ -0,0 +1,93 @@
+"""Per-patch checkpoint journal for apply_patch.py and create_sub_issues.py.
+
+Why:
+- A run that failed partway used to be re-run from the top, re-sending every change that
+  had already succeeded (and, for creates, creating duplicate sub-issues).
+
+What this module does:
+- Appends one JSON line per finished change to local-cache/journal/<patch sha256>.jsonl as
+  soon as it finishes (flushed and fsynced per batch of results).
+- Entries are keyed by kind ("apply" / "create") and a change key, so a rerun of the same
+  patch file skips entries that already succeeded and retries only the rest.
+- The last entry for a key wins; a torn final line from a crash is ignored.
+"""
+
+import datetime as dt
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from tracing import traced
+
+JOURNAL_DIR = "journal"
+
+
+def has_journal(cache_dir: str, patch_sha256: str) -> bool:
+    """True if some run of this patch file left checkpoints (rewriting the file would orphan them)."""
+    return os.path.exists(os.path.join(cache_dir, JOURNAL_DIR, f"{patch_sha256}.jsonl"))
+
+
+def change_key(index: int, change: Dict[str, Any]) -> str:
+    """Key for patch.changes[index]; the position keeps repeated ids apart."""
+    return f"{index}:{change['id']}"
+
+
+class Journal:
+    def __init__(self, cache_dir: Optional[str], patch_sha256: str, kind: str) -> None:
+        """Open the journal for one patch file. `cache_dir=None` keeps it in memory only."""
+        self.kind = kind
+        self.patch_sha256 = patch_sha256
+        self.path = os.path.join(cache_dir, JOURNAL_DIR, f"{patch_sha256}.jsonl") if cache_dir else None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("kind") == kind:
+                        self.entries[entry["key"]] = entry
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Entries whose result succeeded; a rerun skips these."""
+        return {k: e for k, e in self.entries.items() if (e.get("result") or {}).get("success") is True}
+
+    @traced("Journal.record")
+    def record(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Append entries ({"key", "result", ...}) and make them durable before returning."""
+        stamp = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        entries = [dict(item, kind=self.kind, at=stamp) for item in items]
+        if not entries:
+            return
+        with self._lock:
+            for e in entries:
+                self.entries[e["key"]] = e
+            if self.path is None:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e) + "\n" for e in entries))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reset(self) -> None:
+        """Forget this kind's entries (other kinds in the same file are kept)."""
+        with self._lock:
+            self.entries = {}
+            if self.path is None or not os.path.exists(self.path):
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                keep: List[str] = []
+                for line in f:
+                    try:
+                        if json.loads(line).get("kind") != self.kind:
+                            keep.append(line)
+                    except ValueError:
+                        continue
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(keep)
+            os.replace(tmp, self.path)
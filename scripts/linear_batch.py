@@ -0,0 +1,87 @@
+"""Helpers for packing several GraphQL mutations into one request.
+
+Linear accepts one document with many aliased fields, e.g.
+
+    mutation ApplyBatch($u0_id: String!, $u0_input: IssueUpdateInput!, ...) {
+      u0: issueUpdate(id: $u0_id, input: $u0_input) { success }
+      u1: issueUpdate(id: $u1_id, input: $u1_input) { success }
+    }
+
+Each alias succeeds or fails on its own; GraphQL reports failures in `errors[]` with
+`path[0]` set to the alias, which `alias_errors()` maps back.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from tracing import traced
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[List[Any]]:
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield list(items[i:i + size])
+
+
+def canonical_json(obj: Any) -> str:
+    """Stable JSON used to detect identical payloads."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+@traced("build_aliased_document")
+def build_aliased_document(
+    operation: str,
+    name: str,
+    fields: List[Dict[str, Any]],
+    shared: Optional[Dict[str, Tuple[str, Any]]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Build one document from aliased fields.
+
+    Each entry in `fields` looks like:
+      {"alias": "u0", "field": "issueUpdate", "selection": "success",
+       "args": {"id": ("String!", "<uuid>"), "input": ("IssueUpdateInput!", {...})}}
+
+    `shared` ({name: (type, value)}) declares variables once for the whole document, for
+    selections that reference them (e.g. the same filter under every alias).
+
+    Returns (document, variables). Variables are named `<alias>_<arg>`.
+    """
+    var_decls: List[str] = []
+    body: List[str] = []
+    variables: Dict[str, Any] = {}
+
+    for var_name, (gql_type, value) in (shared or {}).items():
+        var_decls.append(f"${var_name}: {gql_type}")
+        variables[var_name] = value
+
+    for f in fields:
+        alias = f["alias"]
+        call_args: List[str] = []
+        for arg_name, (gql_type, value) in f["args"].items():
+            var_name = f"{alias}_{arg_name}"
+            var_decls.append(f"${var_name}: {gql_type}")
+            call_args.append(f"{arg_name}: ${var_name}")
+            variables[var_name] = value
+        body.append(f"  {alias}: {f['field']}({', '.join(call_args)}) {{ {f['selection']} }}")
+
+    header = f"{operation} {name}"
+    if var_decls:
+        header += "(" + ", ".join(var_decls) + ")"
+    return header + " {\n" + "\n".join(body) + "\n}\n", variables
+
+
+def alias_errors(resp: Dict[str, Any], aliases: List[str]) -> Dict[str, Optional[str]]:
+    """Map GraphQL `errors[]` to the aliases they belong to.
+
+    Errors without a path (e.g. a validation error for the whole document) apply to
+    every alias.
+    """
+    per_alias: Dict[str, List[Any]] = {a: [] for a in aliases}
+    for err in resp.get("errors") or []:
+        path = err.get("path") or []
+        if path and path[0] in per_alias:
+            per_alias[path[0]].append(err)
+        else:
+            for a in aliases:
+                per_alias[a].append(err)
+    return {a: (json.dumps(errs) if errs else None) for a, errs in per_alias.items()}
@@ -0,0 +1,261 @@
+"""Shared Linear GraphQL client used by every script in this folder.
+
+Why:
+- Each script used to build a fresh `urllib.request.Request` per call, which meant a new
+  TCP connect + TLS handshake for every mutation and no shared timeout/error handling.
+
+What this module does:
+- Keeps a pool of persistent HTTP/1.1 connections shared by all threads and reuses them.
+- Asks Linear for gzip responses and decompresses them transparently.
+- Records each call in `LinearClient.calls` (plus running totals): operation, HTTP status,
+  latency, request/response bytes on the wire, time spent waiting on the rate limiter,
+  which retry attempt it was, and the rate-limit budget Linear reported as remaining.
+  Each call is tagged with the run (`current_run`) that made it.
+  metrics.py turns these into the `metrics` section of the reports.
+- Optionally waits on a `rate_limit.TokenBucket` before each call and feeds it the
+  rate-limit headers of each response.
+
+Notes:
+- Set `LINEAR_GRAPHQL_ENDPOINT` (e.g. http://127.0.0.1:8787/graphql) to point the scripts
+  at a local stub instead of https://api.linear.app/graphql.
+"""
+
+import contextvars
+import gzip
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from rate_limit import TokenBucket
+from tracing import span
+
+LINEAR_ENDPOINT = "https://api.linear.app/graphql"
+DEFAULT_TIMEOUT = 30.0
+# Per-call records kept in memory; long-running processes (spool_worker.py) would
+# otherwise grow this without bound. Totals are kept separately.
+CALL_HISTORY = 10000
+# Idle kept-alive connections held for reuse; extra ones are closed after their response.
+MAX_IDLE_CONNECTIONS = 16
+
+_OPERATION_RE = re.compile(r"^\s*(?:query|mutation)\s+(\w+)")
+
+# Errors that mean a kept-alive socket was closed underneath us. The request is re-sent
+# once on a fresh connection, but only if the socket came from the idle pool and no
+# response status was read: past that point Linear may have handled the request, and
+# whether to send it again is retry_policy's call (it knows if the call is idempotent).
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+# Run making calls in this context; spool_worker.py sets one per job. Recorded on every
+# call so metrics.CallWindow can tell apart runs that share the client at the same time.
+current_run: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("linear_run", default=None)
+
+
+class LinearHTTPError(Exception):
+    """Raised when Linear answers with an HTTP status >= 400."""
+
+    def __init__(self, status: int, reason: str, body: str, headers: Dict[str, str]) -> None:
+        super().__init__(f"HTTP Error {status}: {reason}: {body[:500]}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.headers = headers
+
+
+def _int_header(headers: Dict[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, ValueError):
+        return None
+
+
+def operation_name(query: str) -> str:
+    m = _OPERATION_RE.match(query)
+    return m.group(1) if m else "anonymous"
+
+
+class LinearClient:
+    def __init__(self, api_key: str, endpoint: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT, rate_limiter: Optional[TokenBucket] = None) -> None:
+        self.api_key = api_key
+        self.endpoint = endpoint or os.environ.get("LINEAR_GRAPHQL_ENDPOINT") or LINEAR_ENDPOINT
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+
+        parts = urllib.parse.urlsplit(self.endpoint)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported endpoint scheme: {self.endpoint}")
+        self._scheme = parts.scheme
+        self._host = parts.hostname or ""
+        self._port = parts.port
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self.calls: Deque[Dict[str, Any]] = deque(maxlen=CALL_HISTORY)
+        self.call_count = 0
+        self.total_ms = 0.0
+        self.connections_opened = 0
+
+    def _checkout(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Take an idle kept-alive connection from the pool, or open a new one.
+
+        Returns (connection, reused).
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        if self._scheme == "https":
+            conn = http.client.HTTPSConnection(self._host, self._port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+        conn.connect()
+        # http.client writes headers and body separately; without TCP_NODELAY every
+        # kept-alive request stalls on Nagle + delayed ACK (~40 ms).
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self.connections_opened += 1
+        return conn, False
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _post(self, body: bytes) -> Tuple[int, str, Dict[str, str], bytes, int]:
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": self.api_key,
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive",
+        }
+        for attempt in range(2):
+            conn, reused = self._checkout()
+            resp = None
+            try:
+                conn.request("POST", self._path, body=body, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if attempt or not reused or resp is not None:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(conn)
+            wire_bytes = len(raw)
+            if resp_headers.get("content-encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            return resp.status, resp.reason, resp_headers, raw, wire_bytes
+        raise RuntimeError("unreachable")
+
+    def _record(self, call: Dict[str, Any], elapsed_ms: float) -> None:
+        with self._lock:
+            self.call_count += 1
+            self.total_ms += elapsed_ms
+            call["seq"] = self.call_count
+            self.calls.append(call)
+
+    def request(self, query: str, variables: Optional[Dict[str, Any]] = None, retry: int = 0) -> Dict[str, Any]:
+        """POST one GraphQL document and return the decoded JSON body.
+
+        `retry` is the attempt number (0 = first try) the caller's retry loop is on; it is
+        only recorded.
+        """
+        body = json.dumps({"query": query, "variables": variables or {}}).encode("utf-8")
+        wait_ms = 0.0
+        if self.rate_limiter is not None:
+            queued = time.perf_counter()
+            with span("rate limit wait", "wait"):
+                self.rate_limiter.acquire()
+            wait_ms = (time.perf_counter() - queued) * 1000.0
+        operation = operation_name(query)
+        call: Dict[str, Any] = {
+            "operation": operation,
+            "run": current_run.get(),
+            "status": None,
+            "retry": retry,
+            "requestBytes": len(body),
+            "responseBytes": 0,
+            "waitMs": round(wait_ms, 2),
+        }
+        started = time.perf_counter()
+        try:
+            with span(operation, "network"):
+                status, reason, headers, raw, wire_bytes = self._post(body)
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            call.update(elapsedMs=round(elapsed_ms, 2), error=type(e).__name__)
+            self._record(call, elapsed_ms)
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(headers, status)
+
+        call.update(
+            status=status,
+            elapsedMs=round(elapsed_ms, 2),
+            responseBytes=wire_bytes,
+            requestsRemaining=_int_header(headers, "x-ratelimit-requests-remaining"),
+            complexityRemaining=_int_header(headers, "x-ratelimit-complexity-remaining"),
+        )
+        self._record(call, elapsed_ms)
+
+        text = raw.decode("utf-8")
+        if status >= 400:
+            raise LinearHTTPError(status, reason, text, headers)
+        return json.loads(text)
+
+    @property
+    def last_call(self) -> Optional[Dict[str, Any]]:
+        return self.calls[-1] if self.calls else None
+
+    def usage_summary(self) -> str:
+        return (
+            f"Linear API: {self.call_count} call(s) over {self.connections_opened} connection(s), "
+            f"{self.total_ms:.0f} ms total"
+        )
+
+
+_clients: Dict[Tuple[str, str], LinearClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str, endpoint: Optional[str] = None) -> LinearClient:
+    """Return the process-wide client for this key/endpoint so callers share connections."""
+    endpoint = endpoint or os.environ.get("LINEAR_GRAPHQL_ENDPOINT") or LINEAR_ENDPOINT
+    key = (api_key, endpoint)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = LinearClient(api_key, endpoint=endpoint)
+            _clients[key] = client
+        return client
@@ -0,0 +1,157 @@
+"""Network and rate-limit metrics for the reports, plus an optional node-exporter textfile.
+
+Why:
+- Reports only said which items succeeded. A slow apply could not be attributed to Linear
+  latency, retries or client-side throttling.
+
+What this module does:
+- `CallWindow(client)` marks the client's call counter; `.summary()` summarizes every call
+  made since by the same run (`linear_client.current_run`): counts by HTTP status, retries, latency, request/response bytes, time spent
+  waiting on the rate limiter (p50/p95/max/total each) and the lowest rate-limit budget
+  Linear reported. apply_patch.py, create_sub_issues.py and ensure_architecture_issue.py
+  store this as the `metrics` section of their reports.
+- `write_textfile(dir, script, summary, success)` writes `<dir>/groombot_<script>.prom`
+  atomically for node-exporter's textfile collector. Enabled per run with
+  `--metrics-textfile-dir DIR` or the GROOMBOT_METRICS_TEXTFILE_DIR environment variable.
+"""
+
+import contextlib
+import math
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from linear_client import LinearClient, current_run
+
+TEXTFILE_DIR_ENV = "GROOMBOT_METRICS_TEXTFILE_DIR"
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` (q in 0..100); None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def distribution(values: Iterable[float]) -> Dict[str, Any]:
+    vals = list(values)
+    return {
+        "p50": percentile(vals, 50),
+        "p95": percentile(vals, 95),
+        "max": max(vals) if vals else None,
+        "total": round(sum(vals), 2),
+    }
+
+
+def summarize(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_status: Dict[str, int] = {}
+    for c in calls:
+        key = str(c["status"]) if c.get("status") is not None else c.get("error") or "error"
+        by_status[key] = by_status.get(key, 0) + 1
+
+    def lowest(field: str) -> Optional[int]:
+        seen = [c[field] for c in calls if c.get(field) is not None]
+        return min(seen) if seen else None
+
+    return {
+        "calls": len(calls),
+        "byStatus": by_status,
+        "failedCalls": sum(1 for c in calls if c.get("status") is None or c["status"] >= 400),
+        "retries": sum(1 for c in calls if c.get("retry")),
+        "latencyMs": distribution(c["elapsedMs"] for c in calls),
+        "requestBytes": distribution(c["requestBytes"] for c in calls),
+        "responseBytes": distribution(c["responseBytes"] for c in calls),
+        "rateLimitWaitMs": distribution(c["waitMs"] for c in calls),
+        "rateLimitRemaining": {
+            "requests": lowest("requestsRemaining"),
+            "complexity": lowest("complexityRemaining"),
+        },
+    }
+
+
+class CallWindow:
+    """The calls a client makes for the current run from construction onwards."""
+
+    def __init__(self, client: LinearClient) -> None:
+        self.client = client
+        self.run = current_run.get()
+        self.start = client.call_count
+        self.started = time.time()
+
+    def calls(self) -> List[Dict[str, Any]]:
+        with self.client._lock:
+            return [c for c in self.client.calls if c["seq"] > self.start and c.get("run") == self.run]
+
+    def summary(self) -> Dict[str, Any]:
+        out = summarize(self.calls())
+        out["wallSeconds"] = round(time.time() - self.started, 3)
+        return out
+
+
+def _line(name: str, labels: Dict[str, str], value: Any) -> str:
+    text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    return f"{name}{{{text}}} {value}\n"
+
+
+def render_textfile(script: str, summary: Dict[str, Any], success: bool) -> str:
+    """Prometheus text exposition of one run's summary (all gauges: values are per run)."""
+    base = {"script": script}
+    out: List[str] = []
+
+    def gauge(name: str, help_text: str, samples: List[tuple]) -> None:
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        out.append(f"# HELP {name} {help_text}\n# TYPE {name} gauge\n")
+        out.extend(_line(name, dict(base, **labels), value) for labels, value in samples)
+
+    gauge("groombot_last_run_timestamp_seconds", "Unix time the last run finished.", [({}, int(time.time()))])
+    gauge("groombot_last_run_success", "1 if the last run finished without failures.", [({}, int(bool(success)))])
+    gauge("groombot_last_run_wall_seconds", "Wall time of the last run.", [({}, summary.get("wallSeconds"))])
+    gauge("groombot_linear_calls", "Linear GraphQL calls in the last run, by HTTP status.",
+          [({"status": status}, n) for status, n in sorted(summary["byStatus"].items())])
+    gauge("groombot_linear_retries", "Calls in the last run that were retries.", [({}, summary["retries"])])
+    for field, name, unit in (
+        ("latencyMs", "groombot_linear_latency_ms", "Linear call latency"),
+        ("rateLimitWaitMs", "groombot_linear_rate_limit_wait_ms", "Time spent waiting on the client-side rate limiter"),
+        ("requestBytes", "groombot_linear_request_bytes", "Request body size"),
+        ("responseBytes", "groombot_linear_response_bytes", "Response body size on the wire"),
+    ):
+        dist = summary[field]
+        gauge(name, f"{unit} in the last run (quantile, max or total).",
+              [({"stat": stat}, dist[stat]) for stat in ("p50", "p95", "max", "total")])
+    gauge("groombot_linear_rate_limit_remaining", "Lowest rate-limit budget Linear reported in the last run.",
+          [({"kind": kind}, value) for kind, value in sorted(summary["rateLimitRemaining"].items())])
+    return "".join(out)
+
+
+def write_textfile(directory: Optional[str], script: str, summary: Dict[str, Any], success: bool) -> Optional[str]:
+    """Write `<directory>/groombot_<script>.prom`; no-op when no directory is configured.
+
+    Metrics are best effort: an OS error is printed as a warning and None is returned, so it
+    never changes a run's outcome.
+    """
+    directory = directory or os.environ.get(TEXTFILE_DIR_ENV)
+    if not directory:
+        return None
+    path = os.path.join(directory, f"groombot_{script}.prom")
+    tmp: Optional[str] = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # The collector may read at any moment: write a temp file unique to this call (runs
+        # in other threads write the same path) and rename it into place.
+        fd, tmp = tempfile.mkstemp(prefix=f".groombot_{script}.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render_textfile(script, summary, success))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"WARNING: could not write metrics textfile {path}: {e}")
+        if tmp is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+        return None
+    return path
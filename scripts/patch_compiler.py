@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Compile groom_patch.json: resolve names to UUIDs and validate it offline.
+
+Why:
+- `stateId`, `labelIds` and `assigneeId` had to be copied by hand as UUIDs. A typo was
+  only found when Linear rejected the mutation, after retries and possibly halfway through
+  a batch apply.
+
+What this module does:
+- Builds a lookup index of the parent team's workflow states, labels (team and workspace)
+  and members from the team metadata cache (one query when the cache is cold).
+- Rewrites name-based fields to ids: `stateName` -> `stateId`, `labelNames` -> `labelIds`
+  (likewise `addedLabelNames`/`removedLabelNames`), `assigneeName` (name, display name or
+  email; null to unassign) -> `assigneeId`, and a change given only an `identifier` gets
+  its `id` from the export.
+- Rejects, before anything is sent: unknown fields, unknown state/label/member ids, ids
+  that are not in the export (or whose identifier does not match), malformed values, and
+  createSubIssues entries without a title or with a splitFromIdentifier not in the export.
+  Unknown names come with the closest known name.
+- Leaves a patch file alone if a create or apply run already journaled it: the journal is
+  keyed by the file's SHA-256, so a rewrite would make the next run re-send everything
+  (including non-idempotent creates). apply_patch.py and execute_patch.py resolve the
+  names in memory instead.
+
+apply_patch.py and execute_patch.py run the same checks in memory before planning
+(`--no-compile` skips them).
+
+CLI:
+  python3 ./scripts/patch_compiler.py --patch ./input-output-data/groom_patch.json \\
+    --export ./input-output-data/parent_issue_export.json          # rewrite in place
+  python3 ./scripts/patch_compiler.py --patch ... --export ... --check   # validate only
+"""
+
+import argparse
+import copy
+import datetime as dt
+import difflib
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import tracing
+from tracing import traced
+
+UPDATE_FIELDS = (
+    "title", "description", "priority", "estimate", "stateId", "assigneeId",
+    "labelIds", "addedLabelIds", "removedLabelIds", "parentId", "dueDate",
+)
+# name-based field -> id field it compiles to
+NAME_FIELDS = {
+    "stateName": "stateId", "assigneeName": "assigneeId", "labelNames": "labelIds",
+    "addedLabelNames": "addedLabelIds", "removedLabelNames": "removedLabelIds",
+}
+LABEL_ID_FIELDS = ("labelIds", "addedLabelIds", "removedLabelIds")
+CHANGE_KEYS = ("id", "identifier", "update")
+CREATE_KEYS = ("title", "description", "estimate", "splitFromIdentifier")
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _norm(name: Any) -> str:
+    return _SPACE_RE.sub(" ", str(name or "").strip().lower())
+
+
+class LookupIndex:
+    """Team states, labels and members by id and by (case-insensitive) name."""
+
+    def __init__(self, metadata: Dict[str, Any]) -> None:
+        self.team = metadata.get("team") or {}
+        self.states = self._index(metadata.get("states") or [], ("name",))
+        self.labels = self._index(metadata.get("labels") or [], ("name",))
+        self.members = self._index(metadata.get("members") or [], ("name", "displayName", "email"))
+
+    @staticmethod
+    def _index(nodes: List[Dict[str, Any]], name_keys: Tuple[str, ...]) -> Dict[str, Any]:
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for n in nodes:
+            for key in name_keys:
+                if n.get(key):
+                    bucket = by_name.setdefault(_norm(n[key]), [])
+                    if n not in bucket:
+                        bucket.append(n)
+        return {"by_id": {n["id"]: n for n in nodes if n.get("id")}, "by_name": by_name}
+
+    def resolve(self, kind: str, name: Any) -> Tuple[Optional[str], Optional[str]]:
+        """(id, None) for a unique name of a state/label/member, else (None, error)."""
+        index = getattr(self, kind)
+        hits = index["by_name"].get(_norm(name)) or []
+        if len(hits) == 1:
+            return hits[0]["id"], None
+        singular = kind[:-1]
+        if hits:
+            ids = ", ".join(h["id"] for h in hits)
+            return None, f"{singular} name '{name}' is ambiguous ({ids}); use the id"
+        close = difflib.get_close_matches(_norm(name), list(index["by_name"]), n=1, cutoff=0.6)
+        hint = f" (did you mean '{index['by_name'][close[0]][0].get('name') or close[0]}'?)" if close else ""
+        return None, f"unknown {singular} '{name}' for team {self.team.get('key') or self.team.get('id')}{hint}"
+
+    def known(self, kind: str, node_id: Any) -> bool:
+        return isinstance(node_id, str) and node_id in getattr(self, kind)["by_id"]
+
+
+def export_issue_ids(export: Any) -> Dict[str, Optional[str]]:
+    """{id: identifier} for the parent issue and every exported sub-issue (one streaming pass)."""
+    ids: Dict[str, Optional[str]] = {}
+    parent = export.parent_issue
+    if parent.get("id"):
+        ids[parent["id"]] = parent.get("identifier")
+    for rec in export.iter_sub_issues():
+        ids[rec.id] = rec.identifier
+    return ids
+
+
+def _check_update(path: str, update: Dict[str, Any], index: LookupIndex, errors: List[str], rewrites: List[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key, value in update.items():
+        if key in NAME_FIELDS:
+            target = NAME_FIELDS[key]
+            if target in update:
+                errors.append(f"{path}.{key}: give either {key} or {target}, not both")
+                continue
+            if target in LABEL_ID_FIELDS:
+                if not isinstance(value, list):
+                    errors.append(f"{path}.{key}: expected a list of label names")
+                    continue
+                resolved = [index.resolve("labels", v) for v in value]
+                bad = [err for _, err in resolved if err]
+                errors.extend(f"{path}.{key}: {err}" for err in bad)
+                if not bad:
+                    out[target] = [i for i, _ in resolved]
+                    rewrites.append(f"{path}.{key} -> {target}")
+            elif key == "assigneeName" and value is None:
+                out[target] = None
+                rewrites.append(f"{path}.{key} -> {target}")
+            else:
+                node_id, err = index.resolve("states" if key == "stateName" else "members", value)
+                if err:
+                    errors.append(f"{path}.{key}: {err}")
+                else:
+                    out[target] = node_id
+                    rewrites.append(f"{path}.{key} -> {target}")
+            continue
+        if key not in UPDATE_FIELDS:
+            close = difflib.get_close_matches(key, list(UPDATE_FIELDS) + list(NAME_FIELDS), n=1)
+            errors.append(f"{path}.{key}: unknown field" + (f" (did you mean '{close[0]}'?)" if close else ""))
+            continue
+        if key == "labelIds" and any(k in update for k in ("addedLabelIds", "removedLabelIds", "addedLabelNames", "removedLabelNames")):
+            errors.append(f"{path}.{key}: give either the full label set or added/removed labels, not both")
+            continue
+        err = _value_error(key, value, index)
+        if err:
+            errors.append(f"{path}.{key}: {err}")
+        out[key] = value
+    return out
+
+
+def _value_error(key: str, value: Any, index: LookupIndex) -> Optional[str]:
+    if key == "title":
+        return None if isinstance(value, str) and value.strip() else "must be a non-empty string"
+    if key == "description":
+        return None if value is None or isinstance(value, str) else "must be a string or null"
+    if key == "priority":
+        return None if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 4 else "must be an integer 0-4"
+    if key == "estimate":
+        ok = value is None or (isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0)
+        return None if ok else "must be a non-negative number or null"
+    if key == "stateId":
+        return None if index.known("states", value) else f"unknown state id {value!r} (use stateName to give a name)"
+    if key == "assigneeId":
+        return None if value is None or index.known("members", value) else f"unknown member id {value!r} (use assigneeName to give a name)"
+    if key in LABEL_ID_FIELDS:
+        if not isinstance(value, list):
+            return "must be a list of label ids"
+        unknown = [v for v in value if not index.known("labels", v)]
+        if unknown:
+            return f"unknown label id(s) {', '.join(map(repr, unknown))} (give names with {key.replace('Ids', 'Names')})"
+        return "contains duplicates" if len(set(value)) != len(value) else None
+    if key == "parentId":
+        return None if value is None or (isinstance(value, str) and _UUID_RE.match(value)) else "must be an issue UUID or null"
+    if key == "dueDate":
+        return None if value is None or (isinstance(value, str) and _DATE_RE.match(value)) else "must be YYYY-MM-DD or null"
+    return None
+
+
+@traced("compile_patch")
+def compile_patch(patch: Dict[str, Any], index: LookupIndex, export_ids: Dict[str, Optional[str]]) -> Tuple[Dict[str, Any], List[str], List[str]]:
+    """Return (compiled patch, errors, rewrites). The input patch is not modified."""
+    out = copy.deepcopy(patch)
+    errors: List[str] = []
+    rewrites: List[str] = []
+    by_identifier = {ident: i for i, ident in export_ids.items() if ident}
+
+    for n, change in enumerate(out.get("changes") or []):
+        path = f"changes[{n}]"
+        if not isinstance(change, dict):
+            errors.append(f"{path}: expected an object")
+            continue
+        for key in change:
+            if key not in CHANGE_KEYS:
+                errors.append(f"{path}.{key}: unknown field")
+        issue_id, identifier = change.get("id"), change.get("identifier")
+        if not issue_id and identifier:
+            issue_id = by_identifier.get(identifier)
+            if issue_id:
+                change = out["changes"][n] = dict({"id": issue_id}, **change)
+                rewrites.append(f"{path}.identifier {identifier} -> id")
+            else:
+                errors.append(f"{path}: {identifier} is not in the export")
+                continue
+        if not issue_id:
+            errors.append(f"{path}: needs an id or identifier")
+            continue
+        if issue_id not in export_ids:
+            errors.append(f"{path}.id: {issue_id} is not in the export" + (f" ({identifier})" if identifier else ""))
+        elif identifier and export_ids[issue_id] and identifier != export_ids[issue_id]:
+            errors.append(f"{path}: id {issue_id} is {export_ids[issue_id]} in the export, not {identifier}")
+        update = change.get("update")
+        if not isinstance(update, dict) or not update:
+            errors.append(f"{path}.update: expected a non-empty object")
+            continue
+        change["update"] = _check_update(f"{path}.update", update, index, errors, rewrites)
+
+    for n, item in enumerate(out.get("createSubIssues") or []):
+        path = f"createSubIssues[{n}]"
+        if not isinstance(item, dict):
+            errors.append(f"{path}: expected an object")
+            continue
+        for key in item:
+            if key not in CREATE_KEYS:
+                errors.append(f"{path}.{key}: unknown field")
+        for key in ("title", "description", "estimate"):
+            if key in item or key == "title":
+                err = _value_error(key, item.get(key), index)
+                if err:
+                    errors.append(f"{path}.{key}: {err}")
+        split_from = item.get("splitFromIdentifier")
+        if split_from and split_from not in by_identifier:
+            errors.append(f"{path}.splitFromIdentifier: {split_from} is not in the export")
+
+    if rewrites:
+        meta = out.setdefault("meta", {})
+        meta["compiledAt"] = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        meta["compiledForTeam"] = {"id": index.team.get("id"), "key": index.team.get("key")}
+    return out, errors, rewrites
+
+
+def print_errors(errors: List[str], limit: int = 50) -> None:
+    print(f"ERROR: the patch has {len(errors)} problem(s); nothing was sent:")
+    for err in errors[:limit]:
+        print(f"  {err}")
+    if len(errors) > limit:
+        print(f"  ... and {len(errors) - limit} more")
+
+
+def compile_for_parent(client: Any, patch: Dict[str, Any], export: Any, cache_dir: str, refresh: bool = False) -> Tuple[Dict[str, Any], List[str], List[str]]:
+    """compile_patch() against the parent's team metadata (cached) and the export."""
+    from team_metadata import MetadataError, load_parent_metadata
+
+    parent_issue_id = (patch.get("meta") or {}).get("parentIssueId") or export.meta.get("parentIssueId")
+    if not parent_issue_id:
+        return patch, ["meta.parentIssueId: missing from both the patch and the export"], []
+    try:
+        metadata = load_parent_metadata(client, parent_issue_id, cache_dir, refresh=refresh)
+    except MetadataError as e:
+        return patch, [f"team metadata: {e}" + (f" {json.dumps(e.errors)}" if e.errors else "")], []
+    return compile_patch(patch, LookupIndex(metadata), export_issue_ids(export))
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    from artifact_store import sha256_file
+    from export_stream import open_export
+    from journal import has_journal
+    from linear_client import get_client
+
+    ap = argparse.ArgumentParser(description="Resolve names to UUIDs in groom_patch.json and validate it offline.")
+    ap.add_argument("--patch", required=True, help="Path to groom_patch.json")
+    ap.add_argument("--export", required=True, help="Path to parent_issue_export.json")
+    ap.add_argument("--out", default=None, help="Where to write the compiled patch (default: rewrite --patch in place)")
+    ap.add_argument("--check", action="store_true", help="Only validate; write nothing")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory for team metadata (default: local-cache)")
+    ap.add_argument("--refresh", action="store_true", help="Refetch team states, labels and members even if cached")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "patch_compiler")
+
+    api_key = os.environ.get("LINEAR_API_KEY", "").strip()
+    if not api_key:
+        print("ERROR: LINEAR_API_KEY is not set.")
+        return 2
+
+    with open(args.patch, "r", encoding="utf-8") as f:
+        patch = json.load(f)
+    compiled, errors, rewrites = compile_for_parent(get_client(api_key), patch, open_export(args.export), args.cache_dir, args.refresh)
+    if errors:
+        print_errors(errors)
+        return 1
+
+    changes = len(compiled.get("changes") or [])
+    creates = len(compiled.get("createSubIssues") or [])
+    if args.check or not rewrites:
+        print(f"OK: {changes} change(s) and {creates} create(s) validated; {len(rewrites)} name(s) to resolve.")
+        if not rewrites and args.out and os.path.abspath(args.out) != os.path.abspath(args.patch) and not args.check:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(compiled, f, indent=2)
+        return 0
+
+    out = args.out or args.patch
+    if os.path.abspath(out) == os.path.abspath(args.patch) and has_journal(args.cache_dir, sha256_file(args.patch, args.cache_dir)):
+        print(f"OK: {changes} change(s) and {creates} create(s) validated; {len(rewrites)} name(s) to resolve.")
+        print(f"Not rewriting {args.patch}: an earlier create/apply run journaled it, and a rewrite would lose its "
+              "checkpoints. apply_patch.py resolves the names in memory (or pass --out to write a compiled copy).")
+        return 0
+    tmp = out + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(compiled, f, indent=2)
+    os.replace(tmp, out)
+    for r in rewrites:
+        print(f"  {r}")
+    print(f"Compiled {changes} change(s) and {creates} create(s); resolved {len(rewrites)} name(s). Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
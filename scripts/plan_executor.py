@@ -0,0 +1,157 @@
+"""Run a set of dependent steps (a DAG) on a bounded thread pool.
+
+Why:
+- Creates and updates ran as two serial passes, so a session with many splits took the
+  sum of all its calls even though most of them do not depend on each other.
+
+What this module does:
+- `Step`s name their prerequisites. A step is started as soon as every prerequisite has
+  succeeded; independent steps run concurrently on `workers` threads.
+- A step whose prerequisite failed is not run; it is reported as skipped with the name of
+  the failed prerequisite.
+- Results are handed to `on_done` from the calling thread as steps finish (so callers can
+  checkpoint them without locking), and `execute()` returns timing for the whole run: wall
+  time, the sum of step times and the longest dependency chain.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from context_pool import ThreadPoolExecutor
+from tracing import span
+
+# run(results of prerequisites by key) -> result dict with at least "success".
+StepFn = Callable[[Dict[str, Dict[str, Any]]], Dict[str, Any]]
+
+
+class PlanError(ValueError):
+    """The steps do not form a DAG (unknown prerequisite or a cycle)."""
+
+
+class Step:
+    def __init__(self, key: str, kind: str, run: StepFn, deps: Iterable[str] = (), label: str = "") -> None:
+        self.key = key
+        self.kind = kind
+        self.run = run
+        self.deps = list(dict.fromkeys(deps))
+        self.label = label or key
+
+
+def _levels(steps: Dict[str, Step]) -> Dict[str, int]:
+    """Depth of every step (1 = no prerequisites); raises PlanError if the steps are not a DAG."""
+    dependents: Dict[str, List[str]] = {k: [] for k in steps}
+    waiting: Dict[str, int] = {}
+    for key, step in steps.items():
+        for d in step.deps:
+            if d not in steps:
+                raise PlanError(f"{key} depends on unknown step {d}")
+            dependents[d].append(key)
+        waiting[key] = len(step.deps)
+
+    levels = {k: 1 for k, n in waiting.items() if n == 0}
+    queue = list(levels)
+    while queue:
+        key = queue.pop()
+        for k in dependents[key]:
+            levels[k] = max(levels.get(k, 1), levels[key] + 1)
+            waiting[k] -= 1
+            if waiting[k] == 0:
+                queue.append(k)
+    if len(levels) < len(steps) or any(waiting.values()):
+        stuck = next(k for k, n in waiting.items() if n)
+        raise PlanError(f"dependency cycle through {stuck}")
+    return levels
+
+
+def describe(steps: List[Step]) -> Dict[str, Any]:
+    """Shape of the plan without running it: step counts by kind and the longest chain."""
+    by_key = {s.key: s for s in steps}
+    levels = _levels(by_key)
+    kinds: Dict[str, int] = {}
+    for s in steps:
+        kinds[s.kind] = kinds.get(s.kind, 0) + 1
+    return {
+        "steps": len(steps),
+        "byKind": kinds,
+        "edges": sum(len(s.deps) for s in steps),
+        "criticalPathSteps": max(levels.values(), default=0),
+    }
+
+
+def execute(
+    steps: List[Step],
+    workers: int,
+    on_done: Optional[Callable[[Step, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Run `steps` in dependency order; returns {"results": {key: result}, "timing": {...}}."""
+    by_key = {s.key: s for s in steps}
+    if len(by_key) != len(steps):
+        raise PlanError("duplicate step keys")
+    levels = _levels(by_key)
+
+    waiting: Dict[str, int] = {s.key: len(s.deps) for s in steps}
+    dependents: Dict[str, List[str]] = {s.key: [] for s in steps}
+    for s in steps:
+        for d in s.deps:
+            dependents[d].append(s.key)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    spans: Dict[str, List[float]] = {}
+    started = time.perf_counter()
+
+    def timed(step: Step, inputs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            with span(step.label, step.kind):
+                return step.run(inputs)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            spans[step.key] = [t0 - started, time.perf_counter() - started]
+
+    def finish(step: Step, result: Dict[str, Any], ready: Deque[str]) -> None:
+        results[step.key] = result
+        if on_done:
+            on_done(step, result)
+        for k in dependents[step.key]:
+            waiting[k] -= 1
+            if waiting[k] == 0:
+                ready.append(k)
+
+    ready: Deque[str] = deque(s.key for s in steps if not s.deps)
+    running: Dict[Future, Step] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while ready or running:
+            while ready:
+                step = by_key[ready.popleft()]
+                failed = [d for d in step.deps if results[d].get("success") is not True]
+                if failed:
+                    result = {"success": False, "skipped": "prerequisite_failed",
+                              "error": f"Not run: prerequisite {by_key[failed[0]].label} did not succeed"}
+                    finish(step, result, ready)
+                    continue
+                running[pool.submit(timed, step, {d: results[d] for d in step.deps})] = step
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for f in done:
+                finish(running.pop(f), f.result(), ready)
+
+    wall = time.perf_counter() - started
+    # Measured critical path: the largest sum of step durations along any dependency chain.
+    chain: Dict[str, float] = {}
+    for key in sorted(by_key, key=lambda k: levels[k]):
+        own = (spans[key][1] - spans[key][0]) if key in spans else 0.0
+        chain[key] = own + max((chain[d] for d in by_key[key].deps), default=0.0)
+    return {
+        "results": results,
+        "timing": {
+            "wallMs": round(wall * 1000, 1),
+            "serialMs": round(sum(e - s for s, e in spans.values()) * 1000, 1),
+            "criticalPathMs": round(max(chain.values(), default=0.0) * 1000, 1),
+            "criticalPathSteps": max(levels.values(), default=0),
+            "workers": max(1, workers),
+        },
+    }
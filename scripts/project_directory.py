@@ -0,0 +1,226 @@
+"""Local directory of the workspace's projects (local-cache/projects.json) with name lookup.
+
+Why:
+- `resolve_project_id()` read only `projects(first: 250)`, so workspaces with more projects
+  failed to resolve silently, and a name that was a substring of several projects resolved
+  to whichever came first.
+
+What this module does:
+- Pages through every project and caches id, name and updatedAt on disk.
+- Refreshes incrementally: only projects updated since the newest cached `updatedAt` are
+  fetched once the cache is older than the TTL (default 24h, GROOMBOT_PROJECTS_TTL seconds).
+  A full refresh (which also drops archived/deleted projects) runs every 7 days or on
+  `refresh=True`.
+- Looks names up through a case-insensitive exact index and a trigram index, so a warm
+  lookup costs no network call and does not scan every project.
+- Returns ranked candidates when a name matches more than one project.
+"""
+
+import datetime as dt
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from linear_client import LinearClient
+from retry_policy import request
+from tracing import traced
+
+CACHE_FILE = "projects.json"
+DEFAULT_TTL_SECONDS = float(os.environ.get("GROOMBOT_PROJECTS_TTL", 24 * 3600))
+FULL_REFRESH_SECONDS = 7 * 24 * 3600
+PAGE_SIZE = 250
+MAX_CANDIDATES = 5
+
+QUERY_PROJECTS_PAGE = """
+query ProjectsPage($first: Int!, $after: String, $filter: ProjectFilter) {
+  projects(first: $first, after: $after, filter: $filter, orderBy: updatedAt) {
+    nodes { id name updatedAt }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+_SPACE_RE = re.compile(r"\s+")
+_MATCH_RANK = {"exact": 0, "prefix": 1, "substring": 2, "fuzzy": 3}
+
+
+class ProjectDirectoryError(RuntimeError):
+    """Linear returned errors while listing projects."""
+
+
+def _utc_now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def _age_seconds(stamp: Optional[str]) -> float:
+    if not stamp:
+        return float("inf")
+    try:
+        then = dt.datetime.fromisoformat(stamp.rstrip("Z"))
+    except ValueError:
+        return float("inf")
+    return (dt.datetime.utcnow() - then).total_seconds()
+
+
+def normalize(name: str) -> str:
+    return _SPACE_RE.sub(" ", (name or "").strip().lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProjectDirectory:
+    def __init__(self, client: LinearClient, cache_dir: str = "local-cache", ttl: float = DEFAULT_TTL_SECONDS) -> None:
+        self.client = client
+        self.path = os.path.join(cache_dir, CACHE_FILE)
+        self.ttl = ttl
+        self.data = self._load()
+        self.requests = 0
+        self._index_built_for: Optional[int] = None
+        self._exact: Dict[str, List[str]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._gram_count: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("projects", {})
+        return data
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    @property
+    def projects(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["projects"]
+
+    # -- refresh ------------------------------------------------------------------
+
+    def _fetch(self, since: Optional[str]) -> List[Dict[str, Any]]:
+        nodes: List[Dict[str, Any]] = []
+        after: Optional[str] = None
+        variables: Dict[str, Any] = {"first": PAGE_SIZE}
+        if since:
+            variables["filter"] = {"updatedAt": {"gt": since}}
+        while True:
+            resp = request(self.client, QUERY_PROJECTS_PAGE, dict(variables, after=after))
+            self.requests += 1
+            if resp.get("errors"):
+                raise ProjectDirectoryError("Could not list projects: " + json.dumps(resp["errors"]))
+            conn = (resp.get("data") or {}).get("projects") or {}
+            nodes.extend(conn.get("nodes") or [])
+            page = conn.get("pageInfo") or {}
+            if not page.get("hasNextPage"):
+                return nodes
+            after = page.get("endCursor")
+
+    def refresh(self, full: bool = False) -> int:
+        """Fetch projects changed since the last refresh (or all of them); returns how many."""
+        full = full or _age_seconds(self.data.get("fullFetchedAt")) >= FULL_REFRESH_SECONDS or not self.projects
+        since = None if full else self.data.get("maxUpdatedAt")
+        nodes = self._fetch(since)
+        if full:
+            self.data["projects"] = {}
+        for n in nodes:
+            self.projects[n["id"]] = {"id": n["id"], "name": n.get("name") or "", "updatedAt": n.get("updatedAt")}
+        stamps = [p["updatedAt"] for p in self.projects.values() if p.get("updatedAt")]
+        self.data["maxUpdatedAt"] = max(stamps) if stamps else None
+        now = _utc_now()
+        self.data["fetchedAt"] = now
+        if full:
+            self.data["fullFetchedAt"] = now
+        self._save()
+        self._index_built_for = None
+        return len(nodes)
+
+    @traced("ProjectDirectory.ensure_fresh")
+    def ensure_fresh(self, refresh: bool = False) -> None:
+        if refresh:
+            self.refresh(full=True)
+        elif _age_seconds(self.data.get("fetchedAt")) >= self.ttl:
+            self.refresh()
+
+    # -- lookup -------------------------------------------------------------------
+
+    def _build_index(self) -> None:
+        if self._index_built_for == len(self.projects):
+            return
+        self._exact = {}
+        self._grams = {}
+        self._gram_count = {}
+        for pid, p in self.projects.items():
+            name = normalize(p["name"])
+            self._exact.setdefault(name, []).append(pid)
+            grams = trigrams(name)
+            self._gram_count[pid] = len(grams)
+            for g in grams:
+                self._grams.setdefault(g, set()).add(pid)
+        self._index_built_for = len(self.projects)
+
+    def candidates(self, name: str, limit: int = MAX_CANDIDATES) -> List[Dict[str, Any]]:
+        """Projects ranked for `name`: exact matches, then substring matches, then trigram overlap."""
+        self._build_index()
+        query = normalize(name)
+        if not query:
+            return []
+        exact = self._exact.get(query) or []
+        if exact:
+            return [dict(self.projects[pid], score=1.0, match="exact") for pid in exact]
+
+        q_grams = trigrams(query)
+        overlap: Dict[str, int] = {}
+        for g in q_grams:
+            for pid in self._grams.get(g, ()):
+                overlap[pid] = overlap.get(pid, 0) + 1
+        if len(query) < 3:
+            # Too short to share an inner trigram with a name that contains it.
+            for pid, p in self.projects.items():
+                if query in normalize(p["name"]):
+                    overlap.setdefault(pid, 0)
+
+        ranked = []
+        for pid, shared in overlap.items():
+            pname = normalize(self.projects[pid]["name"])
+            match = "fuzzy"
+            if query in pname:
+                match = "prefix" if pname.startswith(query) else "substring"
+            # Dice coefficient on trigrams orders projects within the same kind of match.
+            score = 2.0 * shared / (len(q_grams) + self._gram_count[pid])
+            ranked.append(dict(self.projects[pid], score=round(score, 3), match=match))
+        ranked.sort(key=lambda p: (_MATCH_RANK[p["match"]], -p["score"], p["name"].lower()))
+        return ranked[:limit]
+
+    def resolve(self, name: str, refresh: bool = False) -> Dict[str, Any]:
+        """{"project": {...} or None, "candidates": [...]} for a project name.
+
+        A name resolves when it matches exactly one project name (case-insensitive) or is a
+        substring of exactly one. A miss on a warm cache triggers one incremental refresh,
+        in case the project was created since.
+        """
+        self.ensure_fresh(refresh)
+        found = self._resolve_cached(name)
+        if found["project"] is None and self.requests == 0 and all(p["match"] == "fuzzy" for p in found["candidates"]):
+            self.refresh()
+            found = self._resolve_cached(name)
+        return found
+
+    def _resolve_cached(self, name: str) -> Dict[str, Any]:
+        ranked = self.candidates(name)
+        exact = [p for p in ranked if p["match"] == "exact"]
+        contained = [p for p in ranked if p["match"] in ("prefix", "substring")]
+        for group in (exact, contained):
+            if len(group) == 1:
+                return {"project": group[0], "candidates": ranked}
+            if group:
+                return {"project": None, "candidates": group}
+        return {"project": None, "candidates": ranked}
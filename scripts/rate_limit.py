@@ -0,0 +1,112 @@
+"""Client-side token bucket driven by Linear's rate-limit response headers.
+
+Linear reports the remaining budget on every response:
+- X-RateLimit-Requests-Limit / -Remaining / -Reset (reset is epoch milliseconds)
+- X-RateLimit-Complexity-Limit / -Remaining / -Reset
+
+While the request budget is comfortably above the reserve, calls go out as fast as
+`rate` allows (0 = unlimited). Once it drops into the reserve, the bucket paces the
+remaining requests evenly until the reset time instead of running into HTTP 429.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+def _header_budget(headers: Dict[str, str], kind: str) -> Optional[Tuple[float, float, float]]:
+    """Return (limit, remaining, reset_epoch_seconds) for `kind` if present."""
+    try:
+        limit = float(headers[f"x-ratelimit-{kind}-limit"])
+        remaining = float(headers[f"x-ratelimit-{kind}-remaining"])
+        reset = float(headers[f"x-ratelimit-{kind}-reset"]) / 1000.0
+    except (KeyError, ValueError):
+        return None
+    return limit, remaining, reset
+
+
+class TokenBucket:
+    def __init__(self, rate: float = 0.0, capacity: float = 1.0, reserve_fraction: float = 0.1, min_rate: float = 0.05) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.reserve_fraction = reserve_fraction
+        self.min_rate = min_rate
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self.waited_seconds = 0.0
+        self.remaining: Optional[float] = None
+        self._complexity_remaining: Optional[float] = None
+        self._complexity_cost = 1.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Block until one request may be sent; return seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.rate <= 0:
+                    break
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        break
+                    wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            with self._lock:
+                self.waited_seconds += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stop all callers for `seconds` (e.g. after HTTP 429)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+            self.tokens = 0.0
+
+    def observe(self, headers: Dict[str, str], status: int = 200) -> None:
+        """Adjust pacing from the rate-limit headers of a response."""
+        now_wall = time.time()
+        requests = _header_budget(headers, "requests")
+        complexity = _header_budget(headers, "complexity")
+
+        if status == 429:
+            reset_at = max((b[2] for b in (requests, complexity) if b), default=now_wall + 60.0)
+            self.pause(max(1.0, reset_at - now_wall))
+            return
+
+        with self._lock:
+            paced = []
+            if requests:
+                limit, remaining, reset_at = requests
+                self.remaining = remaining
+                if remaining <= limit * self.reserve_fraction:
+                    paced.append(remaining / max(1.0, reset_at - now_wall))
+            if complexity:
+                limit, remaining, reset_at = complexity
+                # Complexity cost per request is not reported; use the largest drop seen.
+                if self._complexity_remaining is not None and remaining < self._complexity_remaining:
+                    self._complexity_cost = max(self._complexity_cost, self._complexity_remaining - remaining)
+                self._complexity_remaining = remaining
+                if remaining <= limit * self.reserve_fraction:
+                    paced.append(remaining / self._complexity_cost / max(1.0, reset_at - now_wall))
+
+            self._refill(time.monotonic())
+            if paced:
+                # Spread what is left evenly over the window instead of bursting into a 429.
+                rate = max(self.min_rate, min(paced))
+                self.rate = min(rate, self.base_rate) if self.base_rate > 0 else rate
+                self.tokens = min(self.tokens, 1.0)
+            else:
+                self.rate = self.base_rate
@@ -0,0 +1,157 @@
+"""Read touched issues back from Linear after a run and check what was stored.
+
+Why:
+- apply_patch.py trusted `issueUpdate.success` and cached `after: update` as sent. What
+  Linear actually stored (a rejected label, a state changed by an automation, a trimmed
+  description) was never checked, short of re-exporting the whole parent.
+
+What this module does:
+- `verify(client, targets)` reads every target issue back with
+  `issues(filter: {id: {in: [...]}})`, READBACK_PAGE_SIZE ids per query, and compares each
+  expected field with the stored value. Label deltas are checked as "these labels are
+  present" / "these labels are absent".
+- Returns the mismatches, the ids Linear did not return, and the stored value of every
+  checked field by issue id, so callers can cache the verified state instead of the patch.
+- Fields the read-back cannot answer (not selected, or more labels than one page) are
+  listed as unverified rather than reported as mismatches.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from linear_batch import chunked
+from linear_client import LinearClient
+from retry_policy import request
+from tracing import traced
+
+READBACK_PAGE_SIZE = 100
+READBACK_LABELS = 50
+
+QUERY_READBACK = """
+query IssuesReadBack($ids: [ID!], $first: Int!) {
+  issues(filter: { id: { in: $ids } }, first: $first) {
+    nodes {
+      id identifier title description priority estimate dueDate updatedAt
+      state { id name }
+      assignee { id name }
+      parent { id }
+      labels(first: %d) { nodes { id name } pageInfo { hasNextPage } }
+    }
+  }
+}
+""" % READBACK_LABELS
+
+# Sentinel for fields the read-back cannot answer.
+_UNKNOWN = object()
+
+
+def read_back(client: LinearClient, ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """Current issue nodes for `ids`; returns (nodes by id, requests)."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    requests = 0
+    for part in chunked(list(dict.fromkeys(ids)), READBACK_PAGE_SIZE):
+        resp = request(client, QUERY_READBACK, {"ids": part, "first": len(part)})
+        requests += 1
+        if resp.get("errors"):
+            raise RuntimeError("Read-back failed: " + json.dumps(resp["errors"]))
+        for node in ((resp.get("data") or {}).get("issues") or {}).get("nodes") or []:
+            nodes[node["id"]] = node
+    return nodes, requests
+
+
+def stored_value(node: Dict[str, Any], field: str) -> Any:
+    """Stored value of an IssueUpdateInput/IssueCreateInput field, or _UNKNOWN."""
+    if field in ("title", "description", "priority", "estimate", "dueDate"):
+        return node[field] if field in node else _UNKNOWN
+    if field == "stateId":
+        return (node.get("state") or {}).get("id", _UNKNOWN)
+    if field == "assigneeId":
+        return (node.get("assignee") or {}).get("id") if "assignee" in node else _UNKNOWN
+    if field == "parentId":
+        return (node.get("parent") or {}).get("id") if "parent" in node else _UNKNOWN
+    if field in ("labelIds", "addedLabelIds", "removedLabelIds"):
+        labels = node.get("labels")
+        if not isinstance(labels, dict) or (labels.get("pageInfo") or {}).get("hasNextPage"):
+            return _UNKNOWN
+        return sorted(l["id"] for l in labels.get("nodes") or [])
+    return _UNKNOWN
+
+
+def matches(field: str, stored: Any, expected: Any) -> bool:
+    if field == "labelIds":
+        return stored == sorted(expected or [])
+    if field == "addedLabelIds":
+        return set(expected or []) <= set(stored)
+    if field == "removedLabelIds":
+        return not set(expected or []) & set(stored)
+    if field == "description" and isinstance(stored, str) and isinstance(expected, str):
+        return stored.strip() == expected.strip()
+    if field == "estimate" and stored is not None and expected is not None:
+        return float(stored) == float(expected)
+    return stored == expected
+
+
+@traced("verify")
+def verify(client: LinearClient, targets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Check `targets` ({"id", "identifier", "expected": {field: value}}) against Linear.
+
+    Returns {"checked", "requests", "mismatches", "missing", "unverified", "stored"}; "stored"
+    maps issue id -> {field: stored value} for every field that could be read back.
+    """
+    targets = [t for t in targets if t.get("id") and t.get("expected")]
+    nodes, requests = read_back(client, [t["id"] for t in targets]) if targets else ({}, 0)
+
+    mismatches: List[Dict[str, Any]] = []
+    missing: List[str] = []
+    unverified: Dict[str, List[str]] = {}
+    stored: Dict[str, Dict[str, Any]] = {}
+    for t in targets:
+        label = t.get("identifier") or t["id"]
+        node = nodes.get(t["id"])
+        if node is None:
+            missing.append(label)
+            continue
+        for field, expected in t["expected"].items():
+            value = stored_value(node, field)
+            if value is _UNKNOWN:
+                unverified.setdefault(label, []).append(field)
+                continue
+            stored.setdefault(t["id"], {})[field] = value
+            if not matches(field, value, expected):
+                mismatches.append({"id": t["id"], "identifier": node.get("identifier") or t.get("identifier"),
+                                   "field": field, "expected": expected, "stored": value})
+    return {
+        "checked": len(targets),
+        "requests": requests,
+        "mismatches": mismatches,
+        "missing": missing,
+        "unverified": unverified,
+        "stored": stored,
+    }
+
+
+def print_summary(verification: Dict[str, Any]) -> None:
+    bad = verification["mismatches"]
+    print(
+        f"Verify: read back {verification['checked']} issue(s) in {verification['requests']} request(s); "
+        f"{len(bad)} mismatch(es), {len(verification['missing'])} missing"
+    )
+    for m in bad[:20]:
+        print(f"  MISMATCH {m['identifier'] or m['id']}.{m['field']}: expected {json.dumps(m['expected'])}, stored {json.dumps(m['stored'])}")
+    if len(bad) > 20:
+        print(f"  ... and {len(bad) - 20} more (see the report)")
+    for label in verification["missing"]:
+        print(f"  MISSING {label}: not returned by Linear")
+
+
+def annotate(results: List[Optional[Dict[str, Any]]], verification: Dict[str, Any], id_of: Any) -> None:
+    """Mark results as verified or list their mismatched fields; id_of(result) -> issue id."""
+    bad: Dict[str, List[str]] = {}
+    for m in verification["mismatches"]:
+        bad.setdefault(m["id"], []).append(m["field"])
+    for r in results:
+        issue_id = id_of(r) if r else None
+        if issue_id and issue_id in verification["stored"]:
+            r["verified"] = issue_id not in bad
+            if issue_id in bad:
+                r["mismatchedFields"] = bad[issue_id]
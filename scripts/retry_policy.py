@@ -0,0 +1,248 @@
+"""One retry policy for every Linear call made by the scripts in this folder.
+
+Why:
+- Each script had its own backoff loop that retried on *any* exception, including HTTP
+  400/401 that can never succeed, and slept again after the final attempt. A bad API key
+  cost ~30s of sleeping per change.
+
+What this module does:
+- Classifies failures: HTTP status (429, 408 and 5xx retry; other 4xx are fatal),
+  GraphQL `extensions.code` (RATELIMITED and server-side codes retry; validation, auth and
+  not-found are fatal) and network errors (retry).
+- Waits as long as `Retry-After` or the X-RateLimit-*-Reset headers ask, otherwise uses
+  jittered exponential backoff ("full jitter": uniform(0, min(cap, base * 2^attempt))).
+- Never sleeps after the last attempt.
+- Shares a retry time budget across the whole run (GROOMBOT_RETRY_BUDGET seconds,
+  default 120): once spent, failures are returned immediately instead of retried.
+  A process that runs several jobs at once (spool_worker.py) gives each job its own
+  budget with `run_budget()`; it follows the job into its pool threads (context_pool).
+- Non-idempotent calls (issueCreate, documentCreate) are only retried when Linear cannot
+  have processed the request (rate limited, connection refused, 503).
+"""
+
+import contextlib
+import contextvars
+import email.utils
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from linear_client import LinearClient, LinearHTTPError, operation_name
+from tracing import span
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 16.0
+DEFAULT_BUDGET_SECONDS = float(os.environ.get("GROOMBOT_RETRY_BUDGET", 120))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# GraphQL error codes worth retrying; anything else (validation, auth, not found) is fatal.
+RETRYABLE_CODES = {"RATELIMITED", "INTERNAL_SERVER_ERROR", "SERVICE_UNAVAILABLE", "TIMEOUT"}
+# Failures where Linear cannot have applied the request, so even creates may be re-sent.
+UNPROCESSED_STATUS = {429, 503}
+UNPROCESSED_CODES = {"RATELIMITED"}
+
+
+def _error_codes(errors: Optional[List[Dict[str, Any]]]) -> List[str]:
+    return [str(((e or {}).get("extensions") or {}).get("code") or "") for e in errors or []]
+
+
+def _body_errors(body: str) -> List[Dict[str, Any]]:
+    try:
+        return (json.loads(body) or {}).get("errors") or []
+    except (ValueError, AttributeError):
+        return []
+
+
+def retry_after_seconds(headers: Dict[str, str]) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After or an exhausted rate-limit window."""
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    waits = []
+    for kind in ("requests", "complexity"):
+        try:
+            remaining = float(headers[f"x-ratelimit-{kind}-remaining"])
+            reset = float(headers[f"x-ratelimit-{kind}-reset"]) / 1000.0
+        except (KeyError, ValueError):
+            continue
+        if remaining <= 0:
+            waits.append(max(0.0, reset - time.time()))
+    return max(waits) if waits else None
+
+
+class Failure:
+    """Why a call failed, whether to retry, and how long the server asked us to wait."""
+
+    def __init__(self, reason: str, retryable: bool, unprocessed: bool = False, wait: Optional[float] = None) -> None:
+        self.reason = reason
+        self.retryable = retryable
+        self.unprocessed = unprocessed
+        self.wait = wait
+
+
+def classify_exception(exc: BaseException) -> Failure:
+    if isinstance(exc, LinearHTTPError):
+        codes = _error_codes(_body_errors(exc.body))
+        wait = retry_after_seconds(exc.headers)
+        if "RATELIMITED" in codes:
+            return Failure(f"HTTP {exc.status} RATELIMITED", True, True, wait)
+        retryable = exc.status in RETRYABLE_STATUS
+        return Failure(f"HTTP {exc.status} {exc.reason}", retryable, exc.status in UNPROCESSED_STATUS, wait)
+    if isinstance(exc, ConnectionRefusedError):
+        return Failure("connection refused", True, True)
+    if isinstance(exc, (socket.timeout, TimeoutError)):
+        return Failure("timed out", True)
+    if isinstance(exc, (ConnectionError, http.client.HTTPException, OSError)):
+        return Failure(f"{type(exc).__name__}: {exc}", True)
+    return Failure(f"{type(exc).__name__}: {exc}", False)
+
+
+def classify_response(resp: Dict[str, Any]) -> Optional[Failure]:
+    """A failure for responses that errored as a whole with only retryable codes, else None.
+
+    Responses that carry data alongside errors (e.g. one failed alias in a batch) are
+    returned to the caller as-is: part of the document may already have been applied.
+    """
+    errors = resp.get("errors")
+    if not errors:
+        return None
+    data = resp.get("data")
+    if data and any(v is not None for v in data.values()):
+        return None
+    codes = _error_codes(errors)
+    if codes and all(c in RETRYABLE_CODES for c in codes):
+        return Failure("GraphQL " + ",".join(sorted(set(codes))), True, all(c in UNPROCESSED_CODES for c in codes))
+    return None
+
+
+class RetryBudget:
+    """Backoff seconds one run may spend sleeping before retries."""
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.slept_seconds = 0.0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, delay: float) -> bool:
+        """Take `delay` seconds from the budget; False if it does not fit."""
+        with self._lock:
+            if self.slept_seconds + delay > self.seconds:
+                return False
+            self.slept_seconds += delay
+            self.retries += 1
+            return True
+
+
+# Budget of the run in this context; None means the policy's own (process-wide) budget.
+_run_budget: "contextvars.ContextVar[Optional[RetryBudget]]" = contextvars.ContextVar("retry_budget", default=None)
+
+
+@contextlib.contextmanager
+def run_budget(seconds: Optional[float] = None) -> Iterator[RetryBudget]:
+    """Give calls made in this context (and pools started from it) a budget of their own."""
+    budget = RetryBudget(get_policy().budget_seconds if seconds is None else seconds)
+    token = _run_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _run_budget.reset(token)
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        budget_seconds: float = DEFAULT_BUDGET_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_seconds = budget_seconds
+        self.sleep = sleep
+        self.budget = RetryBudget(budget_seconds)
+
+    def current_budget(self) -> RetryBudget:
+        return _run_budget.get() or self.budget
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def request(
+        self,
+        client: LinearClient,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        idempotent: bool = True,
+    ) -> Dict[str, Any]:
+        """`client.request()` with retries.
+
+        Returns the response (which may still carry non-retryable GraphQL errors for the
+        caller to report). Raises the last exception when it is fatal or retries run out.
+        """
+        for attempt in range(self.max_attempts):
+            resp: Optional[Dict[str, Any]] = None
+            try:
+                resp = client.request(query, variables, retry=attempt)
+                failure = classify_response(resp)
+                if failure is None:
+                    return resp
+            except Exception as e:
+                failure = classify_exception(e)
+                if not failure.retryable or (not idempotent and not failure.unprocessed):
+                    raise
+                last_exc: Optional[BaseException] = e
+            else:
+                last_exc = None
+                if not idempotent and not failure.unprocessed:
+                    return resp
+
+            if attempt + 1 >= self.max_attempts:
+                break
+            delay = failure.wait if failure.wait is not None else self.backoff(attempt)
+            budget = self.current_budget()
+            delay = min(delay, budget.seconds)
+            if not budget.reserve(delay):
+                print(f"Retry budget ({budget.seconds:.0f}s) spent; not retrying {operation_name(query)} ({failure.reason})", file=sys.stderr)
+                break
+            print(f"Retrying {operation_name(query)} in {delay:.1f}s ({failure.reason})", file=sys.stderr)
+            with span("retry backoff", "wait", {"operation": operation_name(query), "reason": failure.reason}):
+                self.sleep(delay)
+
+        if last_exc is not None:
+            raise last_exc
+        assert resp is not None
+        return resp
+
+
+_default: Optional[RetryPolicy] = None
+_default_lock = threading.Lock()
+
+
+def get_policy() -> RetryPolicy:
+    """The process-wide policy, so every call in a run draws on one retry budget."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RetryPolicy()
+        return _default
+
+
+def request(client: LinearClient, query: str, variables: Optional[Dict[str, Any]] = None, idempotent: bool = True) -> Dict[str, Any]:
+    return get_policy().request(client, query, variables, idempotent)
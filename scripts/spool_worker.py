@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Long-running worker that applies groom patches dropped into a spool directory.
+
+Why:
+- Each patch needed someone to run apply_patch.py and then create_sub_issues.py by hand,
+  one parent at a time, paying interpreter startup and connection setup on every run.
+
+What this script does:
+- Watches `<spool>/incoming/` for job folders that contain both `groom_patch.json` and
+  `parent_issue_export.json`. A job is picked up once neither file has changed for
+  `--settle` seconds (or immediately if the folder was renamed into place).
+- Feeds ready jobs through a bounded queue to `--workers` threads. Each thread runs
+  create_sub_issues and then apply_patch in-process, sharing one Linear client and its
+  kept-alive connections. Jobs for the same parent issue never run at the same time.
+- Writes reports and a `worker.log` into the job folder, then moves it to `<spool>/done/`
+  or `<spool>/failed/`.
+- Keeps `<spool>/status.json` current with queue depth, jobs in flight, throughput and
+  recent jobs.
+
+Usage:
+  python3 ./scripts/spool_worker.py --spool ./spool
+  python3 ./scripts/spool_worker.py --spool ./spool --once   # drain incoming/ and exit
+
+Submitting a job:
+  mkdir -p spool/incoming/ENG-123.tmp
+  cp input-output-data/groom_patch.json input-output-data/parent_issue_export.json spool/incoming/ENG-123.tmp/
+  mv spool/incoming/ENG-123.tmp spool/incoming/ENG-123
+"""
+
+import argparse
+import contextvars
+import datetime as dt
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import apply_patch
+import create_sub_issues
+from export_stream import open_export
+from linear_client import current_run, get_client
+from retry_policy import run_budget
+import tracing
+from tracing import traced
+
+PATCH_NAME = "groom_patch.json"
+EXPORT_NAME = "parent_issue_export.json"
+STATUS_NAME = "status.json"
+LOG_NAME = "worker.log"
+SPOOL_DIRS = ("incoming", "processing", "done", "failed")
+RECENT_JOBS = 20
+
+
+def utc_now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+@traced("load_json")
+def load_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Log file of the job running in this context. Pool threads the scripts start
+# (context_pool.ThreadPoolExecutor) run in a copy of the job's context, so their output
+# reaches the same log.
+_job_log: "contextvars.ContextVar[Optional[Any]]" = contextvars.ContextVar("spool_job_log", default=None)
+
+
+class _JobOutput:
+    """sys.stdout/sys.stderr stand-in that sends a job's output to its job log."""
+
+    def __init__(self, fallback: Any) -> None:
+        self.fallback = fallback
+
+    def write(self, text: str) -> int:
+        return (_job_log.get() or self.fallback).write(text)
+
+    def flush(self) -> None:
+        (_job_log.get() or self.fallback).flush()
+
+
+class SpoolWorker:
+    def __init__(
+        self,
+        spool_dir: str,
+        cache_dir: str,
+        workers: int = 2,
+        queue_size: int = 8,
+        settle: float = 2.0,
+        apply_args: Optional[List[str]] = None,
+    ) -> None:
+        self.spool_dir = spool_dir
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.settle = settle
+        self.apply_args = apply_args or []
+        self.queue: "queue.Queue[str]" = queue.Queue(maxsize=max(1, queue_size))
+        self.stop = threading.Event()
+
+        self._lock = threading.Lock()
+        self._queued: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._parent_locks: Dict[str, threading.Lock] = {}
+        self._started = time.time()
+        self._stats = {"done": 0, "failed": 0, "changes": 0, "created": 0}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_JOBS)
+        self._waiting = 0
+
+        for name in SPOOL_DIRS:
+            os.makedirs(self._dir(name), exist_ok=True)
+
+    def _dir(self, name: str, job: Optional[str] = None) -> str:
+        path = os.path.join(self.spool_dir, name)
+        return os.path.join(path, job) if job else path
+
+    # -- discovery ------------------------------------------------------------
+
+    def recover(self) -> None:
+        """Requeue jobs left in processing/ by a worker that was killed mid-job."""
+        for job in sorted(os.listdir(self._dir("processing"))):
+            os.replace(self._dir("processing", job), self._unique(self._dir("incoming"), job))
+
+    def _is_ready(self, job: str) -> bool:
+        path = self._dir("incoming", job)
+        if job.startswith(".") or job.endswith(".tmp") or not os.path.isdir(path):
+            return False
+        try:
+            newest = max(os.stat(os.path.join(path, name)).st_mtime for name in (PATCH_NAME, EXPORT_NAME))
+        except OSError:
+            return False
+        return time.time() - newest >= self.settle
+
+    def scan(self) -> int:
+        """Queue ready jobs (oldest first) until the queue is full; return how many were queued."""
+        incoming = self._dir("incoming")
+        jobs = [j for j in os.listdir(incoming) if j not in self._queued and self._is_ready(j)]
+        jobs.sort(key=lambda j: os.stat(os.path.join(incoming, j)).st_mtime)
+        queued = 0
+        for job in jobs:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                break
+            with self._lock:
+                self._queued.add(job)
+            queued += 1
+        with self._lock:
+            self._waiting = len(jobs) - queued
+        return queued
+
+    # -- processing -----------------------------------------------------------
+
+    def _unique(self, parent: str, job: str) -> str:
+        dest = os.path.join(parent, job)
+        if os.path.exists(dest):
+            dest += "-" + dt.datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        return dest
+
+    def _parent_lock(self, parent_issue_id: str) -> threading.Lock:
+        with self._lock:
+            return self._parent_locks.setdefault(parent_issue_id, threading.Lock())
+
+    def run_job(self, job: str) -> None:
+        work = self._dir("processing", job)
+        try:
+            os.replace(self._dir("incoming", job), work)
+        except OSError:
+            # Withdrawn from incoming/ after it was queued.
+            with self._lock:
+                self._queued.discard(job)
+            return
+        with self._lock:
+            self._queued.discard(job)
+            self._in_flight.add(job)
+
+        started = time.time()
+        patch = os.path.join(work, PATCH_NAME)
+        export = os.path.join(work, EXPORT_NAME)
+        stage = "create"
+        rc = 1
+        with open(os.path.join(work, LOG_NAME), "a", encoding="utf-8") as log:
+            token = _job_log.set(log)
+            # Tags this job's Linear calls so its report metrics leave out concurrent jobs.
+            run_token = current_run.set(f"{job}@{started}")
+            try:
+                parent_issue_id = open_export(export).meta.get("parentIssueId") or job
+                # The retry budget is per run; for a long-lived worker a run is one job.
+                with self._parent_lock(parent_issue_id), run_budget():
+                    # Same order as the manual flow: create split sub-issues, then apply updates.
+                    rc = create_sub_issues.main([
+                        "--patch", patch, "--export", export,
+                        "--out", os.path.join(work, "create_report.json"),
+                        "--cache-dir", self.cache_dir,
+                    ] + (["--dry-run"] if "--dry-run" in self.apply_args else []))
+                    if rc == 0:
+                        stage = "apply"
+                        rc = apply_patch.main([
+                            "--patch", patch, "--export", export,
+                            "--out", os.path.join(work, "apply_report.json"),
+                            "--cache-dir", self.cache_dir,
+                        ] + self.apply_args)
+            except SystemExit as e:
+                rc = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc(file=log)
+                rc = 1
+            finally:
+                current_run.reset(run_token)
+                _job_log.reset(token)
+
+        ok = rc == 0
+        dest = self._unique(self._dir("done" if ok else "failed"), job)
+        os.replace(work, dest)
+
+        changes = len(load_json(os.path.join(dest, "apply_report.json")).get("results") or [])
+        created = sum(1 for r in load_json(os.path.join(dest, "create_report.json")).get("creates") or [] if r.get("success"))
+        with self._lock:
+            self._in_flight.discard(job)
+            self._stats["done" if ok else "failed"] += 1
+            self._stats["changes"] += changes
+            self._stats["created"] += created
+            self._recent.appendleft({
+                "job": job,
+                "status": "done" if ok else "failed",
+                "failedStage": None if ok else stage,
+                "exitCode": rc,
+                "changes": changes,
+                "created": created,
+                "seconds": round(time.time() - started, 3),
+                "finishedAt": utc_now(),
+                "path": os.path.relpath(dest, self.spool_dir),
+            })
+        print(f"[{'done' if ok else 'FAILED'}] {job} ({changes} change(s), {created} created, {time.time() - started:.2f}s)")
+
+    def _worker(self) -> None:
+        while not self.stop.is_set():
+            try:
+                job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.run_job(job)
+            finally:
+                self.queue.task_done()
+
+    # -- status ---------------------------------------------------------------
+
+    def status(self) -> Dict[str, Any]:
+        uptime = max(1e-9, time.time() - self._started)
+        client = get_client(os.environ.get("LINEAR_API_KEY", ""))
+        with self._lock:
+            finished = self._stats["done"] + self._stats["failed"]
+            return {
+                "updatedAt": utc_now(),
+                "startedAt": dt.datetime.utcfromtimestamp(self._started).replace(microsecond=0).isoformat() + "Z",
+                "pid": os.getpid(),
+                "workers": self.workers,
+                "queueDepth": self.queue.qsize(),
+                "queueCapacity": self.queue.maxsize,
+                "waiting": self._waiting,
+                "inFlight": sorted(self._in_flight),
+                "jobsDone": self._stats["done"],
+                "jobsFailed": self._stats["failed"],
+                "changesApplied": self._stats["changes"],
+                "subIssuesCreated": self._stats["created"],
+                "jobsPerMinute": round(finished * 60.0 / uptime, 3),
+                "changesPerSecond": round(self._stats["changes"] / uptime, 3),
+                "api": {
+                    "calls": client.call_count,
+                    "connectionsOpened": client.connections_opened,
+                    "totalMs": round(client.total_ms, 1),
+                },
+                "recentJobs": list(self._recent),
+            }
+
+    def write_status(self) -> None:
+        path = os.path.join(self.spool_dir, STATUS_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(tmp, path)
+
+    # -- main loop ------------------------------------------------------------
+
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._queued and not self._in_flight and not self._waiting
+
+    def run(self, poll: float = 2.0, once: bool = False) -> None:
+        real_stdout, real_stderr = sys.stdout, sys.stderr
+        sys.stdout = _JobOutput(real_stdout)
+        sys.stderr = _JobOutput(real_stderr)
+        threads = [threading.Thread(target=self._worker, name=f"spool-{i}", daemon=True) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            self.recover()
+            while not self.stop.is_set():
+                self.scan()
+                self.write_status()
+                if once and self.idle() and not any(self._is_ready(j) for j in os.listdir(self._dir("incoming"))):
+                    break
+                self.stop.wait(poll)
+        finally:
+            self.stop.set()
+            for t in threads:
+                t.join()
+            self.write_status()
+            sys.stdout, sys.stderr = real_stdout, real_stderr
+
+
+@tracing.entry_point
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Apply groom patches dropped into a spool directory.")
+    ap.add_argument("--spool", default="spool", help="Spool directory (default: spool)")
+    ap.add_argument("--cache-dir", default="local-cache", help="Cache directory (default: local-cache)")
+    ap.add_argument("--workers", type=int, default=2, help="Jobs processed concurrently (default: 2)")
+    ap.add_argument("--queue-size", type=int, default=8, help="Max jobs queued ahead of the workers (default: 8)")
+    ap.add_argument("--poll", type=float, default=2.0, help="Seconds between scans of incoming/ (default: 2)")
+    ap.add_argument("--settle", type=float, default=2.0, help="Seconds a job's files must be unchanged before pickup (default: 2)")
+    ap.add_argument("--once", action="store_true", help="Process what is in incoming/ and exit")
+    ap.add_argument("--batch", action="store_true", help="Pass --batch to apply_patch.py")
+    ap.add_argument("--apply-workers", type=int, default=1, help="Pass --workers to apply_patch.py (default: 1)")
+    ap.add_argument("--on-stale", choices=("skip", "apply"), default="skip", help="Pass --on-stale to apply_patch.py (default: skip)")
+    ap.add_argument("--dry-run", action="store_true", help="Dry-run apply and create for every job")
+    tracing.add_arguments(ap)
+    args = ap.parse_args(argv)
+    tracing.start_from_args(args, "spool_worker")
+
+    if not os.environ.get("LINEAR_API_KEY"):
+        print("ERROR: LINEAR_API_KEY not set. Run: source ~/.zshrc", file=sys.stderr)
+        return 2
+
+    apply_args = ["--workers", str(args.apply_workers), "--on-stale", args.on_stale]
+    if args.batch:
+        apply_args.append("--batch")
+    if args.dry_run:
+        apply_args.append("--dry-run")
+
+    worker = SpoolWorker(args.spool, args.cache_dir, args.workers, args.queue_size, args.settle, apply_args)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop.set())
+    print(f"Watching {os.path.abspath(os.path.join(args.spool, 'incoming'))} with {worker.workers} worker(s). Ctrl-C to stop.")
+    try:
+        worker.run(poll=args.poll, once=args.once)
+    except KeyboardInterrupt:
+        worker.stop.set()
+    status = worker.status()
+    print(f"Processed {status['jobsDone']} job(s), {status['jobsFailed']} failed. {get_client(os.environ['LINEAR_API_KEY']).usage_summary()}")
+    return 0 if status["jobsFailed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
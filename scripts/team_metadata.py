@@ -0,0 +1,271 @@
+"""On-disk cache of team/project metadata for a parent issue (local-cache/team_metadata.json).
+
+Why:
+- create_sub_issues.py, ensure_architecture_issue.py and fetch_workflow_states.py each
+  asked Linear for the parent's team, project and workflow states on every run. That data
+  almost never changes during a session.
+
+What this module does:
+- Fetches team, project, workflow states, labels (the team's and workspace-wide ones) and
+  team members for a parent issue in one query (labels and members are paginated), and
+  stores the result keyed by parent issue id and team id.
+- Serves later lookups from disk until the entry is older than the TTL
+  (default 24h, override with GROOMBOT_METADATA_TTL seconds), or `--refresh` is passed.
+- Writes are merged into the file's current contents under a thread and file lock
+  (team_metadata.json.lock), so concurrent scripts do not drop each other's entries.
+"""
+
+import contextlib
+import datetime as dt
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies.
+    fcntl = None  # type: ignore[assignment]
+
+from linear_client import LinearClient
+from retry_policy import request
+from tracing import traced
+
+CACHE_FILE = "team_metadata.json"
+DEFAULT_TTL_SECONDS = float(os.environ.get("GROOMBOT_METADATA_TTL", 24 * 3600))
+PAGE_SIZE = 250
+
+# Serializes read-merge-write of the cache file between threads; _locked() adds a file lock
+# for other processes (parallel scripts, spool jobs).
+_write_lock = threading.Lock()
+
+QUERY_PARENT_METADATA = """
+query ParentIssueMetadata($id: String!, $first: Int!) {
+  issue(id: $id) {
+    id
+    identifier
+    project { id name }
+    team {
+      id
+      key
+      name
+      states(first: 100) { nodes { id name type position } }
+      labels(first: $first) {
+        nodes { id name }
+        pageInfo { hasNextPage endCursor }
+      }
+      members(first: $first) {
+        nodes { id name displayName email active }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+  }
+  workspaceLabels: issueLabels(filter: { team: { null: true } }, first: $first) {
+    nodes { id name }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+QUERY_TEAM_LABELS = """
+query TeamLabels($id: String!, $first: Int!, $after: String) {
+  team(id: $id) {
+    labels(first: $first, after: $after) {
+      nodes { id name }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+QUERY_TEAM_MEMBERS = """
+query TeamMembers($id: String!, $first: Int!, $after: String) {
+  team(id: $id) {
+    members(first: $first, after: $after) {
+      nodes { id name displayName email active }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+QUERY_WORKSPACE_LABELS = """
+query WorkspaceLabels($first: Int!, $after: String) {
+  issueLabels(filter: { team: { null: true } }, first: $first, after: $after) {
+    nodes { id name }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+
+class MetadataError(RuntimeError):
+    """Linear returned errors (or nothing) for the parent issue metadata query."""
+
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None) -> None:
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _utc_now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def _age_seconds(stamp: Optional[str]) -> float:
+    if not stamp:
+        return float("inf")
+    try:
+        then = dt.datetime.fromisoformat(stamp.rstrip("Z"))
+    except ValueError:
+        return float("inf")
+    return (dt.datetime.utcnow() - then).total_seconds()
+
+
+def _load(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault("parents", {})
+    data.setdefault("teams", {})
+    return data
+
+
+def _save(path: str, data: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".team_metadata.", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+@contextlib.contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold the module lock and an exclusive lock on `path`.lock."""
+    with _write_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _rest(
+    client: LinearClient,
+    first_page: Optional[Dict[str, Any]],
+    query: str,
+    variables: Dict[str, Any],
+    path: Tuple[str, ...],
+    what: str,
+) -> List[Dict[str, Any]]:
+    """Nodes of a connection: the page already fetched plus any further pages."""
+    conn = first_page or {}
+    nodes = list(conn.get("nodes") or [])
+    page = conn.get("pageInfo") or {}
+    while page.get("hasNextPage"):
+        more = request(client, query, dict(variables, first=PAGE_SIZE, after=page.get("endCursor")))
+        if more.get("errors"):
+            raise MetadataError(f"Linear API returned errors while fetching {what}", more["errors"])
+        conn = more.get("data") or {}
+        for key in path:
+            conn = conn.get(key) or {}
+        nodes.extend(conn.get("nodes") or [])
+        page = conn.get("pageInfo") or {}
+    return nodes
+
+
+def _fetch(client: LinearClient, parent_issue_id: str) -> Dict[str, Any]:
+    resp = request(client, QUERY_PARENT_METADATA, {"id": parent_issue_id, "first": PAGE_SIZE})
+    if resp.get("errors"):
+        raise MetadataError("Linear API returned errors while fetching parent issue metadata", resp["errors"])
+    issue = (resp.get("data") or {}).get("issue")
+    if not issue:
+        raise MetadataError("Could not load parent issue by id. Check parentIssueId and API key/workspace.")
+    team = issue.get("team") or {}
+    if not team.get("id"):
+        raise MetadataError("Could not resolve teamId for the parent issue.")
+
+    labels = _rest(client, team.get("labels"), QUERY_TEAM_LABELS, {"id": team["id"]}, ("team", "labels"), "team labels")
+    workspace_labels = _rest(client, (resp.get("data") or {}).get("workspaceLabels"), QUERY_WORKSPACE_LABELS, {},
+                             ("issueLabels",), "workspace labels")
+    members = _rest(client, team.get("members"), QUERY_TEAM_MEMBERS, {"id": team["id"]}, ("team", "members"), "team members")
+
+    states = sorted((team.get("states") or {}).get("nodes") or [], key=lambda s: s.get("position") or 0)
+    return {
+        "issue": {"id": issue.get("id"), "identifier": issue.get("identifier")},
+        "project": issue.get("project"),
+        "team": {"id": team["id"], "key": team.get("key"), "name": team.get("name")},
+        "states": states,
+        "labels": labels + [dict(l, workspace=True) for l in workspace_labels],
+        "members": members,
+    }
+
+
+@traced("load_parent_metadata")
+def load_parent_metadata(
+    client: LinearClient,
+    parent_issue_id: str,
+    cache_dir: str = "local-cache",
+    ttl: float = DEFAULT_TTL_SECONDS,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Return {"issue", "project", "team", "states", "labels", "members", "cached"} for a parent issue.
+
+    Served from local-cache/team_metadata.json when both the parent entry and its team
+    entry are younger than `ttl`; otherwise fetched from Linear and written back.
+    Raises MetadataError if Linear cannot resolve the parent issue or its team.
+    """
+    path = os.path.join(cache_dir, CACHE_FILE)
+    data = _load(path)
+
+    if not refresh:
+        parent = data["parents"].get(parent_issue_id)
+        team = data["teams"].get((parent or {}).get("teamId") or "")
+        # Entries written before members were cached are refetched once.
+        if parent and team and "members" in team and max(_age_seconds(parent.get("fetchedAt")), _age_seconds(team.get("fetchedAt"))) < ttl:
+            return {
+                "issue": {"id": parent_issue_id, "identifier": parent.get("identifier")},
+                "project": parent.get("project"),
+                "team": team["team"],
+                "states": team.get("states") or [],
+                "labels": team.get("labels") or [],
+                "members": team.get("members") or [],
+                "cached": True,
+            }
+
+    meta = _fetch(client, parent_issue_id)
+    now = _utc_now()
+    # Re-read under the lock so entries written by other threads/processes since the read
+    # above are kept; only this parent and its team are replaced.
+    with _locked(path):
+        data = _load(path)
+        data["parents"][parent_issue_id] = {
+            "identifier": meta["issue"]["identifier"],
+            "teamId": meta["team"]["id"],
+            "project": meta["project"],
+            "fetchedAt": now,
+        }
+        data["teams"][meta["team"]["id"]] = {
+            "team": meta["team"],
+            "states": meta["states"],
+            "labels": meta["labels"],
+            "members": meta["members"],
+            "fetchedAt": now,
+        }
+        _save(path, data)
+    meta["cached"] = False
+    return meta
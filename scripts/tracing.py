@@ -0,0 +1,172 @@
+"""Nested timing spans for one run, written as Chrome trace-event JSON.
+
+Why:
+- metrics.py says how long Linear took, not where the rest of a run's wall time goes:
+  loading JSON, hashing files, building request documents, rate-limit waits, retry
+  backoff, writing reports and updating the cache.
+
+What this module does:
+- `span(name, cat)` times a block and `@traced(name)` times every call of a function.
+  Spans nest per thread. `finish()` writes them as Chrome trace events ("X" events, one
+  track per thread), which ui.perfetto.dev, chrome://tracing and speedscope open.
+- `add_arguments(parser)` gives a script `--trace FILE` and `--profile FILE`;
+  `start_from_args(args, name)` turns them on and `@entry_point` on `main()` writes the
+  files when `main()` returns. `--profile` runs cProfile over the same run and dumps
+  pstats (`python -m pstats FILE`, snakeviz).
+
+Notes:
+- Disabled (the default), `span()` returns one shared no-op context manager and a
+  `@traced` function makes a single global check, so the calls stay in hot paths.
+- Tracing started by an outer caller (`groombot run --trace`) is shared by the stages it
+  runs; only the caller that started it writes the file.
+- cProfile only sees the thread that started it; worker threads show up in the trace only.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_tracer: Optional["Tracer"] = None
+_NOOP = contextlib.nullcontext()
+
+
+class Tracer:
+    def __init__(self, path: Optional[str], profile_path: Optional[str], name: str) -> None:
+        self.path = path
+        self.profile_path = profile_path
+        self.name = name
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = []
+        self.threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.t0 = time.perf_counter()
+        self.profiler = cProfile.Profile() if profile_path else None
+
+    def add(self, name: str, cat: str, start: float, end: float, args: Optional[Dict[str, Any]] = None) -> None:
+        tid = threading.get_ident()
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": tid,
+                 "ts": round((start - self.t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+            if tid not in self.threads:
+                self.threads[tid] = threading.current_thread().name
+
+    def write(self) -> None:
+        self.add(self.name, "run", self.t0, time.perf_counter(), {"argv": sys.argv[1:]})
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": self.name}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in self.threads.items()]
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, f)
+            os.replace(tmp, self.path)
+            print(f"Wrote trace {self.path} ({len(self.events)} spans)")
+        if self.profiler is not None and self.profile_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)) or ".", exist_ok=True)
+            self.profiler.dump_stats(self.profile_path)
+            print(f"Wrote profile {self.profile_path}")
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: Optional[Dict[str, Any]]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter(), self.args)
+        return False
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, cat: str = "groombot", args: Optional[Dict[str, Any]] = None) -> Any:
+    """Context manager timing a block (a no-op unless tracing is on)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, name, cat, args)
+
+
+def traced(name: Optional[str] = None, cat: str = "groombot") -> Callable[[F], F]:
+    """Decorator recording a span for every call of the function."""
+    def wrap(fn: F) -> F:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*a: Any, **kw: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return fn(*a, **kw)
+            start = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                tracer.add(label, cat, start, time.perf_counter())
+        return inner  # type: ignore[return-value]
+    return wrap
+
+
+def start(path: Optional[str], profile_path: Optional[str] = None, name: str = "groombot") -> bool:
+    """Turn tracing on; False if it is already on (the outer caller keeps ownership)."""
+    global _tracer
+    if _tracer is not None or not (path or profile_path):
+        return False
+    _tracer = Tracer(path, profile_path, name)
+    if _tracer.profiler is not None:
+        _tracer.profiler.enable()
+    return True
+
+
+def finish() -> None:
+    """Turn tracing off and write the trace (and profile) files."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return
+    if tracer.profiler is not None:
+        tracer.profiler.disable()
+    tracer.write()
+
+
+def add_arguments(parser: Any) -> None:
+    parser.add_argument("--trace", default=None, metavar="FILE", help="Write a Chrome trace-event JSON of where this run's time went (open in ui.perfetto.dev)")
+    parser.add_argument("--profile", default=None, metavar="FILE", help="Also run cProfile over this run and dump pstats to FILE")
+
+
+def start_from_args(args: Any, name: str) -> bool:
+    return start(getattr(args, "trace", None), getattr(args, "profile", None), name)
+
+
+def entry_point(fn: F) -> F:
+    """Wrap a script's main() so a trace it started is written however it returns."""
+    @functools.wraps(fn)
+    def inner(*a: Any, **kw: Any) -> Any:
+        outer = _tracer
+        try:
+            return fn(*a, **kw)
+        finally:
+            if outer is None and _tracer is not None:
+                finish()
+    return inner  # type: ignore[return-value]